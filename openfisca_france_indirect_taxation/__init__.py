@@ -24,13 +24,22 @@
 
 
 import os
+import weakref
 
-from openfisca_core.taxbenefitsystems import XmlBasedTaxBenefitSystem
+from openfisca_core.taxbenefitsystems import AbstractTaxBenefitSystem, XmlBasedTaxBenefitSystem
 
 from .entities import entity_class_by_symbol
 from .scenarios import Scenario
 from . import param
-from .param import preprocessing
+from .param import legislation_snapshot, preprocessing
+
+
+# Système socio-fiscal de référence partagé par le processus, cf. get_tax_benefit_system
+reference_tax_benefit_system = None
+# Fonctions de construction des réformes, par clé de réforme, cf. register_reform
+build_reform_function_by_key = dict()
+# Réformes construites, par clé de réforme, par système socio-fiscal de référence
+reform_by_key_by_tax_benefit_system = weakref.WeakKeyDictionary()
 
 
 # TaxBenefitSystems
@@ -47,6 +56,17 @@ def init_country():
             )
         preprocess_legislation = staticmethod(preprocessing.preprocess_legislation)
 
+        def __init__(self, use_legislation_snapshot = True):
+            # Load the preprocessed legislation from its binary snapshot when it is up to date, to skip the parsing
+            # of parameters.xml and the preprocessing of the CSV assets.
+            legislation_json = legislation_snapshot.load_legislation_snapshot() if use_legislation_snapshot else None
+            if legislation_json is None:
+                XmlBasedTaxBenefitSystem.__init__(self)
+                if use_legislation_snapshot:
+                    legislation_snapshot.dump_legislation_snapshot(self.legislation_json)
+            else:
+                AbstractTaxBenefitSystem.__init__(self, legislation_json = legislation_json)
+
         def prefill_cache(self):
             # Define categorie_fiscale_* and poste_coicp_* variables
             from .model.consommation import categories_fiscales
@@ -73,3 +93,61 @@ def init_tax_benefit_system():
     TaxBenefitSystem = init_country()
     tax_benefit_system = TaxBenefitSystem()
     return tax_benefit_system
+
+
+def get_tax_benefit_system():
+    """Renvoie le système socio-fiscal de référence du processus, construit (avec prefill_cache) au premier appel"""
+    global reference_tax_benefit_system
+    if reference_tax_benefit_system is None:
+        TaxBenefitSystem = init_country()
+        tax_benefit_system = TaxBenefitSystem()
+        tax_benefit_system.prefill_cache()
+        reference_tax_benefit_system = tax_benefit_system
+    return reference_tax_benefit_system
+
+
+def register_reform(reform_key, build_reform):
+    """Enregistre la fonction build_reform(tax_benefit_system) de la réforme, et invalide ses versions en cache"""
+    build_reform_function_by_key[reform_key] = build_reform
+    clear_reform_cache(reform_key = reform_key)
+
+
+def get_cached_reform(reform_key = None, tax_benefit_system = None):
+    """Renvoie la réforme, construite une seule fois par système socio-fiscal de référence"""
+    assert reform_key is not None
+    if tax_benefit_system is None:
+        tax_benefit_system = get_tax_benefit_system()
+    reform_by_key = reform_by_key_by_tax_benefit_system.setdefault(tax_benefit_system, dict())
+    reform = reform_by_key.get(reform_key)
+    if reform is None:
+        build_reform = build_reform_function_by_key.get(reform_key)
+        assert build_reform is not None, u'Unknown reform {}. Available reforms: {}'.format(
+            reform_key, sorted(build_reform_function_by_key))
+        reform = reform_by_key[reform_key] = build_reform(tax_benefit_system)
+    return reform
+
+
+def get_cached_composed_reform(reform_keys = None, tax_benefit_system = None):
+    """Renvoie la composition des réformes, appliquées dans l'ordre et chacune mise en cache"""
+    assert reform_keys is not None
+    if tax_benefit_system is None:
+        tax_benefit_system = get_tax_benefit_system()
+    for reform_key in reform_keys:
+        tax_benefit_system = get_cached_reform(reform_key = reform_key, tax_benefit_system = tax_benefit_system)
+    return tax_benefit_system
+
+
+def clear_reform_cache(reform_key = None):
+    """Oublie les réformes construites (seulement celles de clé reform_key si elle est donnée)"""
+    for reform_by_key in reform_by_key_by_tax_benefit_system.values():
+        if reform_key is None:
+            reform_by_key.clear()
+        else:
+            reform_by_key.pop(reform_key, None)
+
+
+def clear_tax_benefit_system_cache():
+    """Oublie le système socio-fiscal de référence et les réformes construites à partir de lui"""
+    global reference_tax_benefit_system
+    reference_tax_benefit_system = None
+    reform_by_key_by_tax_benefit_system.clear()
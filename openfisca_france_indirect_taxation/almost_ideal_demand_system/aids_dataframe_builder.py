@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Construction des bases de régression du système de demande (AIDS) à partir des enquêtes BdF.
+
+Une variante est décrite par la répartition des postes COICOP entre ses catégories de biens, dans l'ordre des parts
+w1, w2... et des prix p1, p2... de la base produite. Les données de chaque année sont chargées une seule fois : les
+matrices ménages x postes des dépenses et des prix sont partagées par toutes les variantes, qui ne diffèrent que par
+leur matrice postes x catégories. Les fichiers d'une année sont écrits dès qu'elle est traitée.
+"""
+
+from __future__ import division
+
+
+from collections import OrderedDict
+import logging
+import os
+import pkg_resources
+
+import numpy as np
+import pandas as pd
+
+from openfisca_france_indirect_taxation.build_survey_data.coicop_mapping import get_grosposte_of_poste_coicop
+from openfisca_france_indirect_taxation.surveys import get_input_data_frame
+from openfisca_france_indirect_taxation.utils import write_atomically
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_price_index_builder import \
+    get_df_indice_prix_produit
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.utils import \
+    add_area_dummy, add_stalog_dummy, add_vag_dummy, compute_indices_prix, electricite_only, \
+    get_indicatrices_categories, get_matrice_prix, indices_prix_carbus, price_carbu_pond
+
+
+log = logging.getLogger(__name__)
+
+assets_directory = os.path.join(
+    pkg_resources.get_distribution('openfisca_france_indirect_taxation').location
+    )
+
+# Pour estimer QAIDS, on se concentre sur les biens non-durables.
+# On élimine donc les biens durables : 442 : redevance d'enlèvement des ordures, 711, 712, 713 : achat de véhicules,
+# 911, 912, 9122, 913, 9151 : technologies high-tech, 9211, 921, 923: gros équipements loisirs, 941, 960 : voyages
+# séjours et cadeaux, 10i0 : enseignement, 12.. : articles de soin et bijoux
+biens_durables = ['poste_coicop_442', 'poste_coicop_711', 'poste_coicop_712', 'poste_coicop_713',
+    'poste_coicop_911', 'poste_coicop_912', 'poste_coicop_9122', 'poste_coicop_913', 'poste_coicop_9151',
+    'poste_coicop_9211', 'poste_coicop_921', 'poste_coicop_922', 'poste_coicop_923', 'poste_coicop_960',
+    'poste_coicop_941', 'poste_coicop_1010', 'poste_coicop_1015', 'poste_coicop_10152', 'poste_coicop_1020',
+    'poste_coicop_1040', 'poste_coicop_1050', 'poste_coicop_1212', 'poste_coicop_1231', 'poste_coicop_1240',
+    'poste_coicop_12411', 'poste_coicop_1270']
+
+carburants = ['poste_coicop_722']
+
+produits_alimentaire = ['poste_coicop_111', 'poste_coicop_112', 'poste_coicop_113', 'poste_coicop_114',
+    'poste_coicop_115', 'poste_coicop_1151', 'poste_coicop_116', 'poste_coicop_117', 'poste_coicop_118',
+    'poste_coicop_1181', 'poste_coicop_119', 'poste_coicop_121', 'poste_coicop_122']
+
+energie_logement = ['poste_coicop_451', 'poste_coicop_4511', 'poste_coicop_452', 'poste_coicop_4522',
+    'poste_coicop_453', 'poste_coicop_454', 'poste_coicop_455', 'poste_coicop_4552']
+
+# Caractéristiques des ménages reprises dans les bases de régression
+colonnes_menage = ['typmen', 'strate', 'dip14pr', 'agepr', 'situapr', 'situacj', 'stalog', 'nenfants', 'nactifs',
+    'vag', 'veh_diesel', 'veh_essence']
+
+
+def get_categorie_coicop(poste):
+    """Renvoie le poste agrégé (de '1' à '12') d'une variable poste_coicop_*"""
+    return str(get_grosposte_of_poste_coicop(poste))
+
+
+# Les catégories valent la liste de leurs postes ou None pour la catégorie qui reçoit tous les postes restants. À
+# défaut, get_categorie donne la catégorie de chaque poste. Les ménages dont l'indice de prix d'une catégorie est nul
+# (ils n'y dépensent rien) en reçoivent le prix de prix_par_defaut ou sont écartés s'ils figurent dans
+# categories_non_nulles.
+variantes = OrderedDict([
+    ('energy', dict(
+        categories = OrderedDict([
+            ('carbu', carburants),
+            ('logem', energie_logement),
+            ('alime', produits_alimentaire),
+            ('autre', None),
+            ]),
+        categories_non_nulles = ['alime', 'logem'],
+        file_name = 'data_frame_energy',
+        prix_par_defaut = dict(carbu = 'poste_coicop_722'),
+        years = [2000, 2005, 2011],
+        )),
+    ('energy_no_alime', dict(
+        categories = OrderedDict([
+            ('carbu', carburants),
+            ('logem', energie_logement),
+            ('autre', None),
+            ]),
+        categories_non_nulles = ['logem'],
+        file_name = 'data_frame_energy_no_alime',
+        prix_par_defaut = dict(carbu = 'poste_coicop_722'),
+        years = [2011],
+        )),
+    ('carbu', dict(
+        categories = OrderedDict([
+            ('carbu', carburants),
+            ('alime', produits_alimentaire),
+            ('autre', None),
+            ]),
+        categories_non_nulles = ['alime'],
+        file_name = 'data_frame_carbu',
+        prix_par_defaut = dict(carbu = 'poste_coicop_722'),
+        years = [2000, 2005, 2011],
+        )),
+    # Les 12 postes agrégés de la nomenclature de la comptabilité nationale, avec l'indice de prix du poste agrégé
+    # pour les ménages qui n'y dépensent rien
+    ('coicop', dict(
+        categories = OrderedDict((str(grosposte), None) for grosposte in range(1, 13)),
+        file_name = 'data_frame_coicop',
+        get_categorie = get_categorie_coicop,
+        prix_par_defaut = dict(
+            (str(grosposte), 'poste_coicop_{}00'.format(grosposte)) for grosposte in range(1, 13)
+            ),
+        years = [2000, 2005, 2011],
+        )),
+    ])
+
+
+def get_postes_by_categorie(variante, postes):
+    """Répartit les postes entre les catégories de la variante, dans l'ordre des catégories"""
+    categories = variante['categories']
+    get_categorie = variante.get('get_categorie')
+    if get_categorie is None:
+        categorie_by_poste = dict(
+            (poste, categorie)
+            for categorie, postes_categorie in categories.items()
+            if postes_categorie is not None
+            for poste in postes_categorie
+            )
+        categories_restantes = [categorie for categorie, postes_categorie in categories.items()
+            if postes_categorie is None]
+        assert len(categories_restantes) <= 1, 'Only one category can receive the remaining postes'
+        categorie_restante = categories_restantes[0] if categories_restantes else None
+        get_categorie = lambda poste: categorie_by_poste.get(poste, categorie_restante)  # noqa
+
+    postes_by_categorie = OrderedDict((categorie, list()) for categorie in categories)
+    for poste in postes:
+        categorie = get_categorie(poste)
+        if categorie in postes_by_categorie:
+            postes_by_categorie[categorie].append(poste)
+    return postes_by_categorie
+
+
+def load_depenses(year):
+    """Charge les dépenses d'une année, partagées par toutes les variantes
+
+    Renvoie les ménages (ident_men en chaîne, avec elect_only), les postes de consommation non durable hors 99.. et
+    13.. (loyers, impôts, cadeaux...) qui forment le budget étudié et la matrice ménages x postes de leurs dépenses.
+    """
+    aggregates_data_frame = get_input_data_frame(year)
+    aggregates_data_frame = aggregates_data_frame.drop(
+        [bien for bien in biens_durables if bien in aggregates_data_frame.columns],
+        axis = 1,
+        )
+    postes = [
+        column for column in aggregates_data_frame.columns
+        if column[:13] == 'poste_coicop_' and column[13:15] not in ['99', '13']
+        ]
+    # On crée une variable dummy pour savoir si le ménage ne consomme que de l'électricité ou aussi du gaz.
+    # Si seulement électricité, elle est égale à 1.
+    aggregates_data_frame = electricite_only(aggregates_data_frame)
+    aggregates_data_frame['ident_men'] = aggregates_data_frame['ident_men'].astype(str)
+    return aggregates_data_frame, postes, aggregates_data_frame[postes].values.astype(float)
+
+
+def build_data_frame_for_reg(variante, year, menages, postes, depenses, prix, df_indice_prix_produit):
+    """Construit la base de régression d'une variante pour une année
+
+    depenses et prix sont les matrices ménages x postes partagées par les variantes. Les parts de chaque catégorie
+    sont rapportées aux dépenses de toutes les catégories de la variante.
+    """
+    categories = list(variante['categories'])
+    depenses_categories, indices_prix = compute_indices_prix(
+        depenses,
+        prix,
+        get_indicatrices_categories(postes, get_postes_by_categorie(variante, postes)),
+        )
+
+    # Les ménages qui ne consomment rien dans une catégorie se voient affecter un indice de prix nul : on leur associe
+    # le prix par défaut de la catégorie pour leur vague d'enquête
+    prix_par_defaut = variante.get('prix_par_defaut', dict())
+    if prix_par_defaut:
+        vagues, index_vagues = np.unique(menages['vag'].values.astype(int), return_inverse = True)
+        categories_par_defaut = [categorie for categorie in categories if categorie in prix_par_defaut]
+        matrice_prix_par_defaut = get_matrice_prix(
+            df_indice_prix_produit,
+            [prix_par_defaut[categorie] for categorie in categories_par_defaut],
+            vagues,
+            )[index_vagues]
+        for colonne, categorie in enumerate(categories_par_defaut):
+            index = categories.index(categorie)
+            indices_prix[:, index] = np.where(
+                indices_prix[:, index] == 0,
+                matrice_prix_par_defaut[:, colonne],
+                indices_prix[:, index],
+                )
+
+    dataframe = pd.DataFrame(OrderedDict([('ident_men', menages['ident_men'].values)]), index = menages.index)
+    depenses_tot = depenses_categories.sum(axis = 1)
+    for index, categorie in enumerate(categories):
+        dataframe['part_{}'.format(categorie)] = depenses_categories[:, index] / depenses_tot
+    for index, categorie in enumerate(categories):
+        dataframe['prix_{}'.format(categorie)] = indices_prix[:, index]
+    dataframe['depenses_par_uc'] = depenses_tot / menages['ocde10']
+    dataframe['depenses_tot'] = depenses_tot
+    for column in colonnes_menage + (['elect_only'] if 'logem' in categories else []):
+        dataframe[column] = menages[column]
+
+    # On supprime de la base de données les individus pour lesquels on ne dispose d'aucune consommation dans les
+    # catégories non nulles, par exemple alimentaire. Leur présence est susceptible de biaiser l'analyse puisque de
+    # toute évidence s'ils ne dépensent rien pour la nourriture ce n'est pas qu'ils n'en consomment pas, mais qu'ils
+    # n'en ont pas acheté sur la période (réserves, etc)
+    for categorie in variante.get('categories_non_nulles', list()):
+        dataframe = dataframe[dataframe['prix_{}'.format(categorie)] != 0]
+
+    if 'carbu' in categories:
+        # On enlève les outliers, que l'on considère comme les individus dépensant plus de 25% de leur budget en
+        # carburants. Cela correspond à 16 et 13 personnes pour 2000 et 2005 ce qui est négligeable, mais 153 i.e. 2%
+        # des consommateurs pour 2011 ce qui est assez important. Cette différence s'explique par la durée des
+        # enquêtes (1 semaine en 2011)
+        dataframe = dataframe[dataframe['part_carbu'] < 0.25]
+        dataframe = pd.merge(dataframe, indices_prix_carbus(year), on = 'vag')
+        dataframe = price_carbu_pond(dataframe)
+    dataframe['year'] = year
+
+    dataframe = add_area_dummy(dataframe)
+    if 'logem' in categories:
+        dataframe = add_stalog_dummy(dataframe)
+    dataframe = add_vag_dummy(dataframe)
+
+    renames = dict()
+    for index, categorie in enumerate(categories):
+        renames['part_{}'.format(categorie)] = 'w{}'.format(index + 1)
+        renames['prix_{}'.format(categorie)] = 'p{}'.format(index + 1)
+    return dataframe.rename(columns = renames)
+
+
+def write_data_frame(data_frame, file_name):
+    file_path = os.path.join(assets_directory, 'openfisca_france_indirect_taxation', 'assets', 'quaids', file_name)
+    write_atomically(file_path, lambda csv_file: data_frame.to_csv(csv_file, sep = ','))
+    log.info(u'Wrote {}'.format(file_path))
+
+
+def build_aids_data_frames(names = None, write = True):
+    """Construit les bases de régression des variantes demandées (toutes par défaut)
+
+    Chaque année est chargée une seule fois pour toutes les variantes qui la couvrent. Renvoie pour chaque variante
+    la base de toutes ses années, écrite comme les bases de chaque année dans assets/quaids quand write est vrai.
+    """
+    df_indice_prix_produit = get_df_indice_prix_produit()
+    variante_by_name = OrderedDict((name, variantes[name]) for name in (names or variantes.keys()))
+    data_frames_by_name = OrderedDict((name, list()) for name in variante_by_name)
+    years = sorted(set(year for variante in variante_by_name.values() for year in variante['years']))
+    for year in years:
+        menages, postes, depenses = load_depenses(year)
+        vagues, index_vagues = np.unique(menages['vag'].values.astype(int), return_inverse = True)
+        prix = get_matrice_prix(df_indice_prix_produit, postes, vagues)[index_vagues]
+        for name, variante in variante_by_name.items():
+            if year not in variante['years']:
+                continue
+            data_frame_for_reg = build_data_frame_for_reg(
+                variante, year, menages, postes, depenses, prix, df_indice_prix_produit)
+            data_frames_by_name[name].append(data_frame_for_reg)
+            if write:
+                write_data_frame(data_frame_for_reg, '{}_{}.csv'.format(variante['file_name'], year))
+        del menages, depenses, prix
+
+    data_frame_all_years_by_name = OrderedDict()
+    for name, data_frames in data_frames_by_name.items():
+        data_frame_all_years = data_frame_all_years_by_name[name] = pd.concat(data_frames).fillna(0)
+        if write:
+            write_data_frame(data_frame_all_years, '{}_all_years.csv'.format(variante_by_name[name]['file_name']))
+    return data_frame_all_years_by_name
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(level = logging.INFO, stream = sys.stdout)
+    build_aids_data_frames(sys.argv[1:] or None)
@@ -3,140 +3,89 @@
 Created on Tue Jul 07 09:53:33 2015
 
 @author: thomas.douenne
+
+Indices de prix mensuels par poste COICOP (indice_prix_mensuel_98_2015.csv) et par vague d'enquête BdF.
+
+Les tables ne sont construites qu'à la première demande, puis conservées dans le processus et, sous forme de pickle
+nommé d'après l'empreinte du fichier source, dans le répertoire de cache utilisateur : importer ce module ne coûte
+rien et les constructions de bases successives réutilisent les mêmes tables.
 """
 
 from __future__ import division
 
-import pandas as pd
-from pandas import concat
+import cPickle
 import datetime as dt
-
+import logging
 import os
 import pkg_resources
 
+import numpy as np
+import pandas as pd
 
-def date_to_vag(date):
-    args = date.split('_') + ['1']
-    args = [int(arg) for arg in args]
-    datetime = dt.datetime(*args)
-
-    for vague in vagues:
-        if vague['start'] <= datetime <= vague['end']:
-            return vague['number']
+from openfisca_france_indirect_taxation.utils import get_cache_directory, get_file_hash, write_atomically
 
-    return None
 
-# We want to obtain prices from the Excel file:
+log = logging.getLogger(__name__)
 
 default_config_files_directory = os.path.join(
     pkg_resources.get_distribution('openfisca_france_indirect_taxation').location)
-indice_prix_mensuel_98_2015 = pd.read_csv(
-    os.path.join(
-        default_config_files_directory,
-        'openfisca_france_indirect_taxation',
-        'assets',
-        'prix',
-        'indice_prix_mensuel_98_2015.csv'
-        ), sep =';', decimal = ','
+indice_prix_mensuel_file_path = os.path.join(
+    default_config_files_directory,
+    'openfisca_france_indirect_taxation',
+    'assets',
+    'prix',
+    'indice_prix_mensuel_98_2015.csv'
     )
+price_index_cache_version = 2
+# ((date de modification, taille), tables) par chemin de fichier source
+tables_by_file_path = dict()
 
-
-
-indice_prix_mensuel_98_2015 = indice_prix_mensuel_98_2015.astype(str)
-
-# On veut que les biens prennent les mêmes noms que ceux du modèle, i.e. poste_coicop_xyz
-# On doit donc changer le nom de tous les biens renseignés dans cette base de donnée
-# On sépare les biens des coicop 1 à 9 des autres de manière à enlever les 0 à la fin des noms sans faire d'erreurs
-
-coicop_one_nine = indice_prix_mensuel_98_2015.ix[:,:'_9600']
-
-produits_rename = [column for column in coicop_one_nine.columns if len(column) == 5 and column[4:] == '0']
-change_name = coicop_one_nine[produits_rename]
-for element in change_name.columns:
-    change_name.rename(columns={element: element[:4]}, inplace = True)
-
-autres_produits_list = [column for column in coicop_one_nine.columns if len(column) != 5 or column[4:] != '0']
-autres_produits = coicop_one_nine[autres_produits_list]
-
-coicop_one_nine_new = pd.concat([change_name, autres_produits], axis = 1)
-
-coicop_dix_douze = indice_prix_mensuel_98_2015.ix[:,'_10000':]
-produits_rename = [column for column in coicop_dix_douze.columns if len(column) == 6 and column[5:] == '0']
-change_name = coicop_dix_douze[produits_rename]
-for element in change_name.columns:
-    change_name.rename(columns={element: element[:5]}, inplace = True)
-
-autres_produits_list = [column for column in coicop_dix_douze.columns if len(column) != 6 or column[5:] != '0']
-autres_produits = coicop_dix_douze[autres_produits_list]
-
-coicop_dix_douze_new = pd.concat([change_name, autres_produits], axis = 1)
-
-indice_prix_mensuel_98_2015 = pd.concat([coicop_one_nine_new, coicop_dix_douze_new], axis = 1)
-for element in indice_prix_mensuel_98_2015.columns:
-    indice_prix_mensuel_98_2015.rename(columns={element: 'poste_coicop' + element}, inplace = True)
-indice_prix_mensuel_98_2015.rename(
-    columns={'poste_coicopAnnee': 'Annee', 'poste_coicopMois': 'Mois'}, inplace = True)
-
-# Fixation des indices de prix non renseignés par l'Insee :
-
-indice_prix_mensuel_98_2015['poste_coicop_1411'] = indice_prix_mensuel_98_2015['poste_coicop_100']
-indice_prix_mensuel_98_2015['poste_coicop_2201'] = indice_prix_mensuel_98_2015['poste_coicop_220']
-indice_prix_mensuel_98_2015['poste_coicop_2202'] = indice_prix_mensuel_98_2015['poste_coicop_220']
-indice_prix_mensuel_98_2015['poste_coicop_2203'] = indice_prix_mensuel_98_2015['poste_coicop_220']
-indice_prix_mensuel_98_2015['poste_coicop_230'] = indice_prix_mensuel_98_2015['poste_coicop_200']
-indice_prix_mensuel_98_2015['poste_coicop_2411'] = indice_prix_mensuel_98_2015['poste_coicop_200']
-indice_prix_mensuel_98_2015['poste_coicop_322'] = indice_prix_mensuel_98_2015['poste_coicop_321']
-indice_prix_mensuel_98_2015['poste_coicop_412'] = indice_prix_mensuel_98_2015['poste_coicop_411']
-indice_prix_mensuel_98_2015['poste_coicop_421'] = indice_prix_mensuel_98_2015['poste_coicop_411']
-indice_prix_mensuel_98_2015['poste_coicop_444'] = indice_prix_mensuel_98_2015['poste_coicop_4414']
-indice_prix_mensuel_98_2015['poste_coicop_442'] = indice_prix_mensuel_98_2015['poste_coicop_4412']
-indice_prix_mensuel_98_2015['poste_coicop_4552'] = indice_prix_mensuel_98_2015['poste_coicop_4551']
-indice_prix_mensuel_98_2015['poste_coicop_513'] = indice_prix_mensuel_98_2015['poste_coicop_5115']
-indice_prix_mensuel_98_2015['poste_coicop_552'] = indice_prix_mensuel_98_2015['poste_coicop_551']
-indice_prix_mensuel_98_2015['poste_coicop_5711'] = indice_prix_mensuel_98_2015['poste_coicop_500']
-indice_prix_mensuel_98_2015['poste_coicop_5712'] = indice_prix_mensuel_98_2015['poste_coicop_500']
-indice_prix_mensuel_98_2015['poste_coicop_612'] = indice_prix_mensuel_98_2015['poste_coicop_611']
-indice_prix_mensuel_98_2015['poste_coicop_613'] = indice_prix_mensuel_98_2015['poste_coicop_611']
-indice_prix_mensuel_98_2015['poste_coicop_630'] = indice_prix_mensuel_98_2015['poste_coicop_600']
-indice_prix_mensuel_98_2015['poste_coicop_6412'] = indice_prix_mensuel_98_2015['poste_coicop_600']
-indice_prix_mensuel_98_2015['poste_coicop_713'] = indice_prix_mensuel_98_2015['poste_coicop_712']
-indice_prix_mensuel_98_2015['poste_coicop_734'] = indice_prix_mensuel_98_2015['poste_coicop_735']
-indice_prix_mensuel_98_2015['poste_coicop_831'] = indice_prix_mensuel_98_2015['poste_coicop_812']
-indice_prix_mensuel_98_2015['poste_coicop_832'] = indice_prix_mensuel_98_2015['poste_coicop_812']
-indice_prix_mensuel_98_2015['poste_coicop_8141'] = indice_prix_mensuel_98_2015['poste_coicop_800']
-indice_prix_mensuel_98_2015['poste_coicop_9122'] = indice_prix_mensuel_98_2015['poste_coicop_912']
-indice_prix_mensuel_98_2015['poste_coicop_922'] = indice_prix_mensuel_98_2015['poste_coicop_921']
-indice_prix_mensuel_98_2015['poste_coicop_923'] = indice_prix_mensuel_98_2015['poste_coicop_921']
-indice_prix_mensuel_98_2015['poste_coicop_935'] = indice_prix_mensuel_98_2015['poste_coicop_934']
-indice_prix_mensuel_98_2015['poste_coicop_943'] = indice_prix_mensuel_98_2015['poste_coicop_931']
-indice_prix_mensuel_98_2015['poste_coicop_954'] = indice_prix_mensuel_98_2015['poste_coicop_953']
-indice_prix_mensuel_98_2015['poste_coicop_10151'] = indice_prix_mensuel_98_2015['poste_coicop_1010']
-indice_prix_mensuel_98_2015['poste_coicop_10152'] = indice_prix_mensuel_98_2015['poste_coicop_1010']
-indice_prix_mensuel_98_2015['poste_coicop_1020'] = indice_prix_mensuel_98_2015['poste_coicop_1010']
-indice_prix_mensuel_98_2015['poste_coicop_1040'] = indice_prix_mensuel_98_2015['poste_coicop_1010']
-indice_prix_mensuel_98_2015['poste_coicop_1050'] = indice_prix_mensuel_98_2015['poste_coicop_1010']
-indice_prix_mensuel_98_2015['poste_coicop_11113'] = indice_prix_mensuel_98_2015['poste_coicop_11112']
-indice_prix_mensuel_98_2015['poste_coicop_1212'] = indice_prix_mensuel_98_2015['poste_coicop_1213']
-indice_prix_mensuel_98_2015['poste_coicop_1220'] = indice_prix_mensuel_98_2015['poste_coicop_1200']
-indice_prix_mensuel_98_2015['poste_coicop_1251'] = indice_prix_mensuel_98_2015['poste_coicop_1250']
-indice_prix_mensuel_98_2015['poste_coicop_1255'] = indice_prix_mensuel_98_2015['poste_coicop_1250']
-indice_prix_mensuel_98_2015['poste_coicop_1262'] = indice_prix_mensuel_98_2015['poste_coicop_1261']
-indice_prix_mensuel_98_2015['poste_coicop_1291'] = indice_prix_mensuel_98_2015['poste_coicop_1200']
-
-
-indice_prix_mensuel_98_2015['date'] = indice_prix_mensuel_98_2015[u'Annee'] + '_' + indice_prix_mensuel_98_2015[u'Mois']
-indice_prix_mensuel_98_2015[[u'Annee'] + [u'Mois']] = indice_prix_mensuel_98_2015[[u'Annee'] + [u'Mois']].astype(float)
-indice_prix_mensuel_98_2015['temps'] = \
-    ((indice_prix_mensuel_98_2015[u'Annee'] - 1998) * 12) + indice_prix_mensuel_98_2015[u'Mois']
-del indice_prix_mensuel_98_2015[u'Annee']
-indice_prix_mensuel_98_2015['mois'] = indice_prix_mensuel_98_2015[u'Mois'].copy()
-del indice_prix_mensuel_98_2015[u'Mois']
-
-produits = list(column for column in indice_prix_mensuel_98_2015.columns if column[:13] == 'poste_coicop_')
-
-df_indice_prix_produit = pd.melt(indice_prix_mensuel_98_2015, id_vars = ['date', 'temps', 'mois'], value_vars=produits,
-    value_name = 'prix', var_name = 'bien')
-# df_indice_prix_produit.bien = df_indice_prix_produit.bien.str.split('_').str[1]
+# Fixation des indices de prix non renseignés par l'Insee : (poste, poste dont il reprend l'indice)
+alias_postes_coicop = [
+    ('poste_coicop_1411', 'poste_coicop_100'),
+    ('poste_coicop_2201', 'poste_coicop_220'),
+    ('poste_coicop_2202', 'poste_coicop_220'),
+    ('poste_coicop_2203', 'poste_coicop_220'),
+    ('poste_coicop_230', 'poste_coicop_200'),
+    ('poste_coicop_2411', 'poste_coicop_200'),
+    ('poste_coicop_322', 'poste_coicop_321'),
+    ('poste_coicop_412', 'poste_coicop_411'),
+    ('poste_coicop_421', 'poste_coicop_411'),
+    ('poste_coicop_444', 'poste_coicop_4414'),
+    ('poste_coicop_442', 'poste_coicop_4412'),
+    ('poste_coicop_4552', 'poste_coicop_4551'),
+    ('poste_coicop_513', 'poste_coicop_5115'),
+    ('poste_coicop_552', 'poste_coicop_551'),
+    ('poste_coicop_5711', 'poste_coicop_500'),
+    ('poste_coicop_5712', 'poste_coicop_500'),
+    ('poste_coicop_612', 'poste_coicop_611'),
+    ('poste_coicop_613', 'poste_coicop_611'),
+    ('poste_coicop_630', 'poste_coicop_600'),
+    ('poste_coicop_6412', 'poste_coicop_600'),
+    ('poste_coicop_713', 'poste_coicop_712'),
+    ('poste_coicop_734', 'poste_coicop_735'),
+    ('poste_coicop_831', 'poste_coicop_812'),
+    ('poste_coicop_832', 'poste_coicop_812'),
+    ('poste_coicop_8141', 'poste_coicop_800'),
+    ('poste_coicop_9122', 'poste_coicop_912'),
+    ('poste_coicop_922', 'poste_coicop_921'),
+    ('poste_coicop_923', 'poste_coicop_921'),
+    ('poste_coicop_935', 'poste_coicop_934'),
+    ('poste_coicop_943', 'poste_coicop_931'),
+    ('poste_coicop_954', 'poste_coicop_953'),
+    ('poste_coicop_10151', 'poste_coicop_1010'),
+    ('poste_coicop_10152', 'poste_coicop_1010'),
+    ('poste_coicop_1020', 'poste_coicop_1010'),
+    ('poste_coicop_1040', 'poste_coicop_1010'),
+    ('poste_coicop_1050', 'poste_coicop_1010'),
+    ('poste_coicop_11113', 'poste_coicop_11112'),
+    ('poste_coicop_1212', 'poste_coicop_1213'),
+    ('poste_coicop_1220', 'poste_coicop_1200'),
+    ('poste_coicop_1251', 'poste_coicop_1250'),
+    ('poste_coicop_1255', 'poste_coicop_1250'),
+    ('poste_coicop_1262', 'poste_coicop_1261'),
+    ('poste_coicop_1291', 'poste_coicop_1200'),
+    ]
 
 vagues = [
     dict(
@@ -241,10 +190,174 @@ vagues = [
         ),
     ]
 
-df_indice_prix_produit['vag'] = df_indice_prix_produit['date'].map(date_to_vag)
-df_indice_prix_produit = df_indice_prix_produit.dropna()
-df_indice_prix_produit['vag'] = df_indice_prix_produit['vag'].astype(int)  # delete the .0 after each number
-df_indice_prix_produit['vag'] = df_indice_prix_produit['vag'].astype(str)
-df_indice_prix_produit['indice_prix_produit'] = df_indice_prix_produit['bien'] + '_' + df_indice_prix_produit['vag']
-df_indice_prix_produit = df_indice_prix_produit.drop_duplicates(
-    subset = ['indice_prix_produit'], keep = 'last')
+
+# Numéro de vague des mois qui n'appartiennent à aucune vague
+vague_inconnue = 0
+# Vagues triées par date de début, en tableaux pour la recherche dichotomique
+vague_numbers = np.array([vague['number'] for vague in vagues])
+vague_starts = np.array([vague['start'] for vague in vagues], dtype = 'datetime64[D]')
+vague_ends = np.array([vague['end'] for vague in vagues], dtype = 'datetime64[D]')
+assert (vague_starts[1:] > vague_ends[:-1]).all(), 'Vagues must be sorted and disjoint'
+
+
+def get_premiers_jours(dates):
+    """Renvoie le premier jour (datetime64[D]) des mois au format 'annee_mois'"""
+    annees_mois = pd.Series(dates).astype(str).str.split('_', expand = True).astype(int)
+    mois = (annees_mois[0].values - 1970) * 12 + annees_mois[1].values - 1
+    return mois.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def get_vagues(dates):
+    """Renvoie les numéros de vague des mois au format 'annee_mois' (vague_inconnue hors des vagues d'enquête)
+
+    Un mois appartient à la vague qui contient son premier jour : la seule vague candidate est la dernière qui commence
+    avant ce jour, trouvée par recherche dichotomique dans les débuts de vagues.
+    """
+    if len(dates) == 0:
+        return np.array([], dtype = vague_numbers.dtype)
+    jours = get_premiers_jours(dates)
+    index = np.searchsorted(vague_starts, jours, side = 'right') - 1
+    candidates = index.clip(0)
+    return np.where(
+        (index >= 0) & (jours <= vague_ends[candidates]),
+        vague_numbers[candidates],
+        vague_inconnue,
+        )
+
+
+def date_to_vag(date):
+    vag = get_vagues([date])[0]
+    return None if vag == vague_inconnue else int(vag)
+
+
+def get_mois_vagues(vags = None):
+    """Renvoie le premier et le dernier mois ('annee_mois') appartenant à chaque vague (toutes par défaut)"""
+    premiers_mois = (vague_starts - np.timedelta64(1, 'D')).astype('datetime64[M]') + 1
+    derniers_mois = vague_ends.astype('datetime64[M]')
+    mois_vagues = pd.DataFrame(
+        dict(
+            (name, ['{}_{}'.format(mois // 12 + 1970, mois % 12 + 1) for mois in mois_vague.astype(int)])
+            for name, mois_vague in [('premier_mois', premiers_mois), ('dernier_mois', derniers_mois)]
+            ),
+        index = pd.Index(vague_numbers, name = 'vag'),
+        columns = ['premier_mois', 'dernier_mois'],
+        )
+    return mois_vagues if vags is None else mois_vagues.loc[list(vags)]
+
+
+def get_poste_coicop_column_name(column, deux_chiffres = False):
+    """Renvoie le nom de variable d'une colonne du fichier des indices ('_1110' -> 'poste_coicop_111')
+
+    On enlève le 0 final des codes à 4 chiffres (5 pour les postes 10 à 12, deux_chiffres vrai) pour obtenir les mêmes
+    noms que ceux du modèle.
+    """
+    longueur = 6 if deux_chiffres else 5
+    if len(column) == longueur and column.endswith('0'):
+        column = column[:-1]
+    return 'poste_coicop' + column
+
+
+def build_price_index_tables(file_path):
+    """Construit les tables d'indices de prix à partir du fichier source
+
+    Renvoie un dictionnaire avec indice_prix_mensuel (un mois par ligne, colonnes date, temps, mois, vag et une par
+    poste), indice_prix_par_vague (une vague par ligne, le prix du premier mois de la vague pour chaque poste) et
+    df_indice_prix_produit (une ligne par poste et par vague : bien, vag, prix, date, temps, mois,
+    indice_prix_produit).
+    """
+    indice_prix_mensuel = pd.read_csv(file_path, sep =';', decimal = ',')
+    # Les postes 1 à 9 précèdent les postes 10 à 12, dont les codes ont un chiffre de plus
+    premier_poste_deux_chiffres = list(indice_prix_mensuel.columns).index('_10000')
+    indice_prix_mensuel.columns = [
+        column if column in ['Annee', 'Mois'] else get_poste_coicop_column_name(
+            column, deux_chiffres = index >= premier_poste_deux_chiffres)
+        for index, column in enumerate(indice_prix_mensuel.columns)
+        ]
+    alias = pd.DataFrame(
+        dict((poste, indice_prix_mensuel[source]) for poste, source in alias_postes_coicop),
+        index = indice_prix_mensuel.index,
+        )
+    indice_prix_mensuel = pd.concat(
+        [
+            indice_prix_mensuel.drop(
+                [poste for poste, _ in alias_postes_coicop if poste in indice_prix_mensuel], axis = 1),
+            alias,
+            ],
+        axis = 1,
+        )
+    produits = [column for column in indice_prix_mensuel.columns if column[:13] == 'poste_coicop_']
+
+    indice_prix_mensuel['date'] = \
+        indice_prix_mensuel['Annee'].astype(str) + '_' + indice_prix_mensuel['Mois'].astype(str)
+    indice_prix_mensuel['temps'] = \
+        ((indice_prix_mensuel['Annee'] - 1998) * 12 + indice_prix_mensuel['Mois']).astype(float)
+    indice_prix_mensuel['mois'] = indice_prix_mensuel['Mois'].astype(float)
+    indice_prix_mensuel['vag'] = get_vagues(indice_prix_mensuel['date'])
+    indice_prix_mensuel = indice_prix_mensuel[['date', 'temps', 'mois', 'vag'] + produits].sort_values('temps')
+    indice_prix_mensuel.reset_index(drop = True, inplace = True)
+
+    # Le prix d'un poste pour une vague est celui du premier mois de la vague
+    indice_prix_par_vague = indice_prix_mensuel[indice_prix_mensuel['vag'] != vague_inconnue].drop_duplicates(
+        subset = ['vag'])
+    indice_prix_par_vague = indice_prix_par_vague.set_index(indice_prix_par_vague['vag'])
+    indice_prix_par_vague.index.name = 'vag'
+
+    df_indice_prix_produit = pd.melt(
+        indice_prix_par_vague.reset_index(drop = True),
+        id_vars = ['date', 'temps', 'mois', 'vag'],
+        value_vars = produits,
+        value_name = 'prix',
+        var_name = 'bien',
+        )
+    df_indice_prix_produit['vag'] = df_indice_prix_produit['vag'].astype(str)
+    df_indice_prix_produit['indice_prix_produit'] = df_indice_prix_produit['bien'] + '_' + df_indice_prix_produit['vag']
+
+    return dict(
+        df_indice_prix_produit = df_indice_prix_produit,
+        indice_prix_mensuel = indice_prix_mensuel.set_index('date', drop = False),
+        indice_prix_par_vague = indice_prix_par_vague[produits],
+        )
+
+
+def get_price_index_tables(file_path = None):
+    """Renvoie les tables de build_price_index_tables, construites une seule fois par version du fichier source"""
+    file_path = os.path.abspath(file_path or indice_prix_mensuel_file_path)
+    stat = os.stat(file_path)
+    cached = tables_by_file_path.get(file_path)
+    if cached is not None and cached[0] == (stat.st_mtime, stat.st_size):
+        return cached[1]
+
+    cache_file_path = os.path.join(
+        get_cache_directory('prix'),
+        'indice_prix_{}_v{}.pickle'.format(get_file_hash(file_path), price_index_cache_version),
+        )
+    tables = None
+    if os.path.exists(cache_file_path):
+        try:
+            with open(cache_file_path, 'rb') as cache_file:
+                tables = cPickle.load(cache_file)
+        except Exception:
+            log.warning(u'Ignoring corrupted cache file {}'.format(cache_file_path))
+    if tables is None:
+        tables = build_price_index_tables(file_path)
+        write_atomically(
+            cache_file_path,
+            lambda cache_file: cPickle.dump(tables, cache_file, cPickle.HIGHEST_PROTOCOL),
+            )
+    tables_by_file_path[file_path] = ((stat.st_mtime, stat.st_size), tables)
+    return tables
+
+
+def get_df_indice_prix_produit():
+    """Renvoie (une copie de) la table longue des prix par poste et par vague"""
+    return get_price_index_tables()['df_indice_prix_produit'].copy()
+
+
+def get_prix_par_vague(postes, vags):
+    """Renvoie les prix des postes (en colonnes) pour les vagues (en lignes), NaN quand ils ne sont pas renseignés"""
+    return get_price_index_tables()['indice_prix_par_vague'].reindex(index = list(vags), columns = list(postes))
+
+
+def get_prix_par_mois(postes, dates):
+    """Renvoie les prix des postes (en colonnes) pour les mois (en lignes, dates au format 'annee_mois')"""
+    return get_price_index_tables()['indice_prix_mensuel'].reindex(index = list(dates), columns = list(postes))
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Estimation du système de demande QUAIDS (Banks, Blundell et Lewbel 1997) avec variables démographiques, selon la
+spécification de la commande quaids de Stata (Poi 2012) utilisée dans estimation_quaids_energy.do :
+
+    w_i = alpha_i + sum_j gamma_ij ln p_j + (beta_i + eta_i'z) r + lambda_i / (b(p) c(p, z)) r ** 2
+    r = ln m - ln(1 + rho'z) - ln a(p)
+    ln a(p) = alpha_0 + sum_i alpha_i ln p_i + 1/2 sum_i sum_j gamma_ij ln p_i ln p_j
+    ln b(p) + ln c(p, z) = sum_i (beta_i + eta_i'z) ln p_i
+
+L'additivité, l'homogénéité et la symétrie sont imposées en éliminant la dernière équation. Les paramètres
+sont estimés par SUR non linéaire (moindres carrés généralisés réalisables itérés, équivalents au maximum de
+vraisemblance) : des pas de Gauss-Newton, avec la jacobienne analytique des parts, alternent avec la mise à jour de la
+matrice de covariance des résidus. Les élasticités sont ensuite calculées pour tous les ménages à la fois.
+"""
+
+
+from __future__ import division
+
+
+import cPickle
+import logging
+import os
+import pkg_resources
+
+import numpy as np
+import pandas as pd
+
+from openfisca_france_indirect_taxation.utils import get_cache_directory, get_file_hash, write_atomically
+
+
+log = logging.getLogger(__name__)
+
+assets_directory = os.path.join(
+    pkg_resources.get_distribution('openfisca_france_indirect_taxation').location
+    )
+quaids_cache_version = 2
+# Variables démographiques de la spécification toutes années confondues de estimation_quaids_energy.do
+energy_demographic_columns = ['agepr', 'nactifs', 'nenfants'] + ['vag_{}'.format(vag) for vag in range(10, 29)] + [
+    'villes_petites', 'villes_grandes', 'agglo_paris', 'proprietaire', 'elect_only']
+
+
+def get_parameter_slices(good_count, demographic_count, quadratic = True):
+    """Renvoie la position des paramètres libres (ceux des good_count - 1 premières équations) dans theta"""
+    equation_count = good_count - 1
+    sizes = [
+        ('alpha', equation_count),
+        ('gamma', equation_count * (equation_count + 1) // 2),
+        ('beta', equation_count),
+        ('eta', equation_count * demographic_count),
+        ('lambda', equation_count if quadratic else 0),
+        ('rho', demographic_count),
+        ]
+    slices = dict()
+    start = 0
+    for name, size in sizes:
+        slices[name] = slice(start, start + size)
+        start += size
+    return slices, start
+
+
+def unpack_parameters(theta, good_count, demographic_count, quadratic = True):
+    """Renvoie les paramètres de toutes les équations, les restrictions donnant ceux de la dernière"""
+    equation_count = good_count - 1
+    slices, _ = get_parameter_slices(good_count, demographic_count, quadratic)
+    alpha = theta[slices['alpha']]
+    gamma_block = np.zeros((equation_count, equation_count))
+    upper_indices = np.triu_indices(equation_count)
+    gamma_block[upper_indices] = theta[slices['gamma']]
+    gamma_block.T[upper_indices] = theta[slices['gamma']]
+    gamma = np.zeros((good_count, good_count))
+    gamma[:equation_count, :equation_count] = gamma_block
+    gamma[:equation_count, equation_count] = - gamma_block.sum(axis = 1)
+    gamma[equation_count, :equation_count] = - gamma_block.sum(axis = 0)
+    gamma[equation_count, equation_count] = gamma_block.sum()
+    beta = theta[slices['beta']]
+    eta = theta[slices['eta']].reshape(equation_count, demographic_count)
+    lambda_ = theta[slices['lambda']] if quadratic else np.zeros(equation_count)
+    return {
+        'alpha': np.append(alpha, 1 - alpha.sum()),
+        'beta': np.append(beta, - beta.sum()),
+        'eta': np.vstack([eta, - eta.sum(axis = 0)]),
+        'gamma': gamma,
+        'lambda': np.append(lambda_, - lambda_.sum()),
+        'rho': theta[slices['rho']],
+        }
+
+
+def compute_shares(parameters, log_prices, log_expenditure, demographics, alpha_0 = 5):
+    """Renvoie les parts prédites (ménages x biens), r, 1 / (b(p) c(p, z)) et les coefficients beta_i + eta_i'z"""
+    alpha, gamma = parameters['alpha'], parameters['gamma']
+    log_a = alpha_0 + log_prices.dot(alpha) + .5 * (log_prices.dot(gamma) * log_prices).sum(axis = 1)
+    beta_z = parameters['beta'] + demographics.dot(parameters['eta'].T)
+    inverse_bc = np.exp(- (beta_z * log_prices).sum(axis = 1))
+    r = log_expenditure - np.log(1 + demographics.dot(parameters['rho'])) - log_a
+    shares = (
+        alpha + log_prices.dot(gamma) + beta_z * r[:, np.newaxis] +
+        parameters['lambda'] * (inverse_bc * r ** 2)[:, np.newaxis]
+        )
+    return shares, r, inverse_bc, beta_z
+
+
+def compute_jacobian(parameters, log_prices, log_expenditure, demographics, alpha_0 = 5, quadratic = True):
+    """Renvoie les parts prédites des good_count - 1 premiers biens et leur jacobienne (ménages x équations x
+    paramètres libres)"""
+    shares, r, inverse_bc, beta_z = compute_shares(parameters, log_prices, log_expenditure, demographics, alpha_0)
+    good_count = log_prices.shape[1]
+    equation_count = good_count - 1
+    identity = np.eye(equation_count)
+    lambda_ = parameters['lambda'][:equation_count]
+    # Prix relatifs au dernier bien, seuls à intervenir une fois les restrictions imposées
+    relative_log_prices = log_prices[:, :equation_count] - log_prices[:, equation_count:]
+    dw_dr = beta_z[:, :equation_count] + 2 * lambda_ * (inverse_bc * r)[:, np.newaxis]
+    lambda_r2_inverse_bc = lambda_ * (inverse_bc * r ** 2)[:, np.newaxis]
+
+    jacobian_alpha = identity - dw_dr[:, :, np.newaxis] * relative_log_prices[:, np.newaxis, :]
+    rows, columns = np.triu_indices(equation_count)
+    factor = np.where(rows == columns, .5, 1)
+    jacobian_gamma = factor * (
+        identity[:, rows] * relative_log_prices[:, np.newaxis, columns] +
+        identity[:, columns] * relative_log_prices[:, np.newaxis, rows] -
+        dw_dr[:, :, np.newaxis] * (relative_log_prices[:, rows] * relative_log_prices[:, columns])[:, np.newaxis, :]
+        )
+    jacobian_beta = (
+        identity * r[:, np.newaxis, np.newaxis] -
+        lambda_r2_inverse_bc[:, :, np.newaxis] * relative_log_prices[:, np.newaxis, :]
+        )
+    jacobian_eta = (jacobian_beta[:, :, :, np.newaxis] * demographics[:, np.newaxis, np.newaxis, :]).reshape(
+        len(r), equation_count, -1)
+    jacobian_rho = - dw_dr[:, :, np.newaxis] * (
+        demographics / (1 + demographics.dot(parameters['rho']))[:, np.newaxis])[:, np.newaxis, :]
+    blocks = [jacobian_alpha, jacobian_gamma, jacobian_beta, jacobian_eta]
+    if quadratic:
+        blocks.append(identity * (inverse_bc * r ** 2)[:, np.newaxis, np.newaxis])
+    blocks.append(jacobian_rho)
+    return shares[:, :equation_count], np.concatenate(blocks, axis = 2)
+
+
+def estimate_quaids(shares, log_prices, log_expenditure, demographics = None, alpha_0 = 5, quadratic = True,
+        max_iterations = 200, tolerance = 1e-8):
+    """Estime les paramètres par SUR non linéaire itéré et renvoie (paramètres, covariance des résidus)"""
+    household_count, good_count = shares.shape
+    equation_count = good_count - 1
+    if demographics is None:
+        demographics = np.zeros((household_count, 0))
+    demographic_count = demographics.shape[1]
+    slices, parameter_count = get_parameter_slices(good_count, demographic_count, quadratic)
+    theta = np.zeros(parameter_count)
+    theta[slices['alpha']] = shares[:, :equation_count].mean(axis = 0)
+    sigma = np.eye(equation_count)
+
+    def get_residuals(theta):
+        parameters = unpack_parameters(theta, good_count, demographic_count, quadratic)
+        predicted_shares = compute_shares(parameters, log_prices, log_expenditure, demographics, alpha_0)[0]
+        return shares[:, :equation_count] - predicted_shares[:, :equation_count]
+
+    for iteration in range(max_iterations):
+        # sigma^-1 = L L' : la somme des e' sigma^-1 e est la norme des résidus e' L
+        whitening = np.linalg.cholesky(np.linalg.inv(sigma))
+        predicted_shares, jacobian = compute_jacobian(
+            unpack_parameters(theta, good_count, demographic_count, quadratic),
+            log_prices, log_expenditure, demographics, alpha_0, quadratic)
+        residuals = shares[:, :equation_count] - predicted_shares
+        whitened_residuals = residuals.dot(whitening).ravel()
+        whitened_jacobian = np.einsum('hjp,ji->hip', jacobian, whitening).reshape(
+            household_count * equation_count, parameter_count)
+        step = np.linalg.lstsq(whitened_jacobian, whitened_residuals, rcond = -1)[0]
+        # Pas de Gauss-Newton divisé par deux tant que l'objectif ne diminue pas
+        objective = whitened_residuals.dot(whitened_residuals)
+        step_size = 1
+        while step_size > 1e-10:
+            new_residuals = get_residuals(theta + step_size * step)
+            new_whitened_residuals = new_residuals.dot(whitening).ravel()
+            if np.isfinite(new_whitened_residuals).all() and \
+                    new_whitened_residuals.dot(new_whitened_residuals) <= objective:
+                theta = theta + step_size * step
+                residuals = new_residuals
+                break
+            step_size /= 2
+        sigma = residuals.T.dot(residuals) / household_count
+        # La convergence se juge sur le pas de Gauss-Newton complet : le pas retenu est réduit par la recherche linéaire
+        if np.abs(step).max() < tolerance:
+            log.info(u'QUAIDS estimation converged after {} iterations'.format(iteration + 1))
+            break
+        if step_size <= 1e-10:
+            log.warning(u'QUAIDS estimation stopped after {} iterations: the line search stalled'.format(
+                iteration + 1))
+            break
+    else:
+        log.warning(u'QUAIDS estimation did not converge after {} iterations'.format(max_iterations))
+    return unpack_parameters(theta, good_count, demographic_count, quadratic), sigma
+
+
+def compute_elasticities(parameters, log_prices, log_expenditure, demographics, alpha_0 = 5):
+    """Renvoie les élasticités dépense (ménages x biens) et prix non compensées (ménages x biens x biens)"""
+    shares, r, inverse_bc, beta_z = compute_shares(parameters, log_prices, log_expenditure, demographics, alpha_0)
+    lambda_ = parameters['lambda']
+    dw_dlog_expenditure = beta_z + 2 * lambda_ * (inverse_bc * r)[:, np.newaxis]
+    dw_dlog_prices = (
+        parameters['gamma'] -
+        dw_dlog_expenditure[:, :, np.newaxis] *
+        (parameters['alpha'] + log_prices.dot(parameters['gamma']))[:, np.newaxis, :] -
+        lambda_[:, np.newaxis] * beta_z[:, np.newaxis, :] * (inverse_bc * r ** 2)[:, np.newaxis, np.newaxis]
+        )
+    expenditure_elasticities = 1 + dw_dlog_expenditure / shares
+    price_elasticities = dw_dlog_prices / shares[:, :, np.newaxis] - np.eye(shares.shape[1])
+    return expenditure_elasticities, price_elasticities
+
+
+def estimate_elasticities(data_frame, good_count = 4, demographic_columns = None,
+        expenditure_column = 'depenses_par_uc', alpha_0 = 5, quadratic = True):
+    """Estime le système sur une table produite par les builders (parts w1..wn, prix p1..pn) et renvoie les colonnes
+    elas_exp_i et elas_price_i_j de chaque ménage, comme estat expenditure et estat uncompensated"""
+    goods = range(1, good_count + 1)
+    if demographic_columns is None:
+        demographic_columns = list()
+    shares = data_frame[['w{}'.format(good) for good in goods]].values.astype(float)
+    log_prices = np.log(data_frame[['p{}'.format(good) for good in goods]].values.astype(float))
+    log_expenditure = np.log(data_frame[expenditure_column].values.astype(float))
+    demographics = data_frame[demographic_columns].values.astype(float).reshape(len(data_frame), -1)
+    parameters, _ = estimate_quaids(shares, log_prices, log_expenditure, demographics, alpha_0, quadratic)
+    expenditure_elasticities, price_elasticities = compute_elasticities(
+        parameters, log_prices, log_expenditure, demographics, alpha_0)
+    elasticities = pd.DataFrame(
+        expenditure_elasticities,
+        columns = ['elas_exp_{}'.format(good) for good in goods],
+        index = data_frame.index,
+        )
+    for i in goods:
+        for j in goods:
+            elasticities['elas_price_{}_{}'.format(i, j)] = price_elasticities[:, i - 1, j - 1]
+    return elasticities
+
+
+def get_energy_elasticities_all_years(data_frame_path = None):
+    """Renvoie les élasticités de la spécification toutes années confondues de estimation_quaids_energy.do
+
+    L'estimation porte sur data_frame_energy_all_years.csv (cf. aids_dataframe_builder) ou, à défaut, sur la
+    réunion des data_frame_energy_<année>.csv, sans les ménages qui ne consomment pas de carburants. Elle est mise en
+    cache tant que les fichiers ne changent pas.
+    """
+    if data_frame_path is None:
+        quaids_directory = os.path.join(assets_directory, 'openfisca_france_indirect_taxation', 'assets', 'quaids')
+        data_frame_path = os.path.join(quaids_directory, 'data_frame_energy_all_years.csv')
+        data_frame_paths = [data_frame_path] if os.path.exists(data_frame_path) else [
+            os.path.join(quaids_directory, 'data_frame_energy_{}.csv'.format(year))
+            for year in [2000, 2005, 2011]
+            ]
+    else:
+        data_frame_paths = [data_frame_path]
+    cache_file_path = os.path.join(
+        get_cache_directory('quaids'),
+        'elasticities_{}_v{}.pickle'.format(
+            '_'.join(get_file_hash(file_path)[:16] for file_path in data_frame_paths),
+            quaids_cache_version,
+            ),
+        )
+    if os.path.exists(cache_file_path):
+        try:
+            with open(cache_file_path, 'rb') as cache_file:
+                return cPickle.load(cache_file)
+        except Exception:
+            log.warning(u'Ignoring corrupted cache file {}'.format(cache_file_path))
+
+    data_frame = pd.concat(
+        [pd.read_csv(file_path, sep = ',') for file_path in data_frame_paths],
+        ignore_index = True,
+        ).fillna(0)
+    # Les élasticités des ménages exclus de l'estimation sont manquantes, comme dans la sortie de Stata
+    elasticities = estimate_elasticities(
+        data_frame.query('w1 != 0'),
+        demographic_columns = [column for column in energy_demographic_columns if column in data_frame.columns],
+        ).reindex(data_frame.index)
+    elasticities['ident_men'] = data_frame['ident_men']
+    elasticities['year'] = data_frame['year']
+    write_atomically(
+        cache_file_path,
+        lambda cache_file: cPickle.dump(elasticities, cache_file, cPickle.HIGHEST_PROTOCOL),
+        )
+    return elasticities
+
+
+def get_elasticities(year):
+    """Remplace aids_estimation_from_stata.get_elasticities, sans passer par Stata"""
+    data_quaids = get_energy_elasticities_all_years().query('year == @year').astype('float32')
+    liste_elasticities = [column for column in data_quaids.columns if column[:4] == 'elas']
+    dataframe = data_quaids[liste_elasticities + ['ident_men', 'year']].copy()
+
+    dataframe = dataframe.fillna(0)
+
+    assert not dataframe.ident_men.duplicated().any(), 'Some housholds are duplicated'
+
+    return dataframe
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level = logging.INFO, stream = sys.stdout)
+    print get_elasticities(2011).describe()
@@ -5,21 +5,29 @@ Created on Wed Feb 03 09:58:01 2016
 @author: thomas.douenne
 """
 
+import numpy
 import pandas
 
-from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_dataframe_builder_energy import \
-    aggregates_data_frame, df, df_depenses_prix, data_frame_for_reg
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_dataframe_builder import \
+    build_aids_data_frames, get_postes_by_categorie, load_depenses, variantes
 from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_price_index_builder import \
-    df_indice_prix_produit
+    get_df_indice_prix_produit
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.utils import get_matrice_prix
+
+df_indice_prix_produit = get_df_indice_prix_produit()
+aggregates_data_frame, postes, _ = load_depenses(2011)
+data_frame_for_reg = build_aids_data_frames(['energy'], write = False)['energy']
+data_frame_2011 = data_frame_for_reg[data_frame_for_reg['year'] == 2011]
 
 """ Check if depenses_tot is equal to the sum of all expenses """
 
 aggregates_data_frame['dep_tot'] = 0
 for i in range(1, 13):
     aggregates_data_frame['dep_tot'] += aggregates_data_frame['coicop12_{}'.format(i)]
-aggregates_data_frame['diff'] = aggregates_data_frame['dep_tot'] - aggregates_data_frame['depenses_tot']
-assert (aggregates_data_frame['diff'] < 0.0001).any()[(aggregates_data_frame['diff'] < 0.0001).any()], \
-    'Issue in depenses_tot calculation'
+check = pandas.merge(aggregates_data_frame[['ident_men', 'dep_tot']], data_frame_2011[['ident_men', 'depenses_tot']],
+    on = 'ident_men')
+assert ((check['dep_tot'] - check['depenses_tot']) < 0.0001).any(), 'Issue in depenses_tot calculation'
+del check
 
 
 """ Check that the sum of the share for the four categories is 1 """
@@ -66,42 +74,27 @@ assert len(df_bien) == len(df_bien_to_merge), \
     'The price indexes is not filled for some goods in df_indice_prix_produit (or before)'
 
 
-""" Check if the goods that drop from the dataframe in the match with prices are meaningful goods or not. If the test
-fails, it means that some meaningful goods are not matched with any price. This test achieves the same goal as the
-previous one but in a later stage of the dataframe construction """
-
-check = df.drop_duplicates(subset = ['indice_prix_produit'], keep = 'last')
-check = check['indice_prix_produit']
-check2 = df_depenses_prix.drop_duplicates(subset = ['indice_prix_produit'], keep = 'last')
-check2 = check2['indice_prix_produit']
-common_check = [x for x in check]
-common_check2 = [x for x in check2]
-common = [x for x in common_check if x not in common_check2]
-del check, check2, common_check, common_check2
-for element in common:
-    short_name = element[13:15]
-    assert short_name == '99' or short_name == '13', 'Some goods are not matched with any price'
-del common, short_name, x
-
-
-""" Check if the shares of each poste in their broad category sum to 1 """
+""" Check if all the postes of the budget have a price in the matrix of prices. If the test fails, it means that
+some meaningful goods are not matched with any price. This test achieves the same goal as the previous one but in a
+later stage of the dataframe construction """
 
-for i in range(0, 100):
-    df_ident_men_0 = df_depenses_prix[df_depenses_prix['ident_men'] == '{}'.format(i)]
-    df_ident_men_0_alime = df_ident_men_0[df_ident_men_0['type_bien'] == 'alime']
-    assert 0.999 < df_ident_men_0_alime['part_bien_categorie'].sum() < 1.001 or \
-        -0.001 < df_ident_men_0_alime['part_bien_categorie'].sum() < 0.001
+vagues = numpy.unique(aggregates_data_frame['vag'].values.astype(int))
+matrice_prix = get_matrice_prix(df_indice_prix_produit, postes, vagues)
+assert not numpy.isnan(matrice_prix).any(), 'Some goods are not matched with any price'
 
-    df_ident_men_0_autre = df_ident_men_0[df_ident_men_0['type_bien'] == 'autre']
-    assert 0.999 < df_ident_men_0_autre['part_bien_categorie'].sum() < 1.001 or \
-        -0.001 < df_ident_men_0_autre['part_bien_categorie'].sum() < 0.001
 
-    df_ident_men_0_carbu = df_ident_men_0[df_ident_men_0['type_bien'] == 'carbu']
-    assert 0.999 < df_ident_men_0_carbu['part_bien_categorie'].sum() < 1.001 or \
-        -0.001 < df_ident_men_0_carbu['part_bien_categorie'].sum() < 0.001
+""" Check if the price index of each category is a weighted mean of the prices of its postes (the price of carburants
+is then weighted by the fuel of the vehicles of the household) """
 
-    df_ident_men_0_carbu = df_ident_men_0[df_ident_men_0['type_bien'] == 'logem']
-    assert 0.999 < df_ident_men_0_carbu['part_bien_categorie'].sum() < 1.001 or \
-        -0.001 < df_ident_men_0_carbu['part_bien_categorie'].sum() < 0.001
+postes_by_categorie = get_postes_by_categorie(variantes['energy'], postes)
+for index, (categorie, postes_categorie) in enumerate(postes_by_categorie.items()):
+    if categorie == 'carbu':
+        continue
+    prix_categorie = matrice_prix[:, [postes.index(poste) for poste in postes_categorie]]
+    prix_min = pandas.Series(prix_categorie.min(axis = 1), index = vagues)[data_frame_2011['vag']].values
+    prix_max = pandas.Series(prix_categorie.max(axis = 1), index = vagues)[data_frame_2011['vag']].values
+    indice_prix = data_frame_2011['p{}'.format(index + 1)].values
+    assert ((prix_min - 0.001 < indice_prix) & (indice_prix < prix_max + 0.001)).all(), \
+        'The price index of {} is not a weighted mean of the prices of its postes'.format(categorie)
 
-del df_ident_men_0, df_ident_men_0_autre, df_ident_men_0_alime, df_ident_men_0_carbu, i
+del categorie, index, indice_prix, postes_categorie, prix_categorie, prix_max, prix_min
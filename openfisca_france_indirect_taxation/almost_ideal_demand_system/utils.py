@@ -9,8 +9,11 @@ from __future__ import division
 
 import os
 import pkg_resources
+import numpy as np
 import pandas as pd
 
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_price_index_builder import get_mois_vagues
+
 
 def add_area_dummy(dataframe):
     areas = ['rural', 'villes_petites', 'villes_moyennes', 'villes_grandes', 'agglo_paris']
@@ -47,6 +50,46 @@ def add_vag_dummy(dataframe):
     return dataframe
 
 
+def get_matrice_prix(df_indice_prix_produit, postes, vagues):
+    """Renvoie la matrice vagues x postes des indices de prix de df_indice_prix_produit (NaN si le prix du poste
+    n'est pas renseigné pour la vague)"""
+    prix = df_indice_prix_produit[['bien', 'vag', 'prix']].copy()
+    prix['vag'] = prix['vag'].astype(int)
+    prix['prix'] = prix['prix'].astype(float)
+    return prix.pivot(index = 'vag', columns = 'bien', values = 'prix').reindex(
+        index = vagues, columns = postes).values
+
+
+def get_indicatrices_categories(postes, postes_by_categorie):
+    """Renvoie la matrice postes x catégories qui vaut 1 quand le poste appartient à la catégorie"""
+    index_by_poste = dict((poste, index) for index, poste in enumerate(postes))
+    indicatrices = np.zeros((len(postes), len(postes_by_categorie)))
+    for colonne, postes_categorie in enumerate(postes_by_categorie.values()):
+        indicatrices[[index_by_poste[poste] for poste in postes_categorie], colonne] = 1
+    return indicatrices
+
+
+def compute_indices_prix(depenses, prix, indicatrices, depenses_categories = None):
+    """Calcule les indices de prix pondérés (cf. Lewbel) de chaque catégorie de biens pour chaque ménage
+
+    depenses et prix sont des matrices ménages x postes, indicatrices la matrice postes x catégories de
+    get_indicatrices_categories. L'indice d'une catégorie est la somme des prix des postes pondérés par leur part dans
+    les dépenses de la catégorie, soit la somme des dépenses multipliées par les prix divisée par les dépenses de la
+    catégorie : deux produits matriciels suffisent. Les postes sans prix (NaN) n'y contribuent pas et l'indice est nul
+    quand le ménage ne dépense rien dans la catégorie. Renvoie les dépenses (depenses_categories si elles sont fournies)
+    et les indices de prix ménages x catégories.
+    """
+    if depenses_categories is None:
+        depenses_categories = depenses.dot(indicatrices)
+    depenses_ponderees = np.where(np.isnan(prix), 0, depenses * prix).dot(indicatrices)
+    indices_prix = np.where(
+        depenses_categories != 0,
+        depenses_ponderees / np.where(depenses_categories != 0, depenses_categories, 1),
+        0,
+        )
+    return depenses_categories, indices_prix
+
+
 def electricite_only(dataframe):
     energie_logement_non_elec = ['poste_coicop_452', 'poste_coicop_4522', 'poste_coicop_453', 'poste_coicop_454',
         'poste_coicop_455', 'poste_coicop_4552']
@@ -71,9 +114,14 @@ def indices_prix_carbus(year):
             'openfisca_france_indirect_taxation',
             'assets',
             'prix',
-            'prix_mensuel_carbu_match_to_vag.csv'
-            ), sep =';', decimal = ','
+            'prix_mensuel_carburants.csv'
+            ), sep =';'
         )
+    # On retient pour chaque vague le prix de son premier mois
+    mois_vagues = get_mois_vagues()
+    prix_carbu = prix_carbu.set_index(prix_carbu['Date'].str.replace('/', '_')).reindex(
+        mois_vagues['premier_mois'].values)
+    prix_carbu['vag'] = mois_vagues.index.values
     prix_carbu = prix_carbu[['diesel_ttc'] + ['super_95_ttc'] + ['vag']].astype(float)
 
     quantite_carbu_vp_france = pd.read_csv(os.path.join(default_config_files_directory,
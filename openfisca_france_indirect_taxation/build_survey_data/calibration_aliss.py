@@ -12,6 +12,8 @@ import pkg_resources
 from openfisca_survey_manager.survey_collections import SurveyCollection
 from openfisca_survey_manager import default_config_files_directory as config_files_directory
 
+from openfisca_france_indirect_taxation.utils import get_cache_directory
+
 
 elasticities_path = os.path.join(
     pkg_resources.get_distribution('openfisca_france_indirect_taxation').location,
@@ -103,7 +105,10 @@ def compute_kantar_elasticities(aliss):
         )
 
     # budget shares
+    # Computed budget shares go to the user cache directory, not into the package assets
     budget_share_path = os.path.join(elasticities_path, 'budget_share.csv')
+    if not os.path.exists(budget_share_path):
+        budget_share_path = os.path.join(get_cache_directory('aliss'), 'budget_share.csv')
     if os.path.exists(budget_share_path):
         kantar_budget_share = pandas.read_csv(budget_share_path)
     else:
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Correspondance entre les postes des enquêtes BdF et les postes COICOP
+
+Les codes COICOP normalisés, les gros postes et les noms des variables poste_coicop_* sont calculés une fois par
+code, et la table de chaque année est mise en cache dans le répertoire de cache utilisateur.
+"""
+
+
+from __future__ import division
+
+
+import inspect
+import logging
+import os
+
+
+from openfisca_france_indirect_taxation.utils import assets_directory, get_cached_json, get_transfert_data_frames
+
+
+log = logging.getLogger(__name__)
+
+
+code_coicop_by_code = dict()
+grosposte_by_poste_coicop = dict()
+# Table raw BdF poste -> (code COICOP normalisé, gros poste, variable poste_coicop_*) par année
+coicop_mapping_by_year = dict()
+
+
+def compute_code_coicop(code):
+    '''Normalize_coicop est function d'harmonisation de la colonne d'entiers posteCOICOP de la table
+matrice_passage_data_frame en la transformant en une chaine de 5 caractères afin de pouvoir par la suite agréger les
+postes COICOP selon les 12 postes agrégés de la nomenclature de la comptabilité nationale. Chaque poste contient 5
+caractères, les deux premiers (entre 01 et 12) correspondent à ces postes agrégés de la CN.
+
+    '''
+    # TODO: vérifier la formule !!!
+
+    try:
+        code = unicode(code)
+    except Exception:
+        code = code
+    if len(code) == 3:
+        code_coicop = "0" + code + "0"  # "{0}{1}{0}".format(0, code)
+    elif len(code) == 4:
+        if not code.startswith("0") and not code.startswith("1") and not code.startswith("45") and \
+                not code.startswith("9"):
+            code_coicop = "0" + code
+            # 022.. = cigarettes et tabacs => on les range avec l'alcool (021.0)
+        elif code.startswith("0"):
+            code_coicop = code + "0"
+        elif code in ["1151", "1181", "4552", "4522", "4511", "9122", "9151", "9211", "9341", "1411"]:
+            # 1151 = Margarines et autres graisses végétales
+            # 1181 = Confiserie
+            # 04522 = Achat de butane, propane
+            # 04511 = Facture EDF GDF non dissociables
+            code_coicop = "0" + code
+        else:
+            # 99 = loyer, impots et taxes, cadeaux...
+            code_coicop = code + "0"
+    elif len(code) == 5:
+        if not code.startswith("13") and not code.startswith("44") and not code.startswith("51"):
+            code_coicop = code
+        else:
+            code_coicop = "99000"
+    else:
+        log.error("Problematic code {}".format(code))
+        raise ValueError("Problematic code {}".format(code))
+    return code_coicop
+
+
+def normalize_code_coicop(code):
+    """Version mise en cache de compute_code_coicop"""
+    try:
+        return code_coicop_by_code[code]
+    except KeyError:
+        code_coicop = code_coicop_by_code[code] = compute_code_coicop(code)
+        return code_coicop
+    except TypeError:  # Unhashable code
+        return compute_code_coicop(code)
+
+
+def get_grosposte(code_coicop):
+    """Renvoie le gros poste (de 1 à 12, ou 99) d'un code COICOP"""
+    return int(normalize_code_coicop(code_coicop)[0:2])
+
+
+def get_poste_coicop_column_name(column):
+    """Renvoie le nom de variable d'un code COICOP normalisé ('01110' -> 'poste_coicop_111')"""
+    if not column.isdigit():
+        return column
+    if column.endswith('0'):
+        column = column[:-1]
+    if column.startswith('0'):
+        column = column[1:]
+    return 'poste_coicop_' + column
+
+
+def get_grosposte_of_poste_coicop(column):
+    """Renvoie le gros poste (de 1 à 12, ou 99) d'une variable poste_coicop_*"""
+    if column in grosposte_by_poste_coicop:
+        return grosposte_by_poste_coicop[column]
+    coicop = column.replace('poste_coicop_', '')
+    if coicop[:1] != '1' and coicop[:1] != '9':
+        grosposte = int(coicop[:1])
+    else:
+        if len(coicop) == 3:
+            grosposte = int(coicop[:1])
+        elif len(coicop) == 5:
+            grosposte = int(coicop[:2])
+        elif coicop in ['1151', '1181', '1411', '9122', '9151', '9211', '9341']:
+            grosposte = int(coicop[:1])
+        elif coicop[:2] == '99' or coicop[:2] == '13':
+            grosposte = 99
+        else:
+            grosposte = int(coicop[:2])
+    grosposte_by_poste_coicop[column] = grosposte
+    return grosposte
+
+
+def get_matrice_passage_file_path(year):
+    matrice_passage_file_path = os.path.join(
+        assets_directory,
+        'legislation',
+        'Matrice passage {}-COICOP.csv'.format(year),
+        )
+    if os.path.exists(matrice_passage_file_path):
+        return matrice_passage_file_path
+    return os.path.join(assets_directory, 'legislation', 'Matrice passage {}-COICOP.xls'.format(year))
+
+
+def build_coicop_mapping(year):
+    matrice_passage_data_frame, _ = get_transfert_data_frames(year)
+    matrice_passage_data_frame = matrice_passage_data_frame[['poste{}'.format(year), 'posteCOICOP']].dropna()
+    coicop_mapping = list()
+    for poste_bdf, poste_coicop in zip(
+            matrice_passage_data_frame['poste{}'.format(year)].tolist(),
+            matrice_passage_data_frame['posteCOICOP'].tolist(),
+            ):
+        code_coicop = normalize_code_coicop(poste_coicop)
+        coicop_mapping.append(
+            (poste_bdf, code_coicop, get_grosposte(code_coicop), get_poste_coicop_column_name(code_coicop)))
+    return coicop_mapping
+
+
+def get_coicop_mapping(year):
+    """Renvoie la table poste BdF -> (code COICOP normalisé, gros poste, variable poste_coicop_*) de l'année
+
+    Comme dans la matrice de passage, la dernière ligne d'un poste BdF l'emporte.
+    """
+    if year not in coicop_mapping_by_year:
+        coicop_mapping = get_cached_json(
+            'coicop_mapping_{}'.format(year),
+            [get_matrice_passage_file_path(year), inspect.getsourcefile(build_coicop_mapping)],
+            lambda: build_coicop_mapping(year),
+            )
+        coicop_mapping_by_year[year] = dict(
+            (poste_bdf, (code_coicop, grosposte, poste_coicop))
+            for poste_bdf, code_coicop, grosposte, poste_coicop in coicop_mapping
+            )
+    return coicop_mapping_by_year[year]
+
+
+def get_codes_coicop(postes_bdf, year):
+    """Renvoie les codes COICOP normalisés des postes BdF (les postes absents de la matrice de passage donnent le
+    même code que normalize_code_coicop(None))"""
+    coicop_mapping = get_coicop_mapping(year)
+    missing_code_coicop = None
+    codes_coicop = list()
+    for poste_bdf in postes_bdf:
+        mapping = coicop_mapping.get(poste_bdf)
+        if mapping is None:
+            if missing_code_coicop is None:
+                missing_code_coicop = normalize_code_coicop(None)
+            codes_coicop.append(missing_code_coicop)
+        else:
+            codes_coicop.append(mapping[0])
+    return codes_coicop
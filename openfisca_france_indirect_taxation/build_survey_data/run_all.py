@@ -26,10 +26,14 @@
 from __future__ import division
 
 
+import collections
 import logging
+import multiprocessing
 import os
-import pandas
 import numpy
+import Queue
+import time
+import traceback
 
 
 from openfisca_survey_manager.survey_collections import SurveyCollection
@@ -53,62 +57,129 @@ from openfisca_france_indirect_taxation.build_survey_data.step_3_homogeneisation
 from openfisca_france_indirect_taxation.build_survey_data.step_4_homogeneisation_revenus_menages \
     import build_homogeneisation_revenus_menages
 
-from openfisca_survey_manager.temporary import TemporaryStore
+from openfisca_france_indirect_taxation.build_survey_data.step_store import read_step_table
+from openfisca_france_indirect_taxation.columnar_storage import dump_columnar_input_data_frame, get_file_fingerprint
 
 from openfisca_france_indirect_taxation.build_survey_data.utils \
-    import ident_men_dtype
+    import downcast_floats, ident_men_dtype, reconcile_columns
 
 
 log = logging.getLogger(__name__)
 
 
-def run_all(year_calage = 2011, year_data_list = [1995, 2000, 2005, 2011]):
+# Fonctions des étapes par nom d'étape, leurs dépendances sont déclarées par step_store_decorator
+step_function_by_step = collections.OrderedDict(
+    (step_function.step, step_function)
+    for step_function in [
+        build_depenses_homogenisees,
+        build_imputation_loyers_proprietaires,
+        build_homogeneisation_vehicules,
+        build_homogeneisation_caracteristiques_sociales,
+        build_homogeneisation_revenus_menages,
+        ]
+    )
 
-    temporary_store = TemporaryStore.create(file_name = "indirect_taxation_tmp")
+
+def run_step(step, year, force = False):
+    """Exécute une étape dans un processus du pool et renvoie sa durée et, si elle a échoué, sa trace d'erreur"""
+    start = time.time()
+    try:
+        step_function_by_step[step](year = year, force = force)
+    except Exception:
+        return time.time() - start, traceback.format_exc()
+    return time.time() - start, None
+
+
+def run_steps(years_data, processes = None, force = False):
+    """Exécute les étapes d'homogénéisation des années de données dans un pool de processus
+
+    Une étape est lancée dès que ses étapes amont de la même année sont terminées, si bien que les étapes
+    indépendantes et les différentes années tournent en parallèle. Les étapes dont la clé (enquête brute, code
+    source, année et étapes amont) n'a pas changé ne sont pas recalculées, sauf si force est vrai. Si une étape
+    échoue, le pool est arrêté. Renvoie la durée de chaque (année, étape), dans l'ordre où elles se sont terminées.
+    """
+    remaining_nodes = [(year, step) for year in sorted(set(years_data)) for step in step_function_by_step]
+    duration_by_node = collections.OrderedDict()
+    # Le callback de apply_async, appelé par le pool à la fin de chaque étape, débloque la boucle ci-dessous
+    finished_nodes = Queue.Queue()
+    running_node_count = 0
+    pool = multiprocessing.Pool(processes = processes)
+    try:
+        while True:
+            for node in list(remaining_nodes):
+                year, step = node
+                if all((year, upstream_step) in duration_by_node
+                        for upstream_step in step_function_by_step[step].upstream_steps):
+                    log.info(u'Starting step {} for year {}'.format(step, year))
+                    pool.apply_async(
+                        run_step,
+                        (step, year, force),
+                        callback = lambda result, node = node: finished_nodes.put((node, result)),
+                        )
+                    running_node_count += 1
+                    remaining_nodes.remove(node)
+            if not running_node_count:
+                break
+            node, (duration, error) = finished_nodes.get()
+            running_node_count -= 1
+            if error is not None:
+                raise RuntimeError(u'Step {} failed for year {}:\n{}'.format(node[1], node[0], error))
+            duration_by_node[node] = duration
+            log.info(u'Finished step {} for year {} in {:.1f} s'.format(node[1], node[0], duration))
+        if remaining_nodes:
+            raise ValueError(u'Steps {} cannot be run since their upstream steps are missing'.format(
+                remaining_nodes))
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return duration_by_node
+
+
+def run_all(year_calage = 2011, year_data_list = [1995, 2000, 2005, 2011], build_steps = True):
 
     # Quelle base de données choisir pour le calage ?
     year_data = find_nearest_inferior(year_data_list, year_calage)
 
-    # 4 étape parallèles d'homogénéisation des données sources :
-    # Gestion des dépenses de consommation:
-    build_depenses_homogenisees(year = year_data)
-    build_imputation_loyers_proprietaires(year = year_data)
+    # 4 étape parallèles d'homogénéisation des données sources
+    if build_steps:
+        run_steps([year_data])
 
-    depenses = temporary_store["depenses_bdf_{}".format(year_calage)]
+    # Gestion des dépenses de consommation:
+    depenses = read_step_table('1_2', year_data, "depenses_bdf_{}".format(year_calage))
     depenses.index = depenses.index.astype(ident_men_dtype)
-    depenses_by_grosposte = temporary_store["depenses_by_grosposte_{}".format(year_calage)]
+    depenses_by_grosposte = read_step_table('1_1', year_data, "depenses_by_grosposte_{}".format(year_calage))
     depenses_by_grosposte.index = depenses_by_grosposte.index.astype(str)
 
     # Gestion des véhicules:
-    build_homogeneisation_vehicules(year = year_data)
     if year_calage != 1995:
-        vehicule = temporary_store['automobile_{}'.format(year_data)]
+        vehicule = read_step_table('2', year_data, 'automobile_{}'.format(year_data))
         vehicule.index = vehicule.index.astype(ident_men_dtype)
     else:
         vehicule = None
 
     # Gestion des variables socio démographiques:
-    build_homogeneisation_caracteristiques_sociales(year = year_data)
-    menage = temporary_store['donnes_socio_demog_{}'.format(year_data)]
+    menage = read_step_table('3', year_data, 'donnes_socio_demog_{}'.format(year_data))
     menage.index = menage.index.astype(ident_men_dtype)
 
     # Gestion des variables revenus:
-    build_homogeneisation_revenus_menages(year = year_data)
-    revenus = temporary_store["revenus_{}".format(year_calage)]
+    revenus = read_step_table('4', year_data, "revenus_{}".format(year_calage))
     revenus.index = revenus.index.astype(ident_men_dtype)
 
-    temporary_store.close()
-
     # Concaténation des résultas de ces 4 étapes
-    preprocessed_data_frame_by_name = dict(
-        revenus = revenus,
-        vehicule = vehicule,
-        menage = menage,
-        depenses = depenses,
-        depenses_by_grosposte = depenses_by_grosposte
-        )
+    preprocessed_data_frame_by_name = collections.OrderedDict([
+        ('revenus', revenus),
+        ('vehicule', vehicule),
+        ('menage', menage),
+        ('depenses', depenses),
+        ('depenses_by_grosposte', depenses_by_grosposte),
+        ])
 
     for name, preprocessed_data_frame in preprocessed_data_frame_by_name.iteritems():
+        if preprocessed_data_frame is None:
+            continue
         assert preprocessed_data_frame.index.name == 'ident_men', \
             'Index is labelled {} instead of ident_men in data frame {} for year {}'.format(
                 preprocessed_data_frame.index.name, name, year_data)
@@ -116,10 +187,9 @@ def run_all(year_calage = 2011, year_data_list = [1995, 2000, 2005, 2011]):
         assert preprocessed_data_frame.index.dtype == numpy.dtype('O'), "index for {} is {}".format(
             name, preprocessed_data_frame.index.dtype)
 
-    data_frame = pandas.concat(
-        preprocessed_data_frame_by_name.values(),
-        axis = 1,
-        )
+    # Les colonnes communes à plusieurs tables sont fusionnées ici, ce qui évite les colonnes dupliquées
+    # qui font échouer HDFStore (https://github.com/pydata/pandas/issues/6240)
+    data_frame = reconcile_columns(preprocessed_data_frame_by_name)
 
     if year_data == 2005:
         for vehicule_variable in ['veh_tot', 'veh_essence', 'veh_diesel', 'pourcentage_vehicule_essence']:
@@ -145,11 +215,7 @@ def run_all(year_calage = 2011, year_data_list = [1995, 2000, 2005, 2011]):
     except ValueError, e:
         log.info('ignoring reset_index because {}'.format(e))
 
-    # Remove duplicated colums causing bug with HDFStore
-    # according to https://github.com/pydata/pandas/issues/6240
-    # using solution form stackoverflow
-    # http://stackoverflow.com/questions/16938441/how-to-remove-duplicate-columns-from-a-dataframe-using-python-pandas
-    data_frame = data_frame.T.groupby(level = 0).first().T
+    data_frame = downcast_floats(data_frame)
 
     log.info('Saving the openfisca indirect taxation input dataframe')
     try:
@@ -168,17 +234,32 @@ def run_all(year_calage = 2011, year_data_list = [1995, 2000, 2005, 2011]):
         hdf5_file_path = hdf5_file_path,
         )
     survey.insert_table(name = table, data_frame = data_frame)
+    # Same content as read back from the HDF5 table by surveys.get_input_data_frame
+    dump_columnar_input_data_frame(
+        data_frame.reset_index(),
+        year_calage,
+        output_directory = output_data_directory,
+        source_fingerprint = get_file_fingerprint(hdf5_file_path),
+        )
     openfisca_survey_collection.surveys.append(survey)
     openfisca_survey_collection.dump()
 
 
-def run(years_calage):
-    import time
+def run(years_calage, processes = None):
     year_data_list = [1995, 2000, 2005, 2011]
+    start = time.time()
+    duration_by_node = run_steps(
+        [find_nearest_inferior(year_data_list, year_calage) for year_calage in years_calage],
+        processes = processes,
+        )
+    for (year, step), duration in duration_by_node.iteritems():
+        log.info("Step {} for year {}: {:.1f} s".format(step, year, duration))
+    log.info("Steps finished in {:.1f} s".format(time.time() - start))
+    # Assembling is kept serial since every year updates the same survey collection
     for year_calage in years_calage:
-        start = time.time()
-        run_all(year_calage, year_data_list)
-        log.info("Finished {}".format(time.time() - start))
+        run_all(year_calage, year_data_list, build_steps = False)
+    log.info("Finished {}".format(time.time() - start))
+
 
 if __name__ == '__main__':
     import sys
@@ -30,20 +30,55 @@ from __future__ import division
 import logging
 import numpy
 import pandas
+from scipy import sparse
 
 
-from openfisca_survey_manager.temporary import temporary_store_decorator
+from openfisca_france_indirect_taxation.build_survey_data.step_store import step_store_decorator
 from openfisca_survey_manager import default_config_files_directory as config_files_directory
 from openfisca_survey_manager.survey_collections import SurveyCollection
 
 
-from openfisca_france_indirect_taxation.utils import get_transfert_data_frames
+from openfisca_france_indirect_taxation.build_survey_data.coicop_mapping import (  # noqa analysis:ignore
+    get_codes_coicop,
+    get_grosposte,
+    get_matrice_passage_file_path,
+    get_poste_coicop_column_name,
+    normalize_code_coicop,
+    )
 
 
 log = logging.getLogger(__name__)
 
 
-@temporary_store_decorator(config_files_directory = config_files_directory, file_name = 'indirect_taxation_tmp')
+def aggregate_depenses_by_coicop(menages, postes, depenses, coicop_by_poste):
+    """Agrège la table longue des dépenses (une ligne par ménage et poste BdF) en une table ménages x postes COICOP
+
+    La table est construite en une matrice creuse. Comme avec groupby, les lignes dont le ménage ou le poste est
+    manquant sont ignorées, les dépenses manquantes comptent pour zéro et les doublons (ménage, poste) sont sommés.
+    """
+    menages = numpy.asarray(menages)
+    postes = numpy.asarray(postes)
+    depenses = numpy.asarray(depenses, dtype = float)
+    valid = pandas.notnull(menages) & pandas.notnull(postes)
+    household_codes, households = pandas.factorize(menages[valid], sort = True)
+    poste_codes, postes_bdf = pandas.factorize(postes[valid], sort = True)
+    coicop_code_by_poste_code, coicops = pandas.factorize(
+        numpy.array([coicop_by_poste[poste] for poste in postes_bdf], dtype = object),
+        sort = True,
+        )
+    depenses = depenses[valid]
+    depense_by_household_coicop = sparse.coo_matrix(
+        (numpy.where(numpy.isnan(depenses), 0, depenses), (household_codes, coicop_code_by_poste_code[poste_codes])),
+        shape = (len(households), len(coicops)),
+        ).tocsr()
+    return pandas.DataFrame(
+        depense_by_household_coicop.toarray(),
+        columns = coicops,
+        index = pandas.Index(households, name = 'ident_men'),
+        )
+
+
+@step_store_decorator(step = '1_1', get_asset_file_paths = lambda year: [get_matrice_passage_file_path(year)])
 def build_depenses_homogenisees(temporary_store = None, year = None):
     """Build menage consumption by categorie fiscale dataframe """
     assert temporary_store is not None
@@ -73,34 +108,17 @@ def build_depenses_homogenisees(temporary_store = None, year = None):
             )
         poids.set_index('ident_men', inplace = True)
 
-        conso = survey.get_values(table = "depnom")
-        conso = conso[["valeur", "montant", "mena", "nomen5"]]
-        conso = conso.groupby(["mena", "nomen5"]).sum()
-        conso = conso.reset_index()
-        conso.rename(
-            columns = {
-                'mena': 'ident_men',
-                'nomen5': 'poste{}'.format(year),
-                'valeur': 'depense',
-                'montant': 'depense_avt_imput',
-                },
-            inplace = True
+        depnom = survey.get_values(table = "depnom", variables = ["valeur", "mena", "nomen5"])
+        postes_bdf = depnom.nomen5.dropna().unique()
+        coicop_data_frame = aggregate_depenses_by_coicop(
+            depnom.mena.values,
+            depnom.nomen5.values,
+            depnom.valeur.values / 6.55957,  # Passage à l'euro
+            dict(zip(postes_bdf, get_codes_coicop(postes_bdf, year))),
             )
-
-        # Passage à l'euro
-        conso.depense = conso.depense / 6.55957
-        conso.depense_avt_imput = conso.depense_avt_imput / 6.55957
-        conso_small = conso[[u'ident_men', u'poste1995', u'depense']]
-
-        conso_unstacked = conso_small.set_index(['ident_men', 'poste1995']).unstack('poste1995')
-        conso_unstacked = conso_unstacked.fillna(0)
-
-        levels = conso_unstacked.columns.levels[1]
-        labels = conso_unstacked.columns.labels[1]
-        conso_unstacked.columns = levels[labels]
-        conso_unstacked.rename(index = {0: 'ident_men'}, inplace = True)
-        conso = conso_unstacked.merge(poids, left_index = True, right_index = True)
-        conso = conso.reset_index()
+        del depnom
+        coicop_data_frame = coicop_data_frame.loc[coicop_data_frame.index.isin(poids.index)]
+        poids = poids.loc[coicop_data_frame.index]
 
     if year == 2000:
         conso = survey.get_values(table = "consomen")
@@ -133,131 +151,42 @@ def build_depenses_homogenisees(temporary_store = None, year = None):
         del conso['ctot']
 
     # Grouping by coicop
+    if year != 1995:
+        poids = conso[['ident_men', 'pondmen']].copy()
+        poids.set_index('ident_men', inplace = True)
+        conso.drop('pondmen', axis = 1, inplace = True)
+        conso.set_index('ident_men', inplace = True)
 
-    poids = conso[['ident_men', 'pondmen']].copy()
-    poids.set_index('ident_men', inplace = True)
-    conso.drop('pondmen', axis = 1, inplace = True)
-    conso.set_index('ident_men', inplace = True)
-
-    matrice_passage_data_frame, selected_parametres_fiscalite_data_frame = get_transfert_data_frames(year)
-
-    coicop_poste_bdf = matrice_passage_data_frame[['poste{}'.format(year), 'posteCOICOP']]
-    coicop_poste_bdf.set_index('poste{}'.format(year), inplace = True)
-    coicop_by_poste_bdf = coicop_poste_bdf.to_dict()['posteCOICOP']
-    del coicop_poste_bdf
-
-    def reformat_consumption_column_coicop(coicop):
-        try:
-            return int(coicop.replace('c', '').lstrip('0'))
-        except:
-            return numpy.NaN
-    # cette étape permet d'harmoniser les df pour 1995 qui ne se présentent pas de la même façon
-    # que pour les trois autres années
-    if year == 1995:
-        coicop_labels = [
-            normalize_code_coicop(coicop_by_poste_bdf.get(poste_bdf))
-            for poste_bdf in conso.columns
-            ]
-    else:
-        coicop_labels = [
-            normalize_code_coicop(coicop_by_poste_bdf.get(reformat_consumption_column_coicop(poste_bdf)))
-            for poste_bdf in conso.columns
-            ]
-    tuples = zip(coicop_labels, conso.columns)
-    conso.columns = pandas.MultiIndex.from_tuples(tuples, names=['coicop', 'poste{}'.format(year)])
-    coicop_data_frame = conso.groupby(level = 0, axis = 1).sum()
+        # Les colonnes 'c01111' correspondent au poste BdF 1111, les autres colonnes à aucun poste
+        postes_bdf = pandas.to_numeric(
+            pandas.Series(conso.columns.astype(str)).str.replace('c', '').str.lstrip('0'),
+            errors = 'coerce',
+            )
+        coicop_labels = get_codes_coicop(postes_bdf.tolist(), year)
+        coicop_data_frame = conso.groupby(coicop_labels, axis = 1).sum()
 
     depenses = coicop_data_frame.merge(poids, left_index = True, right_index = True)
 
     # Création de gros postes, les 12 postes sur lesquels le calage se fera
-    def select_gros_postes(coicop):
-        try:
-            coicop = unicode(coicop)
-        except:
-            coicop = coicop
-        normalized_coicop = normalize_code_coicop(coicop)
-        grosposte = normalized_coicop[0:2]
-        return int(grosposte)
-
-    grospostes = [
-        select_gros_postes(coicop)
-        for coicop in coicop_data_frame.columns
-        ]
-    tuples_gros_poste = zip(coicop_data_frame.columns, grospostes)
-    coicop_data_frame.columns = pandas.MultiIndex.from_tuples(tuples_gros_poste, names=['coicop', 'grosposte'])
-
-    depenses_by_grosposte = coicop_data_frame.groupby(level = 1, axis = 1).sum()
+    grospostes = [get_grosposte(coicop) for coicop in coicop_data_frame.columns]
+    depenses_by_grosposte = coicop_data_frame.groupby(grospostes, axis = 1).sum()
     depenses_by_grosposte = depenses_by_grosposte.merge(poids, left_index = True, right_index = True)
 
     # TODO : understand why it does not work: depenses.rename(columns = {u'0421': 'poste_coicop_421'}, inplace = True)
 
-    produits = [column for column in depenses.columns if column.isdigit()]
-    for code in produits:
-        if code[-1:] == '0':
-            depenses.rename(columns = {code: code[:-1]}, inplace = True)
-        else:
-            depenses.rename(columns = {code: code}, inplace = True)
-    produits = [column for column in depenses.columns if column.isdigit()]
-    for code in produits:
-        if code[0:1] == '0':
-            depenses.rename(columns = {code: code[1:]}, inplace = True)
-        else:
-            depenses.rename(columns = {code: code}, inplace = True)
-    produits = [column for column in depenses.columns if column.isdigit()]
-    for code in produits:
-        depenses.rename(columns = {code: 'poste_coicop_' + code}, inplace = True)
+    depenses.rename(columns = get_poste_coicop_column_name, inplace = True)
 
     temporary_store['depenses_{}'.format(year)] = depenses
 
     depenses_by_grosposte.columns = depenses_by_grosposte.columns.astype(str)
-    liste_grospostes = [column for column in depenses_by_grosposte.columns if column.isdigit()]
-    for grosposte in liste_grospostes:
-        depenses_by_grosposte.rename(columns = {grosposte: 'coicop12_' + grosposte}, inplace = True)
+    depenses_by_grosposte.rename(
+        columns = lambda column: 'coicop12_' + column if column.isdigit() else column,
+        inplace = True,
+        )
 
     temporary_store['depenses_by_grosposte_{}'.format(year)] = depenses_by_grosposte
 
 
-def normalize_code_coicop(code):
-    '''Normalize_coicop est function d'harmonisation de la colonne d'entiers posteCOICOP de la table
-matrice_passage_data_frame en la transformant en une chaine de 5 caractères afin de pouvoir par la suite agréger les postes
-COICOP selon les 12 postes agrégés de la nomenclature de la comptabilité nationale. Chaque poste contient 5 caractères,
-les deux premiers (entre 01 et 12) correspondent à ces postes agrégés de la CN.
-
-    '''
-    # TODO: vérifier la formule !!!
-
-    try:
-        code = unicode(code)
-    except:
-        code = code
-    if len(code) == 3:
-        code_coicop = "0" + code + "0"  # "{0}{1}{0}".format(0, code)
-    elif len(code) == 4:
-        if not code.startswith("0") and not code.startswith("1") and not code.startswith("45") and not code.startswith("9"):
-            code_coicop = "0" + code
-            # 022.. = cigarettes et tabacs => on les range avec l'alcool (021.0)
-        elif code.startswith("0"):
-            code_coicop = code + "0"
-        elif code in ["1151", "1181", "4552", "4522", "4511", "9122", "9151", "9211", "9341", "1411"]:
-            # 1151 = Margarines et autres graisses végétales
-            # 1181 = Confiserie
-            # 04522 = Achat de butane, propane
-            # 04511 = Facture EDF GDF non dissociables
-            code_coicop = "0" + code
-        else:
-            # 99 = loyer, impots et taxes, cadeaux...
-            code_coicop = code + "0"
-    elif len(code) == 5:
-        if not code.startswith("13") and not code.startswith("44") and not code.startswith("51"):
-            code_coicop = code
-        else:
-            code_coicop = "99000"
-    else:
-        log.error("Problematic code {}".format(code))
-        raise()
-    return code_coicop
-
-
 if __name__ == '__main__':
     import sys
     import time
@@ -30,12 +30,12 @@ from __future__ import division
 import os
 
 
-from ConfigParser import SafeConfigParser
+from ConfigParser import Error as ConfigParserError, SafeConfigParser
 import logging
 import pandas
 
 
-from openfisca_survey_manager.temporary import temporary_store_decorator
+from openfisca_france_indirect_taxation.build_survey_data.step_store import step_store_decorator
 from openfisca_survey_manager import default_config_files_directory as config_files_directory
 from openfisca_survey_manager.survey_collections import SurveyCollection
 
@@ -43,10 +43,31 @@ from openfisca_survey_manager.survey_collections import SurveyCollection
 log = logging.getLogger(__name__)
 
 
+def get_hotdeck_file_path():
+    """Renvoie le chemin du fichier hotdeck_result.dta du répertoire d'assets configuré pour le paquet"""
+    parser = SafeConfigParser()
+    config_local_ini = os.path.join(config_files_directory, 'config_local.ini')
+    config_ini = os.path.join(config_files_directory, 'config.ini')
+    parser.read([config_ini, config_local_ini])
+    directory_path = os.path.normpath(
+        parser.get("openfisca_france_indirect_taxation", "assets")
+        )
+    return os.path.join(directory_path, 'hotdeck_result.dta')
+
+
+def get_asset_file_paths(year):
+    if year != 1995:
+        return []
+    try:
+        return [get_hotdeck_file_path()]
+    except ConfigParserError:
+        return []
+
+
 # **************************************************************************************************************************
 # * Etape n° 0-1-2 : IMPUTATION DE LOYERS POUR LES MENAGES PROPRIETAIRES
 # **************************************************************************************************************************
-@temporary_store_decorator(config_files_directory = config_files_directory, file_name = 'indirect_taxation_tmp')
+@step_store_decorator(step = '1_2', upstream_steps = ['1_1'], get_asset_file_paths = get_asset_file_paths)
 def build_imputation_loyers_proprietaires(temporary_store = None, year = None):
     """Build menage consumption by categorie fiscale dataframe """
 
@@ -109,14 +130,7 @@ def build_imputation_loyers_proprietaires(temporary_store = None, year = None):
         imput00.maison = 1 - ((imput00.cc == 4) & (imput00.catsurf == 1) & (imput00.maison_appart == 1))
 
         try:
-            parser = SafeConfigParser()
-            config_local_ini = os.path.join(config_files_directory, 'config_local.ini')
-            config_ini = os.path.join(config_files_directory, 'config.ini')
-            parser.read([config_ini, config_local_ini])
-            directory_path = os.path.normpath(
-                parser.get("openfisca_france_indirect_taxation", "assets")
-                )
-            hotdeck = pandas.read_stata(os.path.join(directory_path, 'hotdeck_result.dta'))
+            hotdeck = pandas.read_stata(get_hotdeck_file_path())
         except:
             hotdeck = survey.get_values(table = 'hotdeck_result')
 
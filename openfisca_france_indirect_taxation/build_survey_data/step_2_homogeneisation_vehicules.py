@@ -33,7 +33,7 @@ import logging
 from openfisca_survey_manager.survey_collections import SurveyCollection
 
 
-from openfisca_survey_manager.temporary import temporary_store_decorator
+from openfisca_france_indirect_taxation.build_survey_data.step_store import step_store_decorator
 from openfisca_survey_manager import default_config_files_directory as config_files_directory
 from openfisca_france_indirect_taxation.build_survey_data.utils \
     import ident_men_dtype
@@ -51,7 +51,7 @@ log = logging.getLogger(__name__)
 # DONNEES SUR LES TYPES DE CARBURANTS
 
 
-@temporary_store_decorator(config_files_directory = config_files_directory, file_name = 'indirect_taxation_tmp')
+@step_store_decorator(step = '2')
 def build_homogeneisation_vehicules(temporary_store = None, year = None):
     assert temporary_store is not None
     """Compute vehicule numbers by type"""
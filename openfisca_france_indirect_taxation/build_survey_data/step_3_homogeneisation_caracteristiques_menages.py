@@ -32,7 +32,7 @@ import numpy
 import pandas
 
 
-from openfisca_survey_manager.temporary import temporary_store_decorator
+from openfisca_france_indirect_taxation.build_survey_data.step_store import step_store_decorator
 from openfisca_survey_manager.survey_collections import SurveyCollection
 from openfisca_survey_manager import default_config_files_directory as config_files_directory
 
@@ -40,7 +40,7 @@ from openfisca_survey_manager import default_config_files_directory as config_fi
 log = logging.getLogger(__name__)
 
 
-@temporary_store_decorator(config_files_directory = config_files_directory, file_name = 'indirect_taxation_tmp')
+@step_store_decorator(step = '3')
 def build_homogeneisation_caracteristiques_sociales(temporary_store = None, year = None):
     u"""Homogénéisation des caractéristiques sociales des ménages """
 
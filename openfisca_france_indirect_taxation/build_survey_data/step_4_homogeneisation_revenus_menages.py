@@ -31,7 +31,7 @@ import logging
 import pandas
 
 
-from openfisca_survey_manager.temporary import temporary_store_decorator
+from openfisca_france_indirect_taxation.build_survey_data.step_store import step_store_decorator
 from openfisca_survey_manager.survey_collections import SurveyCollection
 from openfisca_survey_manager import default_config_files_directory as config_files_directory
 
@@ -42,7 +42,7 @@ from openfisca_france_indirect_taxation.build_survey_data.utils \
 log = logging.getLogger(__name__)
 
 
-@temporary_store_decorator(config_files_directory = config_files_directory, file_name = 'indirect_taxation_tmp')
+@step_store_decorator(step = '4', upstream_steps = ['1_2'])
 def build_homogeneisation_revenus_menages(temporary_store = None, year = None):
     assert temporary_store is not None
     """Build menage consumption by categorie fiscale dataframe """
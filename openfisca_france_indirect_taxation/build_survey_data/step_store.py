@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import division
+
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import pandas
+
+
+from openfisca_survey_manager import default_config_files_directory as config_files_directory
+from openfisca_survey_manager.survey_collections import SurveyCollection
+from openfisca_survey_manager.temporary import TemporaryStore
+
+from openfisca_france_indirect_taxation.utils import get_file_hash, get_files_hash
+
+
+log = logging.getLogger(__name__)
+
+
+# Version du format des stores d'étape, à incrémenter pour invalider toutes les sorties d'étapes existantes
+step_store_version = 1
+# Table marquant un store d'étape complet, elle contient la clé de l'étape
+step_key_table = 'step_key'
+# Etapes amont, fichiers source et fonction renvoyant les fichiers d'assets lus pour une année, de chaque étape de
+# build_survey_data, renseignés par step_store_decorator
+upstream_steps_by_step = dict()
+source_file_paths_by_step = dict()
+get_asset_file_paths_by_step = dict()
+step_key_by_node = dict()
+# Modules utilisés par plusieurs étapes, dont le code source entre dans la clé de chaque étape
+shared_source_file_names = ['coicop_mapping.py', 'utils.py']
+
+
+def get_raw_survey_fingerprint(year):
+    """Renvoie le nom, la taille et la date de modification du fichier HDF5 de l'enquête BdF de l'année"""
+    bdf_survey_collection = SurveyCollection.load(
+        collection = 'budget_des_familles', config_files_directory = config_files_directory)
+    survey = bdf_survey_collection.get_survey('budget_des_familles_{}'.format(year))
+    stat = os.stat(survey.hdf5_file_path)
+    return [os.path.basename(survey.hdf5_file_path), stat.st_size, stat.st_mtime]
+
+
+def get_assets_fingerprint(step, year):
+    """Renvoie le nom et l'empreinte du contenu des fichiers d'assets lus par l'étape pour l'année (None pour un
+    fichier absent)"""
+    get_asset_file_paths = get_asset_file_paths_by_step.get(step)
+    if get_asset_file_paths is None:
+        return []
+    return [
+        [os.path.basename(file_path), get_file_hash(file_path) if os.path.exists(file_path) else None]
+        for file_path in get_asset_file_paths(year)
+        ]
+
+
+def get_step_key(step, year):
+    """Renvoie la clé d'une étape pour une année
+
+    Elle dépend de l'enquête BdF brute, des fichiers d'assets lus par l'étape, de son code source, de l'année et des
+    clés des étapes amont : une étape dont rien de cela n'a changé n'est pas recalculée, et toute étape recalculée
+    entraîne ses étapes aval.
+    """
+    node = (step, year)
+    if node not in step_key_by_node:
+        step_key_by_node[node] = hashlib.sha1(json.dumps(
+            dict(
+                assets = get_assets_fingerprint(step, year),
+                raw_survey = get_raw_survey_fingerprint(year),
+                source = get_files_hash(source_file_paths_by_step[step]),
+                step = step,
+                upstream = [get_step_key(upstream_step, year) for upstream_step in upstream_steps_by_step[step]],
+                version = step_store_version,
+                year = year,
+                ),
+            sort_keys = True,
+            )).hexdigest()
+    return step_key_by_node[node]
+
+
+def get_step_store_file_name_prefix(step, year):
+    return 'indirect_taxation_tmp_step_{}_{}_'.format(step, year)
+
+
+def get_step_store_file_name(step, year):
+    # Les sorties sont immuables : une nouvelle clé donne un nouveau fichier
+    return get_step_store_file_name_prefix(step, year) + get_step_key(step, year)[:16]
+
+
+def get_all_upstream_steps(step):
+    """Renvoie les étapes amont (directes et indirectes) d'une étape, des plus proches aux plus lointaines"""
+    all_upstream_steps = list()
+    remaining_steps = list(upstream_steps_by_step.get(step, []))
+    while remaining_steps:
+        upstream_step = remaining_steps.pop(0)
+        if upstream_step not in all_upstream_steps:
+            all_upstream_steps.append(upstream_step)
+            remaining_steps.extend(upstream_steps_by_step.get(upstream_step, []))
+    return all_upstream_steps
+
+
+class StepStore(object):
+    """Store temporaire propre à une étape et à une année
+
+    Chaque étape écrit dans son propre fichier HDF5, si bien que des étapes indépendantes, ou des années différentes,
+    peuvent tourner dans des processus distincts. Les tables absentes du store sont lues dans les stores des étapes
+    amont.
+    """
+    def __init__(self, step, year, upstream_steps = None):
+        self.step = step
+        self.year = year
+        self.upstream_steps = get_all_upstream_steps(step) if upstream_steps is None else upstream_steps
+        self.store = TemporaryStore.create(
+            config_files_directory = config_files_directory,
+            file_name = get_step_store_file_name(step, year),
+            )
+
+    def __contains__(self, key):
+        if key in self.store:
+            return True
+        for upstream_step in self.upstream_steps:
+            upstream_store = StepStore(upstream_step, self.year, upstream_steps = [])
+            try:
+                if key in upstream_store.store:
+                    return True
+            finally:
+                upstream_store.close()
+        return False
+
+    def __getitem__(self, key):
+        if key in self.store:
+            return self.store[key]
+        for upstream_step in self.upstream_steps:
+            upstream_store = StepStore(upstream_step, self.year, upstream_steps = [])
+            try:
+                if key in upstream_store.store:
+                    return upstream_store.store[key]
+            finally:
+                upstream_store.close()
+        raise KeyError('{} not found in the stores of step {} and its upstream steps for year {}'.format(
+            key, self.step, self.year))
+
+    def __setitem__(self, key, value):
+        self.store[key] = value
+
+    def clear(self):
+        for key in self.store.keys():
+            self.store.remove(key)
+
+    def is_complete(self):
+        return step_key_table in self.store
+
+    def mark_complete(self):
+        self.store[step_key_table] = pandas.Series([get_step_key(self.step, self.year)])
+
+    def prune_superseded_stores(self):
+        """Supprime les stores de la même étape et de la même année écrits sous une autre clé"""
+        directory, file_name = os.path.split(self.store.filename)
+        superseded_file_name_regex = re.compile(r'^{}[0-9a-f]{{16}}{}$'.format(
+            re.escape(get_step_store_file_name_prefix(self.step, self.year)),
+            re.escape(os.path.splitext(file_name)[1]),
+            ))
+        for other_file_name in os.listdir(directory):
+            if other_file_name != file_name and superseded_file_name_regex.match(other_file_name):
+                log.info(u'Removing superseded store {} of step {} for year {}'.format(
+                    other_file_name, self.step, self.year))
+                os.remove(os.path.join(directory, other_file_name))
+
+    def close(self):
+        self.store.close()
+
+
+def step_store_decorator(step = None, upstream_steps = None, get_asset_file_paths = None):
+    """Fournit à la fonction d'une étape son StepStore (argument temporary_store) pour l'année demandée
+
+    L'étape n'est pas exécutée lorsque son store est déjà complet pour la clé courante, sauf si force = True. Les
+    stores écrits sous une clé précédente sont alors supprimés. get_asset_file_paths(year) renvoie les fichiers
+    d'assets lus par l'étape, dont le contenu entre dans sa clé.
+    """
+    assert step is not None
+    upstream_steps_by_step[step] = list(upstream_steps or [])
+    if get_asset_file_paths is not None:
+        get_asset_file_paths_by_step[step] = get_asset_file_paths
+
+    def actual_decorator(func):
+        source_file_paths_by_step[step] = [inspect.getsourcefile(func)] + [
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+            for file_name in shared_source_file_names
+            ]
+
+        @functools.wraps(func)
+        def func_wrapper(*args, **kwargs):
+            force = kwargs.pop('force', False)
+            if kwargs.get('temporary_store') is not None:
+                return func(*args, **kwargs)
+            assert kwargs.get('year') is not None, "Step {} needs a year keyword argument".format(step)
+            temporary_store = StepStore(step, kwargs['year'])
+            try:
+                if temporary_store.is_complete() and not force:
+                    log.info(u'Step {} for year {} is up to date'.format(step, kwargs['year']))
+                    temporary_store.prune_superseded_stores()
+                    return None
+                # Remove the partial output of an interrupted run
+                temporary_store.clear()
+                kwargs['temporary_store'] = temporary_store
+                result = func(*args, **kwargs)
+                temporary_store.mark_complete()
+                temporary_store.prune_superseded_stores()
+                return result
+            finally:
+                temporary_store.close()
+
+        func_wrapper.step = step
+        func_wrapper.upstream_steps = upstream_steps_by_step[step]
+        return func_wrapper
+
+    return actual_decorator
+
+
+def read_step_table(step, year, key):
+    """Lit une table produite par une étape (ou une de ses étapes amont) pour une année"""
+    step_store = StepStore(step, year)
+    try:
+        return step_store[key]
+    finally:
+        step_store.close()
@@ -27,6 +27,15 @@
 from __future__ import division
 
 
+import collections
+import logging
+import numpy
+import pandas
+
+
+log = logging.getLogger(__name__)
+
+
 def collapsesum(data_frame, by = None, var = None):
     '''
     Pour une variable, fonction qui calcule la moyenne pondérée au sein de chaque groupe.
@@ -45,6 +54,59 @@ def find_nearest_inferior(years, year):
     return max(anterior_years)
 
 
+def reconcile_columns(data_frame_by_name):
+    """Concatène horizontalement des tables indexées par ménage, en fusionnant les colonnes présentes plusieurs fois
+
+    Les colonnes communes sont fusionnées dans l'ordre des tables (la première valeur non nulle l'emporte) et les
+    valeurs qui diffèrent d'une table à l'autre sont signalées. Contrairement à une déduplication par transposition,
+    les colonnes gardent leur type.
+    """
+    data_frame_by_name = collections.OrderedDict(
+        (name, data_frame) for name, data_frame in data_frame_by_name.iteritems() if data_frame is not None)
+    index = None
+    for data_frame in data_frame_by_name.itervalues():
+        index = data_frame.index if index is None else index.union(data_frame.index)
+
+    series_by_column = collections.OrderedDict()
+    names_by_column = dict()
+    for name, data_frame in data_frame_by_name.iteritems():
+        aligned = data_frame.index.equals(index)
+        for position, column in enumerate(data_frame.columns):
+            series = data_frame.iloc[:, position]
+            if not aligned:
+                series = series.reindex(index)
+            if column not in series_by_column:
+                series_by_column[column] = series
+                names_by_column[column] = [name]
+                continue
+            previous_series = series_by_column[column]
+            both_not_null = (previous_series.notnull() & series.notnull()).values
+            if both_not_null.any():
+                previous_values = previous_series.values[both_not_null]
+                values = series.values[both_not_null]
+                try:
+                    conflicts = ~numpy.isclose(previous_values.astype(float), values.astype(float))
+                except (TypeError, ValueError):
+                    conflicts = previous_values.astype(str) != values.astype(str)
+                if conflicts.any():
+                    log.warning(u'Column {} of {} has {} values differing from those of {}, which are kept'.format(
+                        column, name, conflicts.sum(), names_by_column[column]))
+            series_by_column[column] = previous_series.combine_first(series)
+            names_by_column[column].append(name)
+
+    for column, names in names_by_column.iteritems():
+        if len(names) > 1:
+            log.info(u'Column {} found in {} has been merged'.format(column, names))
+    return pandas.DataFrame(series_by_column, index = index, columns = series_by_column.keys())
+
+
+def downcast_floats(data_frame):
+    """Convertit les colonnes float64 en float32, le type des variables FloatCol d'OpenFisca"""
+    for column in data_frame.columns[(data_frame.dtypes == numpy.float64).values]:
+        data_frame[column] = data_frame[column].astype(numpy.float32)
+    return data_frame
+
+
 # ident_men_dtype = numpy.dtype('O')
 ident_men_dtype = 'str'
 
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Stockage en colonnes de la table input des enquêtes : un fichier .npy par variable, lu à la demande"""
+
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from openfisca_survey_manager.survey_collections import SurveyCollection
+
+
+log = logging.getLogger(__name__)
+
+
+columnar_schema_version = 1
+columnar_index_file_name = 'columns.json'
+
+
+def get_survey_name(year):
+    return "openfisca_indirect_taxation_data_{}".format(year)
+
+
+def get_file_fingerprint(file_path):
+    """Renvoie le nom, la taille et la date de modification d'un fichier, qui identifient sa version"""
+    stat = os.stat(file_path)
+    return [os.path.basename(file_path), stat.st_size, stat.st_mtime]
+
+
+def get_columnar_directory(year, output_directory = None):
+    """Répertoire du stockage en colonnes de la table input, à côté du fichier HDF5 de l'enquête"""
+    if output_directory is None:
+        openfisca_survey_collection = SurveyCollection.load(collection = "openfisca_indirect_taxation")
+        output_directory = openfisca_survey_collection.config.get('data', 'output_directory')
+    return os.path.join(output_directory, "{}_columns".format(get_survey_name(year)))
+
+
+def dump_columnar_input_data_frame(input_data_frame, year, output_directory = None, source_fingerprint = None):
+    """Ecrit la table input au format colonne : un fichier .npy par variable et un index JSON
+
+    Les colonnes de chaînes de caractères sont converties en chaînes de longueur fixe afin de pouvoir être
+    chargées en mémoire partagée (memory map). Les autres colonnes objet sont sérialisées telles quelles.
+    L'empreinte du fichier HDF5 dont la table est issue (cf. get_file_fingerprint) est gardée dans l'index.
+    """
+    assert not input_data_frame.columns.duplicated().any(), "Duplicated columns cannot be stored by column"
+    directory = get_columnar_directory(year, output_directory = output_directory)
+    parent_directory = os.path.dirname(directory)
+    if not os.path.isdir(parent_directory):
+        os.makedirs(parent_directory)
+    temporary_directory = tempfile.mkdtemp(dir = parent_directory, prefix = '.tmp_columns_')
+    try:
+        columns = list()
+        for position, column in enumerate(input_data_frame.columns):
+            values = input_data_frame[column].values
+            if values.dtype == object and all(isinstance(value, basestring) for value in values):
+                values = values.astype(unicode if any(isinstance(value, unicode) for value in values) else str)
+            file_name = '{}.npy'.format(position)
+            numpy.save(os.path.join(temporary_directory, file_name), values)
+            columns.append(dict(
+                dtype = values.dtype.str,
+                file_name = file_name,
+                memory_mapped = values.dtype != object,
+                name = column,
+                ))
+        with open(os.path.join(temporary_directory, columnar_index_file_name), 'w') as index_file:
+            json.dump(
+                dict(
+                    columns = columns,
+                    length = len(input_data_frame),
+                    schema_version = columnar_schema_version,
+                    source = source_fingerprint,
+                    ),
+                index_file,
+                indent = 2,
+                )
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(temporary_directory, directory)
+    except:
+        shutil.rmtree(temporary_directory, ignore_errors = True)
+        raise
+    log.info(u'Columnar input data written in {}'.format(directory))
+    return directory
+
+
+def load_columnar_index(year, output_directory = None, source_fingerprint = None):
+    directory = get_columnar_directory(year, output_directory = output_directory)
+    index_file_path = os.path.join(directory, columnar_index_file_name)
+    if not os.path.exists(index_file_path):
+        return None
+    with open(index_file_path) as index_file:
+        index = json.load(index_file)
+    if index.get('schema_version') != columnar_schema_version:
+        log.info(u'Ignoring columnar input data in {} written with another schema version'.format(directory))
+        return None
+    if source_fingerprint is not None and index.get('source') != list(source_fingerprint):
+        log.info(u'Ignoring columnar input data in {} written from another version of {}'.format(
+            directory, source_fingerprint[0]))
+        return None
+    index['directory'] = directory
+    return index
+
+
+def load_columnar_input_data_frame(year, columns = None, output_directory = None, source_fingerprint = None):
+    """Charge la table input depuis le stockage en colonnes, en ne lisant que les colonnes demandées
+
+    Renvoie None si le stockage en colonnes n'existe pas pour cette année ou, lorsque source_fingerprint est donné,
+    s'il n'a pas été écrit à partir de cette version du fichier HDF5.
+    """
+    index = load_columnar_index(year, output_directory = output_directory, source_fingerprint = source_fingerprint)
+    if index is None:
+        return None
+    column_by_name = dict((column['name'], column) for column in index['columns'])
+    if columns is None:
+        names = [column['name'] for column in index['columns']]
+    else:
+        names = [name for name in columns if name in column_by_name]
+        missing_columns = set(columns).difference(names)
+        if missing_columns:
+            log.info(u'Columns {} are not in the input data of {}'.format(sorted(missing_columns), year))
+    array_by_name = dict()
+    for name in names:
+        column = column_by_name[name]
+        array_by_name[name] = numpy.load(
+            os.path.join(index['directory'], column['file_name']),
+            mmap_mode = 'r' if column['memory_mapped'] else None,
+            )
+    return pandas.DataFrame(array_by_name, columns = names, index = numpy.arange(index['length']))
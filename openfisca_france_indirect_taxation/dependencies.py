@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Analyse statique des dépendances entre variables
+
+Les appels simulation.calculate des formules écrites à la main sont lus dans le code source des modules du modèle,
+de même que les paramètres qu'elles lisent (parameters['chemin.du.parametre'] après parameters = parameters_at(...),
+cf. model/parameters.py).
+Les dépendances des variables categorie_fiscale_*, générées dynamiquement, viennent des listes de postes COICOP
+datées de categories_fiscales et dépendent donc de l'année.
+
+L'analyse est incomplète pour les formules qui calculent une variable ou lisent un paramètre dont le nom n'est connu
+qu'à l'exécution, pour celles qui lisent la législation autrement (simulation.legislation_at, ou parameters_at dont
+le résultat n'est pas affecté à parameters), ainsi que pour les formules qu'une réforme remplace, qui ne sont pas
+dans les modules du modèle :
+ces variables sont alors supposées dépendre de tout (cf. get_unanalysed_variables).
+"""
+
+
+from __future__ import division
+
+import ast
+import collections
+import datetime
+import inspect
+import logging
+import re
+import types
+
+from openfisca_core import periods
+
+
+log = logging.getLogger(__name__)
+
+calculate_method_names = set(['calculate', 'calculate_add', 'calculate_divide', 'compute', 'compute_add',
+    'compute_divide'])
+legislation_function_names = set(['legislation_at', 'parameters_at'])
+# Dépendances d'une formule datée : variables appelées, motifs des noms construits, chemins des paramètres lus, et
+# présence d'appels ou de lectures de paramètres dont le nom ne peut être déterminé
+DatedDependencies = collections.namedtuple('DatedDependencies', ['start', 'stop', 'names', 'patterns', 'paths',
+    'dynamic_names', 'dynamic_paths'])
+# Liste de DatedDependencies par variable
+dated_dependencies_by_variable = dict()
+
+
+def get_called_variable(node):
+    """Renvoie le nom de la variable calculée, ou son motif lorsque le nom est construit ('prefix_{}')"""
+    if isinstance(node, ast.Str):
+        return node.s, False
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add) and isinstance(node.left, ast.Str):
+        return node.left.s + '{}', True
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'format' \
+            and isinstance(node.func.value, ast.Str):
+        return node.func.value.s, True
+    return None, False
+
+
+def get_parameter_path(node):
+    """Renvoie le chemin du paramètre lu par parameters['...'] ou parameters.get('...'), ou False si le nœud ne lit
+    pas de paramètre"""
+    if isinstance(node, ast.Subscript) and getattr(node.value, 'id', None) == 'parameters':
+        index = getattr(node.slice, 'value', None)
+    elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'get' \
+            and getattr(node.func.value, 'id', None) == 'parameters' and node.args:
+        index = node.args[0]
+    else:
+        return False
+    return index.s if isinstance(index, ast.Str) else None
+
+
+def get_called_function_name(node):
+    """Renvoie le nom de la fonction ou de la méthode appelée par le nœud, ou None si le nœud n'est pas un appel"""
+    if not isinstance(node, ast.Call):
+        return None
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return getattr(node.func, 'id', None)
+
+
+def get_date(node):
+    if isinstance(node, ast.Name) and node.id == 'None':
+        return None
+    assert isinstance(node, ast.Call), "Unexpected dated_function argument {}".format(ast.dump(node))
+    return datetime.date(*[ast.literal_eval(arg) for arg in node.args])
+
+
+def get_function_dependencies(function_node):
+    start = None
+    stop = None
+    for decorator in function_node.decorator_list:
+        if isinstance(decorator, ast.Call) and getattr(decorator.func, 'id', None) == 'dated_function':
+            arguments = dict(zip(['start', 'stop'], decorator.args))
+            arguments.update((keyword.arg, keyword.value) for keyword in decorator.keywords)
+            start = get_date(arguments['start']) if 'start' in arguments else None
+            stop = get_date(arguments['stop']) if 'stop' in arguments else None
+    names = set()
+    patterns = set()
+    paths = set()
+    dynamic_names = False
+    dynamic_paths = False
+    # Seuls les paramètres lus via parameters = parameters_at(...) sont analysés (cf. get_parameter_path)
+    analysed_legislation_calls = set()
+    for node in ast.walk(function_node):
+        if isinstance(node, ast.Assign) and get_called_function_name(node.value) == 'parameters_at' and \
+                [getattr(target, 'id', None) for target in node.targets] == ['parameters']:
+            analysed_legislation_calls.add(id(node.value))
+    for node in ast.walk(function_node):
+        if get_called_function_name(node) in legislation_function_names and id(node) not in analysed_legislation_calls:
+            log.info(u'Dynamic parameter in {} at line {}'.format(function_node.name, node.lineno))
+            dynamic_paths = True
+        path = get_parameter_path(node)
+        if path is None:
+            log.info(u'Dynamic parameter in {} at line {}'.format(function_node.name, node.lineno))
+            dynamic_paths = True
+        elif path:
+            paths.add(path)
+        if isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'get_weighted_quantiles':
+            # get_weighted_quantiles(simulation, variable, period, weight_variable = 'pondmen')
+            arguments = dict(zip(['simulation', 'variable', 'period', 'weight_variable'], node.args))
+            arguments.update((keyword.arg, keyword.value) for keyword in node.keywords)
+            names.add(arguments['variable'].s)
+            names.add(arguments['weight_variable'].s if 'weight_variable' in arguments else 'pondmen')
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                and node.func.attr in calculate_method_names and node.args:
+            name, is_pattern = get_called_variable(node.args[0])
+            if name is None:
+                log.info(u'Dynamic dependency in {} at line {}'.format(function_node.name, node.lineno))
+                dynamic_names = True
+            elif is_pattern:
+                patterns.add(name)
+            else:
+                names.add(name)
+    return DatedDependencies(start, stop, names, patterns, paths, dynamic_names, dynamic_paths)
+
+
+def parse_module(module):
+    """Renvoie les dépendances datées des variables définies dans le module"""
+    dated_dependencies_by_variable = dict()
+    for class_node in ast.parse(inspect.getsource(module)).body:
+        if not isinstance(class_node, ast.ClassDef):
+            continue
+        dated_dependencies = [
+            get_function_dependencies(node)
+            for node in class_node.body
+            if isinstance(node, ast.FunctionDef) and node.name.startswith('function')
+            ]
+        if dated_dependencies:
+            dated_dependencies_by_variable[class_node.name] = dated_dependencies
+    return dated_dependencies_by_variable
+
+
+def get_dated_dependencies_by_variable():
+    if not dated_dependencies_by_variable:
+        from .model import model
+        for module in vars(model).itervalues():
+            if isinstance(module, types.ModuleType):
+                dated_dependencies_by_variable.update(parse_module(module))
+    return dated_dependencies_by_variable
+
+
+def expand_pattern(pattern, variables):
+    regex = re.compile('^{}$'.format('.+'.join(re.escape(part) for part in re.split(r'\{[^}]*\}', pattern))))
+    return set(variable for variable in variables if regex.match(variable))
+
+
+def get_period_date(period):
+    if isinstance(period, (int, long)):
+        return datetime.date(period, 1, 1)
+    return datetime.date(*periods.period(period).start)
+
+
+def get_active_dependencies(variable, date):
+    """Renvoie les DatedDependencies des formules de la variable en vigueur à la date"""
+    active_dependencies = list()
+    for dependencies in get_dated_dependencies_by_variable().get(variable, []):
+        start, stop = dependencies.start, dependencies.stop
+        if (start is None or start <= date) and (stop is None or date <= stop):
+            active_dependencies.append(dependencies)
+    return active_dependencies
+
+
+def get_reform_variables(tax_benefit_system):
+    """Renvoie les variables dont la formule a été remplacée par une réforme (par rapport au système de base)"""
+    reference_tax_benefit_system = tax_benefit_system
+    while getattr(reference_tax_benefit_system, 'reference', None) is not None:
+        reference_tax_benefit_system = reference_tax_benefit_system.reference
+    if reference_tax_benefit_system is tax_benefit_system:
+        return set()
+    reference_column_by_name = reference_tax_benefit_system.column_by_name
+    return set(
+        name
+        for name, column in tax_benefit_system.column_by_name.iteritems()
+        if reference_column_by_name.get(name) is not column
+        )
+
+
+def get_unanalysed_variables(variables, date, tax_benefit_system):
+    """Renvoie, parmi les variables, celles dont l'analyse statique ne donne pas toutes les dépendances à la date"""
+    reform_variables = get_reform_variables(tax_benefit_system)
+    return set(
+        variable
+        for variable in variables
+        if variable in reform_variables or any(
+            dependencies.dynamic_names or dependencies.dynamic_paths
+            for dependencies in get_active_dependencies(variable, date)
+            )
+        )
+
+
+def get_variable_dependencies(variable, date, variables):
+    """Renvoie les variables directement appelées par la formule de la variable à la date, ou None si la variable
+    n'a pas de formule (variable d'entrée)"""
+    if variable.startswith('categorie_fiscale_') and variable not in get_dated_dependencies_by_variable():
+        from .model.consommation import categories_fiscales
+        categories, postes_coicop, _ = categories_fiscales.get_poste_categorie_matrix(date.year)
+        if variable != 'categorie_fiscale_' and int(variable[len('categorie_fiscale_'):]) in categories:
+            # Toutes les catégories fiscales de l'année sont calculées ensemble, cf. compute_categories_fiscales
+            return set('poste_coicop_{}'.format(poste) for poste in postes_coicop).intersection(variables)
+        return set()
+    dated_dependencies = get_dated_dependencies_by_variable().get(variable)
+    if dated_dependencies is None:
+        return None
+    dependencies = set()
+    for active_dependencies in get_active_dependencies(variable, date):
+        dependencies.update(active_dependencies.names)
+        for pattern in active_dependencies.patterns:
+            dependencies.update(expand_pattern(pattern, variables))
+    return dependencies.intersection(variables)
+
+
+def get_dependencies(output_variables, period, tax_benefit_system):
+    """Renvoie l'ensemble des variables (y compris les variables demandées) dont dépend le calcul des variables de
+    sortie pour la période"""
+    date = get_period_date(period)
+    variables = tax_benefit_system.column_by_name
+    dependencies = set()
+    remaining_variables = [variable for variable in output_variables]
+    while remaining_variables:
+        variable = remaining_variables.pop()
+        if variable in dependencies:
+            continue
+        if variable not in variables:
+            log.warning(u'Ignoring unknown variable {}'.format(variable))
+            continue
+        dependencies.add(variable)
+        remaining_variables.extend(get_variable_dependencies(variable, date, variables) or [])
+    return dependencies
+
+
+def get_variables_to_load(output_variables, period, tax_benefit_system):
+    """Renvoie les variables de l'enquête à charger pour calculer les variables de sortie pour la période, ou None
+    lorsque l'analyse statique ne permet pas de les déterminer et que toutes les colonnes doivent être chargées"""
+    dependencies = get_dependencies(output_variables, period, tax_benefit_system)
+    unanalysed_variables = get_unanalysed_variables(dependencies, get_period_date(period), tax_benefit_system)
+    if unanalysed_variables:
+        log.info(u'Loading all the input variables since the dependencies of {} are unknown'.format(
+            u', '.join(sorted(unanalysed_variables))))
+        return None
+    return dependencies
+
+
+def get_input_variables(output_variables, period, tax_benefit_system):
+    """Renvoie les variables d'entrée (sans formule) nécessaires au calcul des variables de sortie pour la période"""
+    date = get_period_date(period)
+    variables = tax_benefit_system.column_by_name
+    return set(
+        variable
+        for variable in get_dependencies(output_variables, period, tax_benefit_system)
+        if get_variable_dependencies(variable, date, variables) is None
+        )
+
+
+def get_variable_parameter_paths(variable, date):
+    """Renvoie les chemins des paramètres lus par la formule de la variable à la date"""
+    paths = set()
+    for dependencies in get_active_dependencies(variable, date):
+        paths.update(dependencies.paths)
+    return paths
+
+
+def get_downstream_variables(parameter_paths, output_variables, period, tax_benefit_system, changed_variables = None):
+    """Renvoie les variables, parmi celles dont dépend le calcul des variables de sortie pour la période, dont la
+    valeur change avec les paramètres (directement ou via les paramètres dérivés, cf. get_derived_parameter_paths) ou
+    avec les variables modifiées (dont la formule a changé par exemple)
+
+    Les variables dont les dépendances sont inconnues (cf. get_unanalysed_variables) sont supposées changer avec tout
+    paramètre ou variable modifiés, et les variables de sortie peuvent alors dépendre de toutes les variables.
+    """
+    from .model.parameters import get_derived_parameter_paths
+    date = get_period_date(period)
+    variables = tax_benefit_system.column_by_name
+    parameter_paths = set(parameter_paths)
+    for path in list(parameter_paths):
+        parameter_paths.update(get_derived_parameter_paths(path))
+    dependencies = get_dependencies(output_variables, period, tax_benefit_system)
+    unanalysed_variables = get_unanalysed_variables(dependencies, date, tax_benefit_system)
+    if unanalysed_variables:
+        dependencies = set(variables)
+        unanalysed_variables = get_unanalysed_variables(dependencies, date, tax_benefit_system)
+    dependencies_by_variable = dict(
+        (variable, get_variable_dependencies(variable, date, variables) or set())
+        for variable in dependencies
+        )
+    downstream_variables = set(
+        variable
+        for variable in dependencies_by_variable
+        if not get_variable_parameter_paths(variable, date).isdisjoint(parameter_paths)
+        )
+    if parameter_paths or changed_variables:
+        downstream_variables.update(unanalysed_variables)
+    if changed_variables is not None:
+        downstream_variables.update(set(changed_variables).intersection(dependencies_by_variable))
+    updated = True
+    while updated:
+        updated = False
+        for variable, dependencies in dependencies_by_variable.iteritems():
+            if variable not in downstream_variables and not dependencies.isdisjoint(downstream_variables):
+                downstream_variables.add(variable)
+                updated = True
+    return downstream_variables
@@ -11,7 +11,7 @@ import seaborn
 from openfisca_france_indirect_taxation.examples.utils_example import graph_builder_bar
 from openfisca_france_indirect_taxation.surveys import SurveyScenario
 from openfisca_france_indirect_taxation.examples.calage_bdf_cn_bis import get_inflators_by_year
-from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_estimation_from_stata import get_elasticities
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.quaids import get_elasticities
 
 
 # Import d'une nouvelle palette de couleurs
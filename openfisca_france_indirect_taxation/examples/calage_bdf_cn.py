@@ -32,13 +32,13 @@
 from __future__ import division
 
 import logging
-import os
-import pkg_resources
 
 import pandas
 from pandas import concat
 
 # Import de modules spécifiques à Openfisca
+from openfisca_france_indirect_taxation.build_survey_data.coicop_mapping import get_grosposte_of_poste_coicop
+from openfisca_france_indirect_taxation.utils import get_excel_sheet, parametres_fiscalite_xls_file_path
 from openfisca_france_indirect_taxation.build_survey_data.utils import ident_men_dtype
 
 
@@ -49,20 +49,7 @@ def calage_viellissement_depenses(year_data, year_calage, depenses, masses):
     depenses_calees = pandas.DataFrame()
     coicop_list = set(poste_coicop for poste_coicop in depenses.columns if poste_coicop[:5] == 'poste')
     for column in coicop_list:
-        coicop = column.replace('poste_coicop_', '')
-        if coicop[:1] != '1' and coicop[:1] != '9':
-            grosposte = int(coicop[:1])
-        else:
-            if len(coicop) == 3:
-                grosposte = int(coicop[:1])
-            elif len(coicop) == 5:
-                grosposte = int(coicop[:2])
-            elif coicop in ['1151', '1181', '1411', '9122', '9151', '9211', '9341']:
-                grosposte = int(coicop[:1])
-            elif coicop[:2] == '99' or coicop[:2] == '13':
-                grosposte = 99
-            else:
-                grosposte = int(coicop[:2])
+        grosposte = get_grosposte_of_poste_coicop(column)
         # RAPPEL : 12 postes CN et COICOP
         #    01 Produits alimentaires et boissons non alcoolisées
         #    02 Boissons alcoolisées et tabac
@@ -146,17 +133,7 @@ def get_cn_data_frames(year_data = None, year_calage = None):
     if year_calage is None:
         year_calage = year_data
 
-    default_config_files_directory = os.path.join(
-        pkg_resources.get_distribution('openfisca_france_indirect_taxation').location)
-    parametres_fiscalite_file_path = os.path.join(
-        default_config_files_directory,
-        'openfisca_france_indirect_taxation',
-        'assets',
-        'legislation',
-        'Parametres fiscalite indirecte.xls'
-        )
-
-    masses_cn_data_frame = pandas.read_excel(parametres_fiscalite_file_path, sheetname = "consommation_CN")
+    masses_cn_data_frame = get_excel_sheet(parametres_fiscalite_xls_file_path, sheetname = "consommation_CN")
     if year_data != year_calage:
         masses_cn_12postes_data_frame = masses_cn_data_frame.loc[:, ['Code', year_data, year_calage]]
     else:
@@ -218,17 +195,8 @@ def build_depenses_calees(depenses, year_calage, year_data):
 
 def build_revenus_cales(revenus, year_calage, year_data):
     # Masses de calage provenant de la comptabilité nationale
-    default_config_files_directory = os.path.join(
-        pkg_resources.get_distribution('openfisca_france_indirect_taxation').location)
-    parametres_fiscalite_file_path = os.path.join(
-        default_config_files_directory,
-        'openfisca_france_indirect_taxation',
-        'assets',
-        'legislation',
-        'Parametres fiscalite indirecte.xls',
-        )
 
-    masses_cn_revenus_data_frame = pandas.read_excel(parametres_fiscalite_file_path, sheetname = "revenus_CN")
+    masses_cn_revenus_data_frame = get_excel_sheet(parametres_fiscalite_xls_file_path, sheetname = "revenus_CN")
 
     masses_cn_revenus_data_frame.rename(
         columns = {
@@ -284,17 +252,7 @@ def build_df_calee_on_ticpe(dataframe, year_calage = None, year_data = None):
         year_calage = year_data
     dataframe_calee = build_df_calee_on_grospostes(dataframe, year_calage, year_data)
 
-    default_config_files_directory = os.path.join(
-        pkg_resources.get_distribution('openfisca_france_indirect_taxation').location)
-    parametres_fiscalite_file_path = os.path.join(
-        default_config_files_directory,
-        'openfisca_france_indirect_taxation',
-        'assets',
-        'legislation',
-        'Parametres fiscalite indirecte.xls'
-        )
-
-    masses_cn_data_frame = pandas.read_excel(parametres_fiscalite_file_path, sheetname = "consommation_CN")
+    masses_cn_data_frame = get_excel_sheet(parametres_fiscalite_xls_file_path, sheetname = "consommation_CN")
     if year_data != year_calage:
         masses_cn_12postes_data_frame = masses_cn_data_frame.loc[:, ['Code', year_data, year_calage]]
     else:
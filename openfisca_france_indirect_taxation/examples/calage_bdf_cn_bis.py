@@ -4,13 +4,12 @@
 from __future__ import division
 
 import logging
-import os
-import pkg_resources
 
 import pandas
 from pandas import concat
 
 from openfisca_france_indirect_taxation.examples.utils_example import get_input_data_frame
+from openfisca_france_indirect_taxation.utils import get_excel_sheet, parametres_fiscalite_xls_file_path
 from openfisca_france_indirect_taxation.build_survey_data.utils import find_nearest_inferior
 
 
@@ -45,16 +44,7 @@ def get_bdf_aggregates(data_year = None):
 
 def get_cn_aggregates(target_year = None):
     assert target_year is not None
-    default_config_files_directory = os.path.join(
-        pkg_resources.get_distribution('openfisca_france_indirect_taxation').location)
-    parametres_fiscalite_file_path = os.path.join(
-        default_config_files_directory,
-        'openfisca_france_indirect_taxation',
-        'assets',
-        'legislation',
-        'Parametres fiscalite indirecte.xls'
-        )
-    masses_cn_data_frame = pandas.read_excel(parametres_fiscalite_file_path, sheetname = "consommation_CN")
+    masses_cn_data_frame = get_excel_sheet(parametres_fiscalite_xls_file_path, sheetname = "consommation_CN")
     masses_cn_12postes_data_frame = masses_cn_data_frame.loc[:, ['Code', target_year]]
     masses_cn_12postes_data_frame['code_unicode'] = masses_cn_12postes_data_frame.Code.astype(unicode)
     masses_cn_12postes_data_frame['len_code'] = masses_cn_12postes_data_frame['code_unicode'].apply(lambda x: len(x))
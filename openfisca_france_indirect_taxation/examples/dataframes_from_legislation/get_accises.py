@@ -9,9 +9,9 @@ import pandas as pd
 from pandas import concat
 
 import openfisca_france_indirect_taxation
+from openfisca_france_indirect_taxation.model.parameters import get_taux_implicite_ticpe_data_frame
 
-TaxBenefitSystem = openfisca_france_indirect_taxation.init_country()
-tax_benefit_system = TaxBenefitSystem()
+tax_benefit_system = openfisca_france_indirect_taxation.get_tax_benefit_system()
 legislation_json = tax_benefit_system.legislation_json
 
 
@@ -94,3 +94,8 @@ def get_accise_ticpe_majoree():
     accise_totale = accise_totale[accise_totale['accise majoree sans plomb'] != 2.5].copy()
 
     return accise_totale
+
+
+def get_taux_implicite_ticpe(years = None):
+    """Taux implicites de TICPE par année (en ligne) et par carburant (en colonne)"""
+    return get_taux_implicite_ticpe_data_frame(tax_benefit_system, years = years)['taux_implicite'].unstack('carburant')
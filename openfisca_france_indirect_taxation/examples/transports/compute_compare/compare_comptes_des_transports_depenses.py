@@ -19,6 +19,7 @@ import seaborn
 
 # Import de modules spécifiques à Openfisca
 from openfisca_france_indirect_taxation.examples.utils_example import graph_builder_line
+from openfisca_france_indirect_taxation.utils import get_excel_sheet, parametres_fiscalite_xls_file_path
 
 # Import d'une nouvelle palette de couleurs
 seaborn.set_palette(seaborn.color_palette("Set2", 12))
@@ -43,14 +44,7 @@ for element in products:
 depenses_bdf.index = depenses_bdf.index.astype(int)
 
 # Import des fichiers csv donnant les montants agrégés des mêmes postes d'après la comptabilité nationale
-parametres_fiscalite_file_path = os.path.join(
-    assets_directory,
-    'openfisca_france_indirect_taxation',
-    'assets',
-    'legislation',
-    'Parametres fiscalite indirecte.xls'
-    )
-masses_cn_data_frame = pd.read_excel(parametres_fiscalite_file_path, sheetname = "consommation_CN")
+masses_cn_data_frame = get_excel_sheet(parametres_fiscalite_xls_file_path, sheetname = "consommation_CN")
 
 masses_cn_carburants = masses_cn_data_frame[masses_cn_data_frame['Fonction'] == 'Carburants et lubrifiants']
 masses_cn_carburants = masses_cn_carburants.transpose()
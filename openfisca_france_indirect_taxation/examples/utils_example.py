@@ -3,12 +3,14 @@
 
 from __future__ import division
 
+import pandas
 from pandas import DataFrame
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 
 
 import openfisca_france_indirect_taxation
+from openfisca_france_indirect_taxation.model.quantiles import compute_weighted_means_by_group
 from openfisca_france_indirect_taxation.surveys import get_input_data_frame
 from openfisca_survey_manager.survey_collections import SurveyCollection
 
@@ -24,9 +26,7 @@ def create_survey_scenario(year = None):
 
     assert year is not None
     input_data_frame = get_input_data_frame(year)
-    TaxBenefitSystem = openfisca_france_indirect_taxation.init_country()
-
-    tax_benefit_system = TaxBenefitSystem()
+    tax_benefit_system = openfisca_france_indirect_taxation.get_tax_benefit_system()
     survey_scenario = SurveyScenario().init_from_data_frame(
         input_data_frame = input_data_frame,
         tax_benefit_system = tax_benefit_system,
@@ -41,9 +41,7 @@ def simulate(simulated_variables, year):
     Construction de la DataFrame à partir de laquelle sera faite l'analyse des données
     '''
     input_data_frame = get_input_data_frame(year)
-    TaxBenefitSystem = openfisca_france_indirect_taxation.init_country()
-
-    tax_benefit_system = TaxBenefitSystem()
+    tax_benefit_system = openfisca_france_indirect_taxation.get_tax_benefit_system()
     survey_scenario = SurveyScenario().init_from_data_frame(
         input_data_frame = input_data_frame,
         tax_benefit_system = tax_benefit_system,
@@ -64,9 +62,7 @@ def simulate_df_calee_by_grosposte(simulated_variables, year):
     '''
     input_data_frame = get_input_data_frame(year)
     input_data_frame_calee = build_df_calee_on_grospostes(input_data_frame, year, year)
-    TaxBenefitSystem = openfisca_france_indirect_taxation.init_country()
-
-    tax_benefit_system = TaxBenefitSystem()
+    tax_benefit_system = openfisca_france_indirect_taxation.get_tax_benefit_system()
     survey_scenario = SurveyScenario().init_from_data_frame(
         input_data_frame = input_data_frame_calee,
         tax_benefit_system = tax_benefit_system,
@@ -87,9 +83,7 @@ def simulate_df_calee_on_ticpe(simulated_variables, year):
     '''
     input_data_frame = get_input_data_frame(year)
     input_data_frame_calee = build_df_calee_on_ticpe(input_data_frame, year, year)
-    TaxBenefitSystem = openfisca_france_indirect_taxation.init_country()
-
-    tax_benefit_system = TaxBenefitSystem()
+    tax_benefit_system = openfisca_france_indirect_taxation.get_tax_benefit_system()
     survey_scenario = SurveyScenario().init_from_data_frame(
         input_data_frame = input_data_frame_calee,
         tax_benefit_system = tax_benefit_system,
@@ -117,20 +111,23 @@ def collapse(dataframe, groupe, var):
     '''
     Pour une variable, fonction qui calcule la moyenne pondérée au sein de chaque groupe.
     '''
-    grouped = dataframe.groupby([groupe])
-    var_weighted_grouped = grouped.apply(lambda x: wavg(groupe = x, var = var))
-    return var_weighted_grouped
+    return df_weighted_average_grouped(dataframe, groupe, [var])[var]
 
 
 def df_weighted_average_grouped(dataframe, groupe, varlist):
     '''
-    Agrège les résultats de weighted_average_grouped() en une unique dataframe pour la liste de variable 'varlist'.
+    Calcule en un seul passage la moyenne pondérée (par pondmen) au sein de chaque groupe des variables de 'varlist'.
     '''
-    return DataFrame(
-        dict([
-            (var, collapse(dataframe, groupe, var)) for var in varlist
-            ])
-        )
+    groups, group_values = pandas.factorize(dataframe[groupe], sort = True)
+    # Comme groupby, on ignore les lignes dont le groupe est manquant (-1)
+    selection = groups >= 0
+    means = compute_weighted_means_by_group(
+        groups[selection],
+        dataframe['pondmen'].values[selection],
+        dataframe[varlist].values[selection],
+        group_count = len(group_values),
+        )
+    return DataFrame(means, index = pandas.Index(group_values, name = groupe), columns = varlist)
 
 
 # To choose color when doing graph, could put a list of colors in argument
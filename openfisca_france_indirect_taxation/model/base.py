@@ -30,20 +30,26 @@ from openfisca_survey_manager.statshelpers import mark_weighted_percentiles, wei
 
 
 from ..entities import Individus, Menages
+from .parameters import parameters_at
+from .quantiles import compute_weighted_means_by_group, compute_weighted_sums_by_group, get_weighted_quantiles
 
 
 __all__ = [
     'AgeCol',
+    'compute_weighted_means_by_group',
+    'compute_weighted_sums_by_group',
     'DateCol',
     'DatedVariable',
     'dated_function',
     'Enum',
     'EnumCol',
     'FloatCol',
+    'get_weighted_quantiles',
     'Individus',
     'IntCol',
     'mark_weighted_percentiles',
     'Menages',
+    'parameters_at',
     'droit_d_accise',
     'tax_from_expense_including_tax',
     'Variable',
@@ -27,46 +27,56 @@
 from __future__ import division
 
 from datetime import date
+import inspect
+
+import numpy
+from scipy import sparse
 
 from openfisca_core.columns import FloatCol
 from openfisca_core.formulas import dated_function, DatedVariable
 
 
 from openfisca_france_indirect_taxation.model.base import *
-from openfisca_france_indirect_taxation.utils import get_parametres_fiscalite_data_frame
+from openfisca_france_indirect_taxation.utils import (get_cached_json, get_parametres_fiscalite_data_frame,
+    parametres_fiscalite_csv_file_path)
 
 
 categories_fiscales_data_frame = None
+# Liste de (year_start, year_stop, postes_coicop) par catégorie fiscale
+dated_postes_coicop_by_categorie_fiscale = dict()
+poste_categorie_matrix_by_year = dict()
 
 
-def function_creator(postes_coicop, year_start = None, year_stop = None):
+def function_creator(postes_coicop, year_start = None, year_stop = None, categorie_fiscale = None):
     start = date(year_start, 1, 1) if year_start is not None else None
     stop = date(year_stop, 12, 31) if year_stop is not None else None
 
     @dated_function(start = start, stop = stop)
     def func(self, simulation, period):
-        return period, sum(simulation.calculate('poste_coicop_' + poste, period) for poste in postes_coicop)
+        return period, compute_categories_fiscales(simulation, period)[
+            u'categorie_fiscale_{}'.format(categorie_fiscale)]
 
     func.__name__ = "function_{year_start}_{year_stop}".format(year_start = year_start, year_stop = year_stop)
     return func
 
 
-def generate_variables():
-    existing_categ = sorted(categories_fiscales_data_frame['categoriefiscale'].drop_duplicates())
+def build_dated_postes_coicop_by_categorie_fiscale(data_frame):
+    """Renvoie, par catégorie fiscale, la liste des (year_start, year_stop, postes_coicop) de ses fonctions datées"""
+    postes_coicop_by_year_categorie = dict(
+        ((int(year), int(categorie_fiscale)), sorted(group['posteCOICOP'].astype(str)))
+        for (year, categorie_fiscale), group in data_frame.groupby(['annee', 'categoriefiscale'])
+        )
+    existing_categ = sorted(int(categorie_fiscale) for categorie_fiscale in data_frame['categoriefiscale'].unique())
 
+    dated_postes_coicop_by_categorie_fiscale = dict()
     for categorie_fiscale in existing_categ:
         year_start = 1994
         year_final_stop = 2014
-        functions_by_name = dict()
+        dated_postes_coicop = list()
         for year in range(year_start, year_final_stop + 1):
-            postes_coicop = sorted(
-                categories_fiscales_data_frame.query(
-                    'annee == @year and categoriefiscale == @categorie_fiscale'
-                    )['posteCOICOP'].astype(str))
-            variables = ', '.join(postes_coicop)
+            postes_coicop = postes_coicop_by_year_categorie.get((year, categorie_fiscale), [])
 
             if year == year_start:
-                previous_variables = variables
                 previous_postes_coicop = postes_coicop
                 continue
 
@@ -74,18 +84,27 @@ def generate_variables():
                 continue
             else:
                 year_stop = year - 1 if year != year_final_stop else year_final_stop
-
-                dated_func = function_creator(previous_postes_coicop, year_start = year_start, year_stop = year_stop)
-                dated_function_name = u"function_{year_start}_{year_stop}".format(
-                    year_start = year_start, year_stop = year_stop)
-
                 if len(previous_postes_coicop) != 0:
-                    functions_by_name[dated_function_name] = dated_func
-
+                    dated_postes_coicop.append((year_start, year_stop, previous_postes_coicop))
                 year_start = year
 
             previous_postes_coicop = postes_coicop
 
+        dated_postes_coicop_by_categorie_fiscale[categorie_fiscale] = dated_postes_coicop
+
+    # Sorted pairs rather than a dict since JSON object keys can only be strings
+    return sorted(dated_postes_coicop_by_categorie_fiscale.items())
+
+
+def generate_variables():
+    for categorie_fiscale, dated_postes_coicop in dated_postes_coicop_by_categorie_fiscale.iteritems():
+        functions_by_name = dict()
+        for year_start, year_stop, postes_coicop in dated_postes_coicop:
+            dated_function_name = u"function_{year_start}_{year_stop}".format(
+                year_start = year_start, year_stop = year_stop)
+            functions_by_name[dated_function_name] = function_creator(postes_coicop, year_start = year_start,
+                year_stop = year_stop, categorie_fiscale = categorie_fiscale)
+
         class_name = u'categorie_fiscale_{}'.format(categorie_fiscale)
         # Trick to create a class with a dynamic name.
         definitions_by_name = dict(
@@ -98,11 +117,91 @@ def generate_variables():
         del definitions_by_name
 
 
-def preload_categories_fiscales_data_frame():
+def build_definitions():
     global categories_fiscales_data_frame
-    if categories_fiscales_data_frame is None:
-        categories_fiscales_data_frame = get_parametres_fiscalite_data_frame()
-        categories_fiscales_data_frame = categories_fiscales_data_frame[
-            ['posteCOICOP', 'annee', 'categoriefiscale']
-            ].copy()
+    categories_fiscales_data_frame = get_parametres_fiscalite_data_frame()
+    categories_fiscales_data_frame = categories_fiscales_data_frame[
+        ['posteCOICOP', 'annee', 'categoriefiscale']
+        ].copy()
+    return build_dated_postes_coicop_by_categorie_fiscale(categories_fiscales_data_frame)
+
+
+def preload_categories_fiscales_data_frame():
+    """Génère les variables categorie_fiscale_*
+
+    Les listes de postes des fonctions datées sont mises en cache (dans le répertoire de cache utilisateur) et ne
+    sont recalculées que lorsque le fichier des paramètres de fiscalité indirecte ou le code qui le lit change.
+    """
+    if not dated_postes_coicop_by_categorie_fiscale:
+        definitions = get_cached_json(
+            'categories_fiscales',
+            [
+                parametres_fiscalite_csv_file_path,
+                inspect.getsourcefile(build_definitions),
+                inspect.getsourcefile(get_parametres_fiscalite_data_frame),
+                ],
+            build_definitions,
+            )
+        for categorie_fiscale, dated_postes_coicop in definitions:
+            dated_postes_coicop_by_categorie_fiscale[categorie_fiscale] = [
+                (year_start, year_stop, postes_coicop)
+                for year_start, year_stop, postes_coicop in dated_postes_coicop
+                ]
         generate_variables()
+
+
+def get_poste_categorie_matrix(year):
+    """Renvoie les catégories fiscales, les postes COICOP et la matrice creuse (CSR) catégories x postes"""
+    if year not in poste_categorie_matrix_by_year:
+        postes_coicop_by_categorie_fiscale = dict()
+        for categorie_fiscale, dated_postes_coicop in dated_postes_coicop_by_categorie_fiscale.iteritems():
+            for year_start, year_stop, postes_coicop in dated_postes_coicop:
+                if year_start <= year <= year_stop:
+                    postes_coicop_by_categorie_fiscale[categorie_fiscale] = postes_coicop
+                    break
+
+        categories_fiscales = sorted(postes_coicop_by_categorie_fiscale.keys())
+        postes_coicop = sorted(set(
+            poste
+            for postes_coicop in postes_coicop_by_categorie_fiscale.itervalues()
+            for poste in postes_coicop
+            ))
+        index_by_poste = dict((poste, index) for index, poste in enumerate(postes_coicop))
+        rows = list()
+        columns = list()
+        for row, categorie_fiscale in enumerate(categories_fiscales):
+            for poste in postes_coicop_by_categorie_fiscale[categorie_fiscale]:
+                rows.append(row)
+                columns.append(index_by_poste[poste])
+        matrix = sparse.csr_matrix(
+            (numpy.ones(len(rows)), (rows, columns)),
+            shape = (len(categories_fiscales), len(postes_coicop)),
+            )
+        poste_categorie_matrix_by_year[year] = (categories_fiscales, postes_coicop, matrix)
+
+    return poste_categorie_matrix_by_year[year]
+
+
+def compute_categories_fiscales(simulation, period):
+    """Calcule toutes les catégories fiscales de la période en un seul produit matriciel creux
+
+    Les holders des variables categorie_fiscale_* sont remplis au passage, si bien que les autres catégories
+    fiscales de la période ne sont plus recalculées.
+    """
+    categories_fiscales, postes_coicop, matrix = get_poste_categorie_matrix(period.start.year)
+    depenses_by_poste = numpy.vstack([
+        simulation.calculate('poste_coicop_' + poste, period)
+        for poste in postes_coicop
+        ])
+    depenses_by_categorie = matrix.dot(depenses_by_poste)
+
+    array_by_name = dict()
+    for categorie_fiscale, depenses in zip(categories_fiscales, depenses_by_categorie):
+        name = u'categorie_fiscale_{}'.format(categorie_fiscale)
+        holder = simulation.get_or_new_holder(name)
+        array = holder.get_array(period)
+        if array is None:
+            array = depenses.astype(holder.column.dtype)
+            holder.put_in_cache(array, period)
+        array_by_name[name] = array
+    return array_by_name
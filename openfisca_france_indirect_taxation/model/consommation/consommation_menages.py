@@ -136,7 +136,8 @@ class depenses_diesel_htva(Variable):
     label = u"Dépenses en diesel htva (mais incluant toujours la TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        parameters = parameters_at(simulation, period.start)
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
         depenses_diesel = simulation.calculate('depenses_diesel', period)
         depenses_diesel_htva = depenses_diesel - tax_from_expense_including_tax(depenses_diesel, taux_plein_tva)
 
@@ -149,21 +150,8 @@ class depenses_diesel_ht(Variable):
     label = u"Dépenses en diesel ht (prix brut sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            majoration_ticpe_diesel = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_gazole.alsace
-            accise_diesel = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-            accise_diesel_ticpe = accise_diesel + majoration_ticpe_diesel
-        except:
-            accise_diesel_ticpe = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-
-        prix_diesel_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.diesel_ttc
-        taux_implicite_diesel = (
-            (accise_diesel_ticpe * (1 + taux_plein_tva)) /
-            (prix_diesel_ttc - accise_diesel_ticpe * (1 + taux_plein_tva))
-            )
+        parameters = parameters_at(simulation, period.start)
+        taux_implicite_diesel = parameters['imposition_indirecte.taux_implicite_ticpe.diesel']
 
         depenses_diesel_htva = simulation.calculate('depenses_diesel_htva', period)
         depenses_diesel_ht = \
@@ -178,22 +166,11 @@ class depenses_diesel_recalculees(Variable):
     label = u"Dépenses en diesel recalculées à partir du prix ht"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        parameters = parameters_at(simulation, period.start)
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
         depenses_diesel_ht = simulation.calculate('depenses_diesel_ht', period)
 
-        try:
-            majoration_ticpe_diesel = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_gazole.alsace
-            accise_diesel = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-            accise_diesel_ticpe = accise_diesel + majoration_ticpe_diesel
-        except:
-            accise_diesel_ticpe = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-
-        prix_diesel_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.diesel_ttc
-        taux_implicite_diesel = (
-            (accise_diesel_ticpe * (1 + taux_plein_tva)) /
-            (prix_diesel_ttc - accise_diesel_ticpe * (1 + taux_plein_tva))
-            )
+        taux_implicite_diesel = parameters['imposition_indirecte.taux_implicite_ticpe.diesel']
 
         depenses_diesel_recalculees = depenses_diesel_ht * (1 + taux_plein_tva) * (1 + taux_implicite_diesel)
 
@@ -206,27 +183,14 @@ class depenses_sp_e10_ht(Variable):
     label = u"Dépenses en essence sans plomb e10 hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        parameters = parameters_at(simulation, period.start)
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp_e10 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_e10
+        part_sp_e10 = parameters['imposition_indirecte.part_type_supercarburants.sp_e10']
         depenses_sp_e10 = depenses_essence * part_sp_e10
         depenses_sp_e10_htva = depenses_sp_e10 - tax_from_expense_including_tax(depenses_sp_e10, taux_plein_tva)
 
-        try:
-            accise_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super_e10
-            majoration_ticpe_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super_e10 = accise_super_e10 + majoration_ticpe_super_e10
-        except:
-            accise_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super_e10
-
-        super_95_e10_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_e10_ttc
-        taux_implicite_sp_e10 = (
-            (accise_ticpe_super_e10 * (1 + taux_plein_tva)) /
-            (super_95_e10_ttc - accise_ticpe_super_e10 * (1 + taux_plein_tva))
-            )
+        taux_implicite_sp_e10 = parameters['imposition_indirecte.taux_implicite_ticpe.sp_e10']
         depenses_sp_e10_ht = \
             depenses_sp_e10_htva - tax_from_expense_including_tax(depenses_sp_e10_htva, taux_implicite_sp_e10)
 
@@ -239,23 +203,12 @@ class depenses_sp_95_ht(Variable):
     label = u"Dépenses en essence sans plomb 95 hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            accise_super95 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-            majoration_ticpe_super95 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super95 = accise_super95 + majoration_ticpe_super95
-        except:
-            accise_ticpe_super95 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
+        parameters = parameters_at(simulation, period.start)
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
 
-        super_95_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_ttc
-        taux_implicite_sp95 = (
-            (accise_ticpe_super95 * (1 + taux_plein_tva)) /
-            (super_95_ttc - accise_ticpe_super95 * (1 + taux_plein_tva))
-            )
+        taux_implicite_sp95 = parameters['imposition_indirecte.taux_implicite_ticpe.sp95']
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp95 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_95
+        part_sp95 = parameters['imposition_indirecte.part_type_supercarburants.sp_95']
         depenses_sp_95 = depenses_essence * part_sp95
         depenses_sp_95_htva = depenses_sp_95 - tax_from_expense_including_tax(depenses_sp_95, taux_plein_tva)
         depenses_sp_95_ht = \
@@ -270,23 +223,12 @@ class depenses_sp_98_ht(Variable):
     label = u"Dépenses en essence sans plomb 98 hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        parameters = parameters_at(simulation, period.start)
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
 
-        try:
-            accise_super98 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-            majoration_ticpe_super98 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super98 = accise_super98 + majoration_ticpe_super98
-        except:
-            accise_ticpe_super98 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-
-        super_98_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_98_ttc
-        taux_implicite_sp98 = (
-            (accise_ticpe_super98 * (1 + taux_plein_tva)) /
-            (super_98_ttc - accise_ticpe_super98 * (1 + taux_plein_tva))
-            )
+        taux_implicite_sp98 = parameters['imposition_indirecte.taux_implicite_ticpe.sp98']
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp98 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_98
+        part_sp98 = parameters['imposition_indirecte.part_type_supercarburants.sp_98']
         depenses_sp_98 = depenses_essence * part_sp98
         depenses_sp_98_htva = depenses_sp_98 - tax_from_expense_including_tax(depenses_sp_98, taux_plein_tva)
         depenses_sp_98_ht = \
@@ -301,17 +243,11 @@ class depenses_super_plombe_ht(Variable):
     label = u"Dépenses en essence super plombée hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        accise_super_plombe_ticpe = \
-            simulation.legislation_at(period.start).imposition_indirecte.ticpe.super_plombe_ticpe
-        super_plombe_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_plombe_ttc
-        taux_implicite_super_plombe = (
-            (accise_super_plombe_ticpe * (1 + taux_plein_tva)) /
-            (super_plombe_ttc - accise_super_plombe_ticpe * (1 + taux_plein_tva))
-            )
+        parameters = parameters_at(simulation, period.start)
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
+        taux_implicite_super_plombe = parameters['imposition_indirecte.taux_implicite_ticpe.super_plombe']
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_super_plombe = \
-            simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.super_plombe
+        part_super_plombe = parameters['imposition_indirecte.part_type_supercarburants.super_plombe']
         depenses_super_plombe = depenses_essence * part_super_plombe
         depenses_super_plombe_htva = \
             depenses_super_plombe - tax_from_expense_including_tax(depenses_super_plombe, taux_plein_tva)
@@ -356,7 +292,8 @@ class depenses_essence_recalculees(Variable):
     label = u"Dépenses en essence recalculées à partir du prix ht"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        parameters = parameters_at(simulation, period.start)
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
         depenses_sp_e10_ht = simulation.calculate('depenses_sp_e10_ht', period)
         depenses_sp_95_ht = simulation.calculate('depenses_sp_95_ht', period)
         depenses_sp_98_ht = simulation.calculate('depenses_sp_98_ht', period)
@@ -5,43 +5,64 @@
 from __future__ import division
 
 from datetime import date
+import inspect
 
 from openfisca_core.columns import FloatCol
 from openfisca_core.formulas import Variable
 
 
 from openfisca_france_indirect_taxation.model.base import *
-from openfisca_france_indirect_taxation.utils import get_parametres_fiscalite_data_frame
+from openfisca_france_indirect_taxation.utils import (get_cached_json, get_parametres_fiscalite_data_frame,
+    parametres_fiscalite_csv_file_path)
 
 
 postes_coicop_data_frame = None
+label_by_poste_coicop = dict()
+
+
+def build_label_by_poste_coicop(data_frame):
+    """Renvoie les couples (poste COICOP, libellé) des variables poste_coicop_* à générer"""
+    data_frame = data_frame.drop_duplicates('posteCOICOP', keep = 'last')
+    return [
+        (int(poste), description.decode('utf-8') if isinstance(description, str) else description)
+        for poste, description in zip(data_frame.posteCOICOP.values, data_frame.description.values)
+        ]
 
 
 def generate_variables():
-    postes_coicop_list = [element for element in postes_coicop_data_frame.posteCOICOP.values]
-    for poste in postes_coicop_list:
-        extraction_condition = postes_coicop_data_frame.posteCOICOP == int(poste)
-        liste_annees = postes_coicop_data_frame.loc[
-            extraction_condition,
-            'annee'].copy()
-        # assert liste_annees.shape == (21L,), "Some goods do not exist during certain years"
-        label = postes_coicop_data_frame.loc[
-            extraction_condition,
-            'description'].values.squeeze().tolist()
+    for poste, label in label_by_poste_coicop.iteritems():
         class_name = u'poste_coicop_{}'.format(poste)
         # Trick to create a class with a dynamic name.
         type(class_name.encode('utf-8'), (Variable,), dict(
             column = FloatCol,
             entity_class = Menages,
-            label = label.decode('utf-8'),
+            label = label,
             ))
 
 
-def preload_postes_coicop_data_frame():
+def build_definitions():
     global postes_coicop_data_frame
-    if postes_coicop_data_frame is None:
-        postes_coicop_data_frame = get_parametres_fiscalite_data_frame()
-        postes_coicop_data_frame = postes_coicop_data_frame[
-            ['posteCOICOP', 'annee', 'description', 'categoriefiscale']].copy()
-        postes_coicop_data_frame.drop_duplicates('posteCOICOP', keep = 'last', inplace = True)
+    postes_coicop_data_frame = get_parametres_fiscalite_data_frame()
+    postes_coicop_data_frame = postes_coicop_data_frame[
+        ['posteCOICOP', 'annee', 'description', 'categoriefiscale']].copy()
+    postes_coicop_data_frame.drop_duplicates('posteCOICOP', keep = 'last', inplace = True)
+    return build_label_by_poste_coicop(postes_coicop_data_frame)
+
+
+def preload_postes_coicop_data_frame():
+    """Génère les variables poste_coicop_*
+
+    Les libellés sont mis en cache (dans le répertoire de cache utilisateur) et ne sont relus que lorsque le fichier
+    des paramètres de fiscalité indirecte ou le code qui le lit change.
+    """
+    if not label_by_poste_coicop:
+        label_by_poste_coicop.update(get_cached_json(
+            'postes_coicop',
+            [
+                parametres_fiscalite_csv_file_path,
+                inspect.getsourcefile(build_definitions),
+                inspect.getsourcefile(get_parametres_fiscalite_data_frame),
+                ],
+            build_definitions,
+            ))
         generate_variables()
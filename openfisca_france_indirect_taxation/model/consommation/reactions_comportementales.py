@@ -23,8 +23,9 @@ class depenses_essence_ajustees(Variable):
     label = u"Dépenses en essence après réaction à la réforme des prix"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_essence = simulation.calculate('depenses_essence', period)
-        super_95_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_ttc
+        super_95_ttc = parameters['imposition_indirecte.prix_carburants.super_95_ttc']
         reforme_essence = 30
         # simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.reforme_essence
         carburants_elasticite_prix = simulation.calculate('carburants_elasticite_prix')
@@ -39,9 +40,10 @@ class depenses_diesel_ajustees(Variable):
     label = u"Dépenses en diesel après réaction à la réforme des prix"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_diesel = simulation.calculate('depenses_diesel', period)
-        diesel_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.diesel_ttc
-        reforme_diesel = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.reforme_diesel
+        diesel_ttc = parameters['imposition_indirecte.prix_carburants.diesel_ttc']
+        reforme_diesel = parameters['imposition_indirecte.prix_carburants.reforme_diesel']
         carburants_elasticite_prix = simulation.calculate('carburants_elasticite_prix')
         depenses_essence_ajustees = \
             depenses_diesel * (1 + (1 + carburants_elasticite_prix) * reforme_diesel / diesel_ttc)
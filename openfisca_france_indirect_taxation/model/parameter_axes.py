@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Evaluation of formulas for many values of some legislation parameters at once
+
+Some scalar parameters become axes: 1-D arrays of K candidate values, the k-th legislation using the k-th value of
+each axis. Variables downstream of the axes are then computed as households x K arrays in a single NumPy broadcast:
+their formulas see the axes as arrays of shape (K,) in the flat legislation and the other variables, taken from the
+simulation, as columns of shape (households, 1). This works for formulas combining their inputs element-wise, e.g.
+through tax_from_expense_including_tax, droit_d_accise or taux_implicite (for the derived TICPE rates), which is the
+case of the tax formulas.
+
+>>> calculate_on_parameter_axes(simulation, 'tva_taux_plein',
+...     {'imposition_indirecte.tva.taux_plein': numpy.linspace(.15, .25, 11)})
+"""
+
+
+import numpy
+
+from ..dependencies import get_downstream_variables
+from .parameters import parameters_at, set_parameter_values
+
+
+class ParameterAxesSimulation(object):
+    """Simulation as seen by the formulas evaluated on parameter axes"""
+
+    def __init__(self, simulation, value_by_path, output_variables, period = None):
+        if period is None:
+            period = simulation.period
+        self.simulation = simulation
+        self.period = period
+        self.axes_length = len(value_by_path.itervalues().next())
+        self.array_by_variable = dict()
+        self.axes_variables = get_downstream_variables(
+            value_by_path.keys(),
+            output_variables,
+            period,
+            simulation.tax_benefit_system,
+            )
+        set_parameter_values(self, parameters_at(simulation, period.start), value_by_path)
+
+    def __getattr__(self, name):
+        return getattr(self.simulation, name)
+
+    def calculate(self, column_name, period = None, **parameters):
+        if column_name not in self.axes_variables:
+            return self.simulation.calculate(column_name, period, **parameters)[:, numpy.newaxis]
+        if period is not None:
+            assert period == self.period, u'Parameter axes only apply to period {}'.format(self.period)
+        array = self.array_by_variable.get(column_name)
+        if array is None:
+            function = get_formula_function(self.simulation.get_or_new_holder(column_name).formula, self.period)
+            if function is None:
+                array = self.simulation.calculate(column_name, self.period)[:, numpy.newaxis]
+            else:
+                _, array = function(self, self.period)
+            array = self.array_by_variable[column_name] = array + numpy.zeros((1, self.axes_length))
+        return array
+
+    compute = calculate
+
+
+def get_formula_function(formula, period):
+    """Return the formula function in force at the start of the period, or None"""
+    dated_formulas = getattr(formula, 'dated_formulas', None)
+    if dated_formulas is None:
+        return formula.function
+    for dated_formula in dated_formulas:
+        start_instant = dated_formula['start_instant']
+        stop_instant = dated_formula['stop_instant']
+        if (start_instant is None or start_instant <= period.start) and \
+                (stop_instant is None or period.start <= stop_instant):
+            return dated_formula['formula'].function
+    return None
+
+
+def new_parameter_axes_simulation(simulation, value_by_path, output_variables, period = None):
+    """Return the simulation on which the output variables are calculated along the parameter axes
+
+    value_by_path maps the dotted path of each axis parameter (see parameters_at) to its K values. Variables which
+    do not depend on the axes are taken from the simulation, repeated along the axes.
+    """
+    value_by_path = dict(
+        (path, numpy.asarray(values, dtype = float))
+        for path, values in value_by_path.iteritems()
+        )
+    assert value_by_path, 'At least one parameter axis is needed'
+    assert len(set(values.shape for values in value_by_path.itervalues())) == 1 and \
+        value_by_path.itervalues().next().ndim == 1, 'Parameter axes must be 1-D arrays of the same length'
+    return ParameterAxesSimulation(simulation, value_by_path, output_variables, period = period)
+
+
+def calculate_on_parameter_axes(simulation, variable, value_by_path, period = None):
+    """Return the households x K values of the variable, for the K values of the parameters chosen as axes"""
+    return new_parameter_axes_simulation(simulation, value_by_path, [variable], period = period).calculate(variable)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Flat, per instant view of the compact legislation shared by all the formulas of a simulation
+
+Formulas call `parameters_at(simulation, period.start)` and read parameters by their dotted path, e.g.
+`parameters['imposition_indirecte.tva.taux_plein']`, instead of walking the compact legislation tree with repeated
+`simulation.legislation_at(period.start)` calls.
+
+The view also holds derived parameters, computed once per instant from the legislation: the TICPE accise including
+the regional majoration and the implicit TICPE rate of each fuel (see `add_taux_implicite_ticpe`).
+"""
+
+
+import collections
+import weakref
+
+from openfisca_core import periods
+from openfisca_core.legislations import CompactNode
+
+
+flat_legislation_by_instant_by_simulation = weakref.WeakKeyDictionary()
+statistics = collections.Counter()
+
+# Carburant : (accise nationale, majoration régionale, prix TTC)
+ticpe_paths_by_carburant = collections.OrderedDict([
+    ('diesel', (
+        'imposition_indirecte.ticpe.ticpe_gazole',
+        'imposition_indirecte.major_regionale_ticpe_gazole.alsace',
+        'imposition_indirecte.prix_carburants.diesel_ttc',
+        )),
+    ('sp95', (
+        'imposition_indirecte.ticpe.ticpe_super9598',
+        'imposition_indirecte.major_regionale_ticpe_super.alsace',
+        'imposition_indirecte.prix_carburants.super_95_ttc',
+        )),
+    ('sp98', (
+        'imposition_indirecte.ticpe.ticpe_super9598',
+        'imposition_indirecte.major_regionale_ticpe_super.alsace',
+        'imposition_indirecte.prix_carburants.super_98_ttc',
+        )),
+    ('sp_e10', (
+        'imposition_indirecte.ticpe.ticpe_super_e10',
+        'imposition_indirecte.major_regionale_ticpe_super.alsace',
+        'imposition_indirecte.prix_carburants.super_95_e10_ttc',
+        )),
+    ('super_plombe', (
+        'imposition_indirecte.ticpe.super_plombe_ticpe',
+        None,
+        'imposition_indirecte.prix_carburants.super_plombe_ttc',
+        )),
+    ])
+taux_plein_tva_path = 'imposition_indirecte.tva.taux_plein'
+
+
+class FlatLegislation(object):
+    """Values of the legislation parameters at a given instant, indexed by their dotted path"""
+    __slots__ = ('instant', 'value_by_path')
+
+    def __init__(self, instant, value_by_path):
+        self.instant = instant
+        self.value_by_path = value_by_path
+
+    def __contains__(self, path):
+        return path in self.value_by_path
+
+    def __getitem__(self, path):
+        return self.value_by_path[path]
+
+    def get(self, path, default = None):
+        return self.value_by_path.get(path, default)
+
+
+def flatten_compact_node(compact_node, prefix = None, value_by_path = None):
+    if value_by_path is None:
+        value_by_path = dict()
+    for key, value in compact_node.__dict__.iteritems():
+        if key == 'instant':
+            continue
+        path = key if prefix is None else u'{}.{}'.format(prefix, key)
+        if isinstance(value, CompactNode):
+            flatten_compact_node(value, prefix = path, value_by_path = value_by_path)
+        else:
+            value_by_path[path] = value
+    return value_by_path
+
+
+def add_taux_implicite_ticpe(value_by_path):
+    """Add the majoration-included accise and the implicit TICPE rate of each fuel to the flat legislation
+
+    They are stored under imposition_indirecte.accise_ticpe_majoree.<carburant> and
+    imposition_indirecte.taux_implicite_ticpe.<carburant>. Fuels without accise or price at this instant are skipped.
+    The regional majoration (Alsace) only exists since 2007 and counts as 0 before.
+    """
+    from .base import taux_implicite
+    taux_plein_tva = value_by_path.get(taux_plein_tva_path)
+    if taux_plein_tva is None:
+        return value_by_path
+    for carburant, (accise_path, majoration_path, prix_ttc_path) in ticpe_paths_by_carburant.iteritems():
+        accise = value_by_path.get(accise_path)
+        prix_ttc = value_by_path.get(prix_ttc_path)
+        if accise is None or prix_ttc is None:
+            continue
+        accise_majoree = accise + (value_by_path.get(majoration_path, 0) if majoration_path is not None else 0)
+        value_by_path['imposition_indirecte.accise_ticpe_majoree.' + carburant] = accise_majoree
+        value_by_path['imposition_indirecte.taux_implicite_ticpe.' + carburant] = taux_implicite(
+            accise_majoree, taux_plein_tva, prix_ttc)
+    return value_by_path
+
+
+def get_derived_parameter_paths(path):
+    """Return the paths of the derived parameters (see add_taux_implicite_ticpe) whose value depends on the parameter"""
+    derived_paths = set()
+    for carburant, paths in ticpe_paths_by_carburant.iteritems():
+        if path == taux_plein_tva_path or path in paths:
+            derived_paths.add('imposition_indirecte.taux_implicite_ticpe.' + carburant)
+            if path in paths[:2]:
+                derived_paths.add('imposition_indirecte.accise_ticpe_majoree.' + carburant)
+    return derived_paths
+
+
+def build_flat_legislation(compact_legislation, instant):
+    return FlatLegislation(instant, add_taux_implicite_ticpe(flatten_compact_node(compact_legislation)))
+
+
+def parameters_at(simulation, instant):
+    """Return the flat legislation of the simulation at the given instant, resolving it on first use"""
+    flat_legislation_by_instant = flat_legislation_by_instant_by_simulation.get(simulation)
+    if flat_legislation_by_instant is None:
+        flat_legislation_by_instant = flat_legislation_by_instant_by_simulation[simulation] = dict()
+    flat_legislation = flat_legislation_by_instant.get(instant)
+    if flat_legislation is None:
+        statistics['misses'] += 1
+        flat_legislation = flat_legislation_by_instant[instant] = build_flat_legislation(
+            simulation.legislation_at(instant),
+            instant,
+            )
+    else:
+        statistics['hits'] += 1
+    return flat_legislation
+
+
+def get_changed_parameter_paths(flat_legislation, other_flat_legislation):
+    """Return the paths of the parameters (derived ones included) which differ between two flat legislations"""
+    paths = set(flat_legislation.value_by_path).symmetric_difference(other_flat_legislation.value_by_path)
+    for path, value in flat_legislation.value_by_path.iteritems():
+        other_value = other_flat_legislation.value_by_path.get(path, value)
+        if type(other_value) is not type(value) or other_value != value:
+            paths.add(path)
+    return paths
+
+
+def set_parameter_values(simulation, flat_legislation, value_by_path):
+    """Make the formulas of the simulation see the flat legislation with some parameters replaced
+
+    Derived parameters are recomputed from the new values. The flat legislation is usually the one returned by
+    parameters_at before any replacement, so that successive calls do not pile up.
+    """
+    for path in value_by_path:
+        assert path in flat_legislation, u'Unknown parameter {}'.format(path)
+    new_value_by_path = flat_legislation.value_by_path.copy()
+    new_value_by_path.update(value_by_path)
+    flat_legislation_by_instant = flat_legislation_by_instant_by_simulation.setdefault(simulation, dict())
+    flat_legislation_by_instant[flat_legislation.instant] = FlatLegislation(
+        flat_legislation.instant,
+        add_taux_implicite_ticpe(new_value_by_path),
+        )
+
+
+def get_taux_implicite_ticpe_data_frame(tax_benefit_system, years = None):
+    """Return the year x fuel table of accise, majoration-included accise and implicit TICPE rate
+
+    Values are taken on January 1st of each year, as seen by the formulas of yearly simulations.
+    """
+    import pandas
+    from .base import taux_implicite
+
+    if years is None:
+        years = range(1990, 2015)
+    rows = list()
+    for year in years:
+        instant = periods.instant(year)
+        value_by_path = flatten_compact_node(tax_benefit_system.get_compact_legislation(instant))
+        for carburant, (accise_path, majoration_path, prix_ttc_path) in ticpe_paths_by_carburant.iteritems():
+            rows.append(dict(
+                accise = value_by_path.get(accise_path),
+                annee = year,
+                carburant = carburant,
+                majoration = value_by_path.get(majoration_path, 0) if majoration_path is not None else 0,
+                prix_ttc = value_by_path.get(prix_ttc_path),
+                taux_plein_tva = value_by_path.get(taux_plein_tva_path),
+                ))
+    data_frame = pandas.DataFrame(rows).dropna(subset = ['accise', 'prix_ttc', 'taux_plein_tva'])
+    data_frame['accise_majoree'] = data_frame.accise + data_frame.majoration
+    data_frame['taux_implicite'] = taux_implicite(
+        data_frame.accise_majoree, data_frame.taux_plein_tva, data_frame.prix_ttc)
+    return data_frame.set_index(['annee', 'carburant'])[
+        ['accise', 'accise_majoree', 'taux_implicite', 'prix_ttc', 'taux_plein_tva']]
+
+
+def get_statistics():
+    return dict(hits = statistics['hits'], misses = statistics['misses'])
+
+
+def reset_statistics():
+    statistics.clear()
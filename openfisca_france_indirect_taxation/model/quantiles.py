@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Weighted quantiles and grouped weighted aggregates
+
+The quantiles of a variable are computed with a single sort: cumulative weights of the sorted values give the
+thresholds, and each household gets its quantile by a binary search among them. The quantiles are those of
+openfisca_survey_manager.statshelpers.weighted_quantiles, which computed one interpolated threshold and one boolean
+mask per quantile, except for the largest value (see compute_weighted_quantiles). They are cached per simulation,
+variable, period and weight variable. Grouped weighted sums and means of many variables are computed in a single
+numpy.bincount pass.
+"""
+
+
+from __future__ import division
+
+import collections
+import weakref
+
+import numpy
+
+
+quantiles_by_key_by_simulation = weakref.WeakKeyDictionary()
+statistics = collections.Counter()
+
+
+def compute_weighted_quantiles(values, weights, quantile_count = 10):
+    """Return the quantile (from 1 to quantile_count) of each value and the quantile_count - 1 thresholds
+
+    As in weighted.quantile_1D, each sorted value stands at the middle of its cumulative weight and the k-th
+    threshold is interpolated at k / quantile_count of the total weight. Values equal to a threshold belong to the
+    upper quantile. The quantiles are thus those of weighted_quantiles, except for the households having the largest
+    value, which weighted_quantiles puts in the first quantile and which belong to the last one here.
+    """
+    values = numpy.asarray(values)
+    order = numpy.argsort(values)
+    sorted_weights = numpy.asarray(weights, dtype = float)[order]
+    cumulative_weights = numpy.cumsum(sorted_weights)
+    thresholds = numpy.interp(
+        numpy.arange(1, quantile_count) / quantile_count,
+        (cumulative_weights - sorted_weights / 2) / cumulative_weights[-1],
+        values[order],
+        )
+    return numpy.searchsorted(thresholds, values, side = 'right') + 1, thresholds
+
+
+def get_weighted_quantiles(simulation, variable, period = None, weight_variable = 'pondmen', quantile_count = 10):
+    """Return the quantiles and the thresholds of the variable of the simulation, computed on first use"""
+    if period is None:
+        period = simulation.period
+    quantiles_by_key = quantiles_by_key_by_simulation.setdefault(simulation, dict())
+    key = (variable, period, weight_variable, quantile_count)
+    quantiles = quantiles_by_key.get(key)
+    if quantiles is None:
+        statistics['misses'] += 1
+        quantiles = quantiles_by_key[key] = compute_weighted_quantiles(
+            simulation.calculate(variable, period),
+            simulation.calculate(weight_variable, period),
+            quantile_count = quantile_count,
+            )
+    else:
+        statistics['hits'] += 1
+    return quantiles
+
+
+def compute_weighted_sums_by_group(groups, weights, values, group_count = None):
+    """Return the group x variable weighted sums of values (households x variables) and the total weight by group
+
+    Groups are integers from 0 to group_count - 1. As in pandas sums, missing (NaN) values are skipped: they add
+    nothing to the sum of their group but their weight still counts in its total weight.
+    """
+    groups = numpy.asarray(groups, dtype = int)
+    weights = numpy.asarray(weights, dtype = float)
+    values = numpy.asarray(values, dtype = float)
+    if values.ndim == 1:
+        values = values[:, numpy.newaxis]
+    if group_count is None:
+        group_count = groups.max() + 1
+    variable_count = values.shape[1]
+    weighted_values = values * weights[:, numpy.newaxis]
+    weighted_values[numpy.isnan(values)] = 0
+    sums = numpy.bincount(
+        (groups[:, numpy.newaxis] * variable_count + numpy.arange(variable_count)).ravel(),
+        weights = weighted_values.ravel(),
+        minlength = group_count * variable_count,
+        ).reshape(group_count, variable_count)
+    return sums, numpy.bincount(groups, weights = weights, minlength = group_count)
+
+
+def compute_weighted_means_by_group(groups, weights, values, group_count = None):
+    sums, total_weights = compute_weighted_sums_by_group(groups, weights, values, group_count = group_count)
+    return sums / total_weights[:, numpy.newaxis]
+
+
+def get_statistics():
+    return dict(hits = statistics['hits'], misses = statistics['misses'])
+
+
+def reset_statistics():
+    statistics.clear()
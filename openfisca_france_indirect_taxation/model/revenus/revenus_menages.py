@@ -25,8 +25,6 @@
 from __future__ import division
 
 
-import numpy
-
 from ..base import *  # noqa analysis:ignore
 
 
@@ -67,14 +65,7 @@ class niveau_vie_decile(Variable):
     label = u"Décile de niveau de vie"
 
     def function(self, simulation, period):
-        niveau_de_vie = simulation.calculate('niveau_de_vie', period)
-        pondmen = simulation.calculate('pondmen', period)
-        labels = numpy.arange(1, 11)
-        # Alternative method
-        # method = 2
-        # niveau_vie_decile, values = mark_weighted_percentiles(
-        # niveau_de_vie, labels, pondmen, method, return_quantiles = True)
-        niveau_vie_decile, values = weighted_quantiles(niveau_de_vie, labels, pondmen, return_quantiles = True)
+        niveau_vie_decile, _ = get_weighted_quantiles(simulation, 'niveau_de_vie', period, weight_variable = 'pondmen')
         return period, niveau_vie_decile
 
 
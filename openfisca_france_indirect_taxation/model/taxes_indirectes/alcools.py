@@ -13,11 +13,11 @@ class alcools_forts_droit_d_accise(Variable):
     label = u"Montant des droits d'accises sur les alcools forts"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_alcools_forts = simulation.calculate('depenses_alcools_forts', period)
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        alcool_conso_et_vin = simulation.legislation_at(period.start).imposition_indirecte.alcool_conso_et_vin
-        droit_cn = alcool_conso_et_vin.alcools_forts.droit_cn_alcools_total
-        consommation_cn = alcool_conso_et_vin.alcools_forts.masse_conso_cn_alcools
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
+        droit_cn = parameters['imposition_indirecte.alcool_conso_et_vin.alcools_forts.droit_cn_alcools_total']
+        consommation_cn = parameters['imposition_indirecte.alcool_conso_et_vin.alcools_forts.masse_conso_cn_alcools']
         return period, droit_d_accise(depenses_alcools_forts, droit_cn, consommation_cn, taux_plein_tva)
 
 
@@ -27,11 +27,11 @@ class biere_droit_d_accise(Variable):
     label = u"Montant des droits d'accises sur la bière"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_biere = simulation.calculate('depenses_biere', period)
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        alcool_conso_et_vin = simulation.legislation_at(period.start).imposition_indirecte.alcool_conso_et_vin
-        droit_cn = alcool_conso_et_vin.biere.droit_cn_biere
-        consommation_cn = alcool_conso_et_vin.biere.masse_conso_cn_biere
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
+        droit_cn = parameters['imposition_indirecte.alcool_conso_et_vin.biere.droit_cn_biere']
+        consommation_cn = parameters['imposition_indirecte.alcool_conso_et_vin.biere.masse_conso_cn_biere']
         return period, droit_d_accise(depenses_biere, droit_cn, consommation_cn, taux_plein_tva)
 
 
@@ -53,9 +53,9 @@ class vin_droit_d_accise(Variable):
     label = u"Montant des droits d'accises sur le vin"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_vin = simulation.calculate('depenses_vin', period)
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        alcool_conso_et_vin = simulation.legislation_at(period.start).imposition_indirecte.alcool_conso_et_vin
-        droit_cn = alcool_conso_et_vin.vin.droit_cn_vin
-        consommation_cn = alcool_conso_et_vin.vin.masse_conso_cn_vin
+        taux_plein_tva = parameters['imposition_indirecte.tva.taux_plein']
+        droit_cn = parameters['imposition_indirecte.alcool_conso_et_vin.vin.droit_cn_vin']
+        consommation_cn = parameters['imposition_indirecte.alcool_conso_et_vin.vin.masse_conso_cn_vin']
         return period, droit_d_accise(depenses_vin, droit_cn, consommation_cn, taux_plein_tva)
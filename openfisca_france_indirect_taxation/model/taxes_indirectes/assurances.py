@@ -19,8 +19,9 @@ class assurance_sante_taxe(Variable):
     label = u"Montant des taxes sur l'assurance santé"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_assurance_sante = simulation.calculate('depenses_assurance_sante', period)
-        taux = simulation.legislation_at(period.start).imposition_indirecte.taux_assurances.contrats_d_assurance_maladie_individuelles_et_collectives_cas_general_2_ter
+        taux = parameters['imposition_indirecte.taux_assurances.contrats_d_assurance_maladie_individuelles_et_collectives_cas_general_2_ter']
         # To do: use datedformula and change the computation method when other taxes play a role.
         return period, tax_from_expense_including_tax(depenses_assurance_sante, taux)
 
@@ -32,29 +33,31 @@ class assurance_transport_taxe(DatedVariable):
 
     @dated_function(start = date(1984, 1, 1), stop = date(2001, 12, 31))
     def function_84_01(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_assurance_transport = simulation.calculate('depenses_assurance_transport', period)
         taux_assurance_vtm = \
-            simulation.legislation_at(period.start).imposition_indirecte.taux_assurances.assurance_pour_les_vehicules_terrestres_a_moteurs_pour_les_particuliers
+            parameters['imposition_indirecte.taux_assurances.assurance_pour_les_vehicules_terrestres_a_moteurs_pour_les_particuliers']
         taux = taux_assurance_vtm
         return period, tax_from_expense_including_tax(depenses_assurance_transport, taux)
 
     @dated_function(start = date(2002, 1, 1), stop = date(2004, 8, 4))
     def function_02_04(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_assurance_transport = simulation.calculate('depenses_assurance_transport', period)
-        taux_assurance_vtm = simulation.legislation_at(period.start).imposition_indirecte.taux_assurances.assurance_pour_les_vehicules_terrestres_a_moteurs_pour_les_particuliers
-        taux_contrib_secu_vtm = simulation.legislation_at(period.start).imposition_indirecte.taux_assurances.contribution_secu_assurances_automobiles
+        taux_assurance_vtm = parameters['imposition_indirecte.taux_assurances.assurance_pour_les_vehicules_terrestres_a_moteurs_pour_les_particuliers']
+        taux_contrib_secu_vtm = parameters['imposition_indirecte.taux_assurances.contribution_secu_assurances_automobiles']
         taux = taux_assurance_vtm + taux_contrib_secu_vtm
         return period, tax_from_expense_including_tax(depenses_assurance_transport, taux)
 
     @dated_function(start = date(2004, 8, 5), stop = date(2015, 12, 31))
     def function_04_15(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_assurance_transport = simulation.calculate('depenses_assurance_transport', period)
         taux_assurance_vtm = \
-            simulation.legislation_at(period.start).imposition_indirecte.taux_assurances.assurance_pour_les_vehicules_terrestres_a_moteurs_pour_les_particuliers
+            parameters['imposition_indirecte.taux_assurances.assurance_pour_les_vehicules_terrestres_a_moteurs_pour_les_particuliers']
         taux_contrib_secu_vtm = \
-            simulation.legislation_at(period.start).imposition_indirecte.taux_assurances.contribution_secu_assurances_automobiles
-        taux_contrib_fgao = \
-            simulation.legislation_at(period.start).imposition_indirecte.fgao.contribution_des_assures_en_pourcentage_des_primes
+            parameters['imposition_indirecte.taux_assurances.contribution_secu_assurances_automobiles']
+        taux_contrib_fgao = parameters['imposition_indirecte.fgao.contribution_des_assures_en_pourcentage_des_primes']
         taux = taux_assurance_vtm + taux_contrib_secu_vtm + taux_contrib_fgao
         return period, tax_from_expense_including_tax(depenses_assurance_transport, taux)
 
@@ -65,8 +68,9 @@ class autres_assurances_taxe(Variable):
     label = u"Montant des taxes sur les autres assurances"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_autres_assurances = simulation.calculate('depenses_autres_assurances', period)
-        taux = simulation.legislation_at(period.start).imposition_indirecte.taux_assurances.autres_assurances
+        taux = parameters['imposition_indirecte.taux_assurances.autres_assurances']
         return period, tax_from_expense_including_tax(depenses_autres_assurances, taux)
 
 
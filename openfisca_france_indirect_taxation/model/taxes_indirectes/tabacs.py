@@ -17,8 +17,9 @@ class cigares_droit_d_accise(Variable):
     label = u"Montant des droits d'accises sur les cigares"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_cigares = simulation.calculate('depenses_cigares', period)
-        taux_normal_cigare = simulation.legislation_at(period.start).imposition_indirecte.tabac.taux_normal.cigares
+        taux_normal_cigare = parameters['imposition_indirecte.tabac.taux_normal.cigares']
         return period, tax_from_expense_including_tax(depenses_cigares, taux_normal_cigare)
 
 
@@ -28,9 +29,9 @@ class cigarette_droit_d_accise(Variable):
     label = u"Montant des droits d'accises sur les cigarettes"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_cigarettes = simulation.calculate('depenses_cigarettes', period)
-        taux_normal_cigarette = \
-            simulation.legislation_at(period.start).imposition_indirecte.tabac.taux_normal.cigarettes
+        taux_normal_cigarette = parameters['imposition_indirecte.tabac.taux_normal.cigarettes']
         return period, tax_from_expense_including_tax(depenses_cigarettes, taux_normal_cigarette)
 
 
@@ -40,9 +41,9 @@ class tabac_a_rouler_droit_d_accise(Variable):
     label = u"Montant des droits d'accises sur le tabac à rouler"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_tabac_a_rouler = simulation.calculate('depenses_tabac_a_rouler', period)
-        taux_normal_tabac_a_rouler = \
-            simulation.legislation_at(period.start).imposition_indirecte.tabac.taux_normal.tabac_a_rouler
+        taux_normal_tabac_a_rouler = parameters['imposition_indirecte.tabac.taux_normal.tabac_a_rouler']
         return period, tax_from_expense_including_tax(depenses_tabac_a_rouler, taux_normal_tabac_a_rouler)
 
 
@@ -20,8 +20,9 @@ class tva_taux_intermediaire(DatedVariable):
 
     @dated_function(start = datetime.date(2012, 1, 1))
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_tva_taux_intermediaire = simulation.calculate('depenses_tva_taux_intermediaire')
-        taux_intermediaire = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_intermediaire
+        taux_intermediaire = parameters['imposition_indirecte.tva.taux_intermediaire']
         return period, tax_from_expense_including_tax(depenses_tva_taux_intermediaire, taux_intermediaire)
 
 
@@ -31,8 +32,9 @@ class tva_taux_plein(Variable):
     label = u"Montant de la TVA acquitée à taux plein"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_tva_taux_plein = simulation.calculate('depenses_tva_taux_plein', period)
-        taux_plein = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        taux_plein = parameters['imposition_indirecte.tva.taux_plein']
         return period, tax_from_expense_including_tax(depenses_tva_taux_plein, taux_plein)
 
 
@@ -42,8 +44,9 @@ class tva_taux_reduit(Variable):
     label = u"Montant de la TVA acquitée à taux reduit"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_tva_taux_reduit = simulation.calculate('depenses_tva_taux_reduit', period)
-        taux_reduit = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_reduit
+        taux_reduit = parameters['imposition_indirecte.tva.taux_reduit']
         return period, tax_from_expense_including_tax(depenses_tva_taux_reduit, taux_reduit)
 
 
@@ -53,8 +56,9 @@ class tva_taux_super_reduit(Variable):
     label = u"Montant de la TVA acquitée à taux super reduit"
 
     def function(self, simulation, period):
+        parameters = parameters_at(simulation, period.start)
         depenses_tva_taux_super_reduit = simulation.calculate('depenses_tva_taux_super_reduit', period)
-        taux_super_reduit = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_super_reduit
+        taux_super_reduit = parameters['imposition_indirecte.tva.taux_super_reduit']
         return period, tax_from_expense_including_tax(depenses_tva_taux_super_reduit, taux_super_reduit)
 
 
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Binary snapshot of the preprocessed legislation
+
+Parsing and validating parameters.xml and grafting the CSV assets in preprocess_legislation is the bulk of the
+TaxBenefitSystem start-up time. The resulting legislation JSON is frozen into a pickle stored in the user cache
+directory, keyed by the content of its sources, and loaded directly by the next processes.
+
+Run this module to build the snapshot ahead of time (e.g. when deploying workers).
+"""
+
+
+import cPickle
+import logging
+import os
+
+from . import preprocessing
+from ..utils import assets_directory, get_cache_directory, get_files_hash, write_atomically
+
+
+log = logging.getLogger(__name__)
+
+
+# Bump when the layout of the preprocessed legislation changes independently of its sources.
+SCHEMA_VERSION = 1
+
+source_file_paths = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parameters.xml'),
+    os.path.join(assets_directory, 'prix', 'prix_annuel_carburants.csv'),
+    os.path.join(assets_directory, 'quantites', 'parc_annuel_moyen_vp.csv'),
+    os.path.join(assets_directory, 'quantites', 'quantite_carbu_vp_france.csv'),
+    os.path.join(assets_directory, 'part_des_types_de_supercarburants.csv'),
+    os.path.splitext(preprocessing.__file__)[0] + '.py',
+    ]
+
+
+def get_snapshot_file_path():
+    return os.path.join(
+        get_cache_directory('legislation'),
+        'legislation_{}_v{}.pickle'.format(get_files_hash(source_file_paths), SCHEMA_VERSION),
+        )
+
+
+def load_legislation_snapshot():
+    """Return the preprocessed legislation JSON from the snapshot, or None when there is no up-to-date snapshot"""
+    snapshot_file_path = get_snapshot_file_path()
+    if not os.path.exists(snapshot_file_path):
+        return None
+    try:
+        with open(snapshot_file_path, 'rb') as snapshot_file:
+            snapshot = cPickle.load(snapshot_file)
+    except (EOFError, cPickle.UnpicklingError):
+        log.warning(u'Ignoring corrupted legislation snapshot {}'.format(snapshot_file_path))
+        return None
+    if snapshot.get('schema_version') != SCHEMA_VERSION:
+        return None
+    return snapshot['legislation_json']
+
+
+def dump_legislation_snapshot(legislation_json):
+    snapshot_file_path = get_snapshot_file_path()
+    snapshot = dict(
+        legislation_json = legislation_json,
+        schema_version = SCHEMA_VERSION,
+        )
+    write_atomically(
+        snapshot_file_path,
+        lambda snapshot_file: cPickle.dump(snapshot, snapshot_file, cPickle.HIGHEST_PROTOCOL),
+        )
+    return snapshot_file_path
+
+
+def build_legislation_snapshot():
+    from .. import init_country
+    TaxBenefitSystem = init_country()
+    tax_benefit_system = TaxBenefitSystem(use_legislation_snapshot = False)
+    return dump_legislation_snapshot(tax_benefit_system.legislation_json)
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(level = logging.INFO, stream = sys.stdout)
+    log.info(u'Legislation snapshot written to {}'.format(build_legislation_snapshot()))
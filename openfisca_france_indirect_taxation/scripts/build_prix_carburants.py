@@ -13,7 +13,8 @@ import os
 
 from ipp_macro_series_parser.agregats_transports.parser_cleaner_prix_carburants import prix_annuel_carburants_90_14, \
     prix_mensuel_carburants_90_15
-from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_price_index_builder import date_to_vag
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_price_index_builder import get_vagues, \
+    vague_inconnue
 
 # We will create three csv files. One for annual data, two other for monthly data.
 # The one match_to_vag will match prices to vagues.
@@ -33,8 +34,9 @@ prix_mensuel_carbu_match_to_vag[['annee'] + ['mois']] = \
     prix_mensuel_carbu_match_to_vag[['annee'] + ['mois']].astype(str)
 prix_mensuel_carbu_match_to_vag['date'] = \
     prix_mensuel_carbu_match_to_vag['annee'] + '_' + prix_mensuel_carbu_match_to_vag['mois']
-prix_mensuel_carbu_match_to_vag['vag'] = prix_mensuel_carbu_match_to_vag['date'].map(date_to_vag)
-prix_mensuel_carbu_match_to_vag = prix_mensuel_carbu_match_to_vag[prix_mensuel_carbu_match_to_vag['vag'] < 29]
+prix_mensuel_carbu_match_to_vag['vag'] = get_vagues(prix_mensuel_carbu_match_to_vag['date'])
+prix_mensuel_carbu_match_to_vag = \
+    prix_mensuel_carbu_match_to_vag[prix_mensuel_carbu_match_to_vag['vag'] != vague_inconnue]
 prix_mensuel_carbu_match_to_vag = prix_mensuel_carbu_match_to_vag.drop_duplicates('vag')
 prix_mensuel_carbu_match_to_vag['vag'] = prix_mensuel_carbu_match_to_vag['vag'].astype(int)
 prix_mensuel_carbu_match_to_vag = prix_mensuel_carbu_match_to_vag.set_index('vag')
@@ -7,6 +7,8 @@ import pkg_resources
 
 from biryani.strings import slugify
 
+from openfisca_france_indirect_taxation.utils import get_excel_sheet
+
 
 elasticities_path = os.path.join(
     pkg_resources.get_distribution('openfisca_france_indirect_taxation').location,
@@ -173,7 +175,7 @@ for table in tables:
     age = table.pop('age')
     name = table.pop('name')
     revenus = table.pop('revenus')
-    df = pandas.read_excel(elasticities_origin_xlsx, **table)
+    df = get_excel_sheet(elasticities_origin_xlsx, **table)
     df.dropna(inplace = True)
     df.set_index('Unnamed: 0', inplace = True)
     df.index.name = 'product'
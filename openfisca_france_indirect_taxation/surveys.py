@@ -23,30 +23,175 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 
+import collections
 import logging
+import multiprocessing
+
+import pandas
 
 
 from openfisca_survey_manager.survey_collections import SurveyCollection
 from openfisca_survey_manager.scenarios import AbstractSurveyScenario
-from openfisca_france_indirect_taxation.tests import base
+from openfisca_france_indirect_taxation.columnar_storage import (
+    dump_columnar_input_data_frame,
+    get_file_fingerprint,
+    get_survey_name,
+    load_columnar_input_data_frame,
+    )
+from openfisca_france_indirect_taxation.dependencies import get_downstream_variables, get_variables_to_load
+from openfisca_france_indirect_taxation.model.parameters import get_changed_parameter_paths, parameters_at
+from openfisca_france_indirect_taxation import get_cached_reform, get_tax_benefit_system
 
 
 log = logging.getLogger(__name__)
 
+# Variables always needed to build the menages entity and its weights
+required_input_variables = ['ident_men', 'pondmen']
+
+# LRU cache of the loaded input tables and their size in bytes, by (collection, survey, table, fingerprint of the
+# HDF5 file, columns)
+input_data_frame_by_key = collections.OrderedDict()
+input_data_frame_cache_max_bytes = 2 * 1024 ** 3
+input_data_frame_cache_statistics = collections.Counter()
 
-def get_input_data_frame(year):
+
+def get_hdf5_survey(year):
     openfisca_survey_collection = SurveyCollection.load(collection = "openfisca_indirect_taxation")
-    openfisca_survey = openfisca_survey_collection.get_survey("openfisca_indirect_taxation_data_{}".format(year))
+    return openfisca_survey_collection.get_survey(get_survey_name(year))
+
+
+def get_hdf5_input_data_frame(year):
+    openfisca_survey = get_hdf5_survey(year)
     input_data_frame = openfisca_survey.get_values(table = "input")
     input_data_frame.reset_index(inplace = True)
     return input_data_frame
 
 
+def get_input_data_fingerprint(year):
+    """Renvoie l'empreinte du fichier HDF5 de l'enquête de l'année, qui identifie la version de sa table input"""
+    return tuple(get_file_fingerprint(get_hdf5_survey(year).hdf5_file_path))
+
+
+def select_input_columns(input_data_frame, columns, year):
+    """Restreint la table input aux colonnes demandées qu'elle contient, en signalant les autres comme le fait
+    load_columnar_input_data_frame"""
+    names = [column for column in columns if column in input_data_frame.columns]
+    missing_columns = set(columns).difference(names)
+    if missing_columns:
+        log.info(u'Columns {} are not in the input data of {}'.format(sorted(missing_columns), year))
+    return input_data_frame[names]
+
+
+def load_input_data_frame(year, columns = None, source_fingerprint = None):
+    """Lit la table input de l'année, restreinte aux colonnes demandées si columns n'est pas None
+
+    Le stockage en colonnes est utilisé lorsqu'il a été écrit à partir de la version courante du fichier HDF5 de
+    l'enquête : seules les colonnes demandées sont alors lues. Sinon la table est lue dans le fichier HDF5.
+    """
+    if source_fingerprint is None:
+        source_fingerprint = get_input_data_fingerprint(year)
+    input_data_frame = load_columnar_input_data_frame(
+        year,
+        columns = columns,
+        source_fingerprint = source_fingerprint,
+        )
+    if input_data_frame is not None:
+        return input_data_frame
+    input_data_frame = get_hdf5_input_data_frame(year)
+    if columns is not None:
+        input_data_frame = select_input_columns(input_data_frame, columns, year)
+    return input_data_frame
+
+
+def get_input_data_frame(year, columns = None, copy = True):
+    """Renvoie la table input de l'année, restreinte aux colonnes demandées si columns n'est pas None
+
+    Les tables lues sont gardées dans un cache LRU limité à input_data_frame_cache_max_bytes octets. Leur clé
+    contient l'empreinte du fichier HDF5 de l'enquête : une table réécrite (par run_all par exemple) est relue et les
+    tables de la version précédente sont retirées du cache. Une table restreinte à des colonnes est extraite de la
+    table complète lorsque celle-ci est en cache. Chaque appel reçoit sa propre copie ; avec copy = False, la table
+    du cache est partagée et ne doit pas être modifiée.
+    """
+    source_fingerprint = get_input_data_fingerprint(year)
+    table_key = ("openfisca_indirect_taxation", get_survey_name(year), "input")
+    full_key = table_key + (source_fingerprint, None)
+    key = full_key[:4] + (tuple(columns) if columns is not None else None,)
+    if key in input_data_frame_by_key:
+        input_data_frame_cache_statistics['hits'] += 1
+        input_data_frame, size = input_data_frame_by_key.pop(key)
+        input_data_frame_by_key[key] = input_data_frame, size
+        return input_data_frame.copy() if copy else input_data_frame
+    if full_key in input_data_frame_by_key:
+        input_data_frame_cache_statistics['hits'] += 1
+        full_input_data_frame, size = input_data_frame_by_key.pop(full_key)
+        input_data_frame_by_key[full_key] = full_input_data_frame, size
+        # Column selection already returns a new data frame
+        return select_input_columns(full_input_data_frame, columns, year)
+    input_data_frame_cache_statistics['misses'] += 1
+    for other_key in list(input_data_frame_by_key):
+        if other_key[:3] == table_key and other_key[3] != source_fingerprint:
+            log.info(u'Removing input data frame {} of a previous version of the survey from the cache'.format(
+                other_key))
+            del input_data_frame_by_key[other_key]
+    input_data_frame = load_input_data_frame(year, columns = columns, source_fingerprint = source_fingerprint)
+    input_data_frame_by_key[key] = input_data_frame, input_data_frame.memory_usage(index = True, deep = True).sum()
+    evict_input_data_frames()
+    return input_data_frame.copy() if copy else input_data_frame
+
+
+def get_input_data_frame_cache_size():
+    return sum(size for _, size in input_data_frame_by_key.itervalues())
+
+
+def evict_input_data_frames():
+    """Retire les tables les moins récemment utilisées tant que le cache dépasse sa taille maximale"""
+    while input_data_frame_by_key and get_input_data_frame_cache_size() > input_data_frame_cache_max_bytes:
+        key, _ = input_data_frame_by_key.popitem(last = False)
+        input_data_frame_cache_statistics['evictions'] += 1
+        log.info(u'Evicting input data frame {} from the cache'.format(key))
+
+
+def get_input_data_frame_cache_statistics():
+    return dict(
+        bytes = get_input_data_frame_cache_size(),
+        entries = len(input_data_frame_by_key),
+        evictions = input_data_frame_cache_statistics['evictions'],
+        hits = input_data_frame_cache_statistics['hits'],
+        misses = input_data_frame_cache_statistics['misses'],
+        )
+
+
+def clear_input_data_frame_cache():
+    input_data_frame_by_key.clear()
+    input_data_frame_cache_statistics.clear()
+
+
+def add_required_input_variables(input_variables):
+    """Place en tête les variables toujours nécessaires, pour que les mêmes variables donnent la même clé de cache"""
+    if input_variables is None:
+        return None
+    return required_input_variables + [
+        variable for variable in input_variables if variable not in required_input_variables]
+
+
+def build_columnar_input_data(year):
+    """Convertit la table input HDF5 existante au format colonne"""
+    return dump_columnar_input_data_frame(
+        get_hdf5_input_data_frame(year),
+        year,
+        source_fingerprint = get_input_data_fingerprint(year),
+        )
+
+
 class SurveyScenario(AbstractSurveyScenario):
+    # Variables dont la simulation partage le holder de la simulation de référence, cf. share_unaffected_holders
+    shared_variables = frozenset()
+
     @classmethod
     def create(cls, calibration_kwargs = None, data_year = None, elasticities = None, inflation_kwargs = None,
             reference_tax_benefit_system = None, reform = None, reform_key = None, tax_benefit_system = None,
-            year = None):  # Add debug parameters debug, debug_all trace for simulation)
+            year = None, input_variables = None, output_variables = None):
+        # Add debug parameters debug, debug_all trace for simulation
         assert year is not None
         if data_year is None:
             data_year = year
@@ -56,17 +201,17 @@ class SurveyScenario(AbstractSurveyScenario):
             )
 
         if reform_key is not None:
-            reform = base.get_cached_reform(
+            reform = get_cached_reform(
                 reform_key = reform_key,
-                tax_benefit_system = reference_tax_benefit_system or base.tax_benefit_system,
+                tax_benefit_system = reference_tax_benefit_system or get_tax_benefit_system(),
                 )
 
         if reform is None:
             assert reference_tax_benefit_system is None, "No need of reference_tax_benefit_system if no reform"
-            reference_tax_benefit_system = base.tax_benefit_system
+            reference_tax_benefit_system = get_tax_benefit_system()
         else:
             tax_benefit_system = reform
-            reference_tax_benefit_system = base.tax_benefit_system
+            reference_tax_benefit_system = get_tax_benefit_system()
 
         if calibration_kwargs is not None:
             print calibration_kwargs
@@ -76,7 +221,14 @@ class SurveyScenario(AbstractSurveyScenario):
         if inflation_kwargs is not None:
             assert set(inflation_kwargs.keys()).issubset(set(['inflator_by_variable', 'target_by_variable']))
 
-        input_data_frame = get_input_data_frame(data_year)
+        if input_variables is None and output_variables is not None:
+            # Survey columns may override formulas, so every reachable variable is loaded when present
+            variables_to_load = get_variables_to_load(
+                output_variables, year, tax_benefit_system or reference_tax_benefit_system)
+            if variables_to_load is not None:
+                input_variables = sorted(variables_to_load)
+        input_variables = add_required_input_variables(input_variables)
+        input_data_frame = get_input_data_frame(data_year, columns = input_variables)
         if elasticities is not None:
             assert 'ident_men' in elasticities.columns
             print input_data_frame.ident_men.dtype
@@ -103,8 +255,139 @@ class SurveyScenario(AbstractSurveyScenario):
         if inflation_kwargs:
             survey_scenario.inflate(**inflation_kwargs)
 
+        if reform or reform_key:
+            survey_scenario.share_unaffected_holders()
+
         return survey_scenario
 
+    @classmethod
+    def run_batch(cls, runs, output_variables, processes = None, **create_kwargs):
+        """Calcule les variables de sortie (de l'entité ménage) pour une liste de (data_year, year, reform_key)
+
+        Les colonnes dont ont besoin toutes les simulations d'une même année de données sont lues une seule fois, dans
+        le processus principal, et gardées dans le cache des tables input (cf. get_input_data_frame). Les processus du
+        pool, créés ensuite par fork, partagent ce cache et se répartissent les simulations une à une. Renvoie une table
+        au format long (data_year, year, reform_key, ident_men, pondmen, variable, value). Les autres arguments sont
+        passés à create.
+        """
+        column_by_name = get_tax_benefit_system().column_by_name
+        for variable in output_variables:
+            assert column_by_name[variable].entity_key_plural == 'menages', \
+                u'Only menage variables can be computed in batch, not {}'.format(variable)
+        runs = [tuple(run) for run in runs]
+        input_variables_by_data_year = get_batch_input_variables(runs, output_variables)
+        for data_year, input_variables in input_variables_by_data_year.iteritems():
+            get_input_data_frame(data_year, columns = add_required_input_variables(input_variables), copy = False)
+
+        arguments_list = [
+            (run, input_variables_by_data_year[run[0]], output_variables, create_kwargs)
+            for run in runs
+            ]
+        if processes == 1 or len(arguments_list) == 1:
+            data_frames = [run_batch_simulation(arguments) for arguments in arguments_list]
+        else:
+            pool = multiprocessing.Pool(processes = min(processes or multiprocessing.cpu_count(), len(arguments_list)))
+            try:
+                data_frames = pool.map(run_batch_simulation, arguments_list)
+                pool.close()
+            except:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+        return pandas.concat(data_frames, ignore_index = True)
+
+    def share_unaffected_holders(self):
+        """Partage avec la simulation de référence les holders des variables que la réforme ne modifie pas
+
+        Sont modifiées les variables dont la formule change, celles qui lisent un paramètre dont la valeur change et,
+        de proche en proche, celles qui en dépendent. Les autres ne sont calculées qu'une fois, pour les deux
+        simulations. Leurs noms sont gardés dans shared_variables. Renvoie l'ensemble des variables modifiées.
+        """
+        simulation = self.simulation
+        reference_simulation = self.reference_simulation
+        column_by_name = simulation.tax_benefit_system.column_by_name
+        reference_column_by_name = reference_simulation.tax_benefit_system.column_by_name
+        changed_parameter_paths = get_changed_parameter_paths(
+            parameters_at(simulation, simulation.period.start),
+            parameters_at(reference_simulation, simulation.period.start),
+            )
+        changed_variables = set(
+            name
+            for name, column in column_by_name.iteritems()
+            if reference_column_by_name.get(name) is not column
+            )
+        affected_variables = get_downstream_variables(
+            changed_parameter_paths,
+            column_by_name.keys(),
+            simulation.period,
+            simulation.tax_benefit_system,
+            changed_variables = changed_variables,
+            )
+        affected_variables.update(changed_variables)
+        self.shared_variables = frozenset(name for name in column_by_name if name not in affected_variables)
+        for name in self.shared_variables:
+            simulation.holder_by_name[name] = reference_simulation.get_or_new_holder(name)
+        log.info(u'Reform affects {} variables: {}'.format(
+            len(affected_variables), u', '.join(sorted(affected_variables))))
+        return affected_variables
+
     def initialize_weights(self):
         self.weight_column_name_by_entity_key_plural['menages'] = 'pondmen'
         # self.weight_column_name_by_entity__key_plural['individus'] = 'weight_ind'
+
+
+def get_batch_input_variables(runs, output_variables):
+    """Renvoie, par année de données, les variables à charger pour toutes les simulations de cette année (None pour
+    charger toutes les colonnes), cf. SurveyScenario.run_batch"""
+    tax_benefit_system = get_tax_benefit_system()
+    variables_to_load_list_by_data_year = collections.OrderedDict()
+    for data_year, year, reform_key in runs:
+        variables_to_load_list_by_data_year.setdefault(data_year, []).append(get_variables_to_load(
+            output_variables,
+            year,
+            tax_benefit_system if reform_key is None else get_cached_reform(reform_key, tax_benefit_system),
+            ))
+    input_variables_by_data_year = collections.OrderedDict()
+    for data_year, variables_to_load_list in variables_to_load_list_by_data_year.iteritems():
+        if any(variables_to_load is None for variables_to_load in variables_to_load_list):
+            input_variables_by_data_year[data_year] = None
+        else:
+            input_variables_by_data_year[data_year] = sorted(set().union(*variables_to_load_list))
+    return input_variables_by_data_year
+
+
+def run_batch_simulation(arguments):
+    """Exécute une simulation de SurveyScenario.run_batch et renvoie ses variables de sortie au format long"""
+    (data_year, year, reform_key), input_variables, output_variables, create_kwargs = arguments
+    survey_scenario = SurveyScenario.create(
+        data_year = data_year,
+        input_variables = input_variables,
+        reform_key = reform_key,
+        year = year,
+        **create_kwargs
+        )
+    simulation = survey_scenario.simulation
+    ident_men = simulation.calculate('ident_men')
+    pondmen = simulation.calculate('pondmen')
+    data_frames = list()
+    for variable in output_variables:
+        data_frames.append(pandas.DataFrame(dict(
+            data_year = data_year,
+            ident_men = ident_men,
+            pondmen = pondmen,
+            reform_key = reform_key,
+            value = simulation.calculate(variable),
+            variable = variable,
+            year = year,
+            )))
+    log.info(u'Batch simulation of year {} on data of {} with reform {} done'.format(year, data_year, reform_key))
+    return pandas.concat(data_frames, ignore_index = True)[
+        ['data_year', 'year', 'reform_key', 'ident_men', 'pondmen', 'variable', 'value']]
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(level = logging.INFO, stream = sys.stdout)
+    for year in sys.argv[1:] or [2000, 2005, 2011]:
+        build_columnar_input_data(int(year))
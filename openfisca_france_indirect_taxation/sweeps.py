@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Balayage d'un paramètre de la législation sur une grille de valeurs, avec agrégats par décile de niveau de vie
+
+Le scénario est créé une seule fois, dans le processus principal, où les variables de sortie sont calculées avec la
+législation en vigueur. Les processus du pool, créés ensuite par fork, partagent ces tableaux (copie à l'écriture) et
+ne recalculent, pour chaque valeur, que les variables en aval du paramètre (cf. dependencies.get_downstream_variables).
+
+Lorsque les formules en aval du paramètre sont linéaires (taxes), run_vectorized_sweep calcule toutes les valeurs en
+un seul passage, le paramètre devenant un axe (cf. model/parameter_axes.py).
+"""
+
+
+from __future__ import division
+
+import logging
+import multiprocessing
+
+import numpy
+import pandas
+
+from openfisca_france_indirect_taxation.dependencies import get_downstream_variables
+from openfisca_france_indirect_taxation.model.parameter_axes import new_parameter_axes_simulation
+from openfisca_france_indirect_taxation.model.parameters import parameters_at, set_parameter_values
+from openfisca_france_indirect_taxation.model.quantiles import compute_weighted_sums_by_group
+from openfisca_france_indirect_taxation.surveys import SurveyScenario
+
+
+log = logging.getLogger(__name__)
+
+# État du balayage en cours, hérité par les processus du pool
+sweep = None
+
+
+def clear_holders(simulation, variables, shared_variables = None):
+    """Oublie les valeurs calculées des variables, qui seront recalculées au prochain appel
+
+    Les holders des variables partagées avec la simulation de référence (cf. SurveyScenario.share_unaffected_holders)
+    sont retirés de la simulation, qui en crée de nouveaux, pour garder les valeurs de la simulation de référence.
+    """
+    for variable in variables:
+        holder = simulation.holder_by_name.get(variable)
+        if holder is None:
+            continue
+        if shared_variables is not None and variable in shared_variables:
+            del simulation.holder_by_name[variable]
+        else:
+            holder._array = None
+            holder._array_by_period = None
+
+
+def get_aggregates_by_decile(simulation, output_variables, decile_variable = 'niveau_vie_decile',
+        weight_variable = 'pondmen'):
+    """Renvoie la somme pondérée et la moyenne par ménage de chaque variable de sortie par décile"""
+    deciles = simulation.calculate(decile_variable).astype(int)
+    present_deciles = numpy.unique(deciles)
+    total_by_decile, weight_by_decile = compute_weighted_sums_by_group(
+        deciles,
+        simulation.calculate(weight_variable),
+        numpy.column_stack([simulation.calculate(variable) for variable in output_variables]),
+        )
+    total_by_decile = total_by_decile[present_deciles]
+    weight_by_decile = weight_by_decile[present_deciles]
+    return pandas.DataFrame(dict(
+        decile = numpy.tile(present_deciles, len(output_variables)),
+        mean = (total_by_decile / weight_by_decile[:, numpy.newaxis]).ravel(order = 'F'),
+        total = total_by_decile.ravel(order = 'F'),
+        variable = numpy.repeat(output_variables, len(present_deciles)),
+        ))[['variable', 'decile', 'total', 'mean']]
+
+
+def compute_sweep_value(value):
+    simulation = sweep['simulation']
+    set_parameter_values(simulation, sweep['flat_legislation'], {sweep['parameter_path']: value})
+    clear_holders(simulation, sweep['downstream_variables'], sweep['shared_variables'])
+    data_frame = get_aggregates_by_decile(simulation, sweep['output_variables'], sweep['decile_variable'])
+    data_frame.insert(0, 'value', value)
+    return data_frame
+
+
+def iter_sweep(parameter_path, values, output_variables, year = None, decile_variable = 'niveau_vie_decile',
+        processes = None, **create_kwargs):
+    """Itère sur les agrégats par décile des variables de sortie, une table par valeur du paramètre, dans l'ordre
+
+    Le chemin du paramètre est celui de parameters_at, par exemple 'imposition_indirecte.tva.taux_plein' ou
+    'imposition_indirecte.ticpe.ticpe_gazole'. Les autres arguments sont passés à SurveyScenario.create.
+    """
+    global sweep
+    assert sweep is None, 'A sweep is already running'
+    survey_scenario = SurveyScenario.create(
+        output_variables = output_variables + [decile_variable],
+        year = year,
+        **create_kwargs
+        )
+    simulation = survey_scenario.simulation
+    flat_legislation = parameters_at(simulation, simulation.period.start)
+    assert parameter_path in flat_legislation, u'Unknown parameter {}'.format(parameter_path)
+    # Variables read from the survey keep their values, even when they have a formula
+    input_variables = set(
+        name
+        for name, holder in simulation.holder_by_name.iteritems()
+        if holder._array is not None or holder._array_by_period
+        )
+    downstream_variables = get_downstream_variables(
+        [parameter_path],
+        output_variables + [decile_variable],
+        simulation.period,
+        simulation.tax_benefit_system,
+        ).difference(input_variables)
+    log.info(u'Sweeping {} over {} values, recomputing {}'.format(
+        parameter_path, len(values), u', '.join(sorted(downstream_variables))))
+    # Computed once here, the upstream variables are shared by all the workers
+    get_aggregates_by_decile(simulation, output_variables, decile_variable)
+
+    sweep = dict(
+        decile_variable = decile_variable,
+        downstream_variables = downstream_variables,
+        flat_legislation = flat_legislation,
+        output_variables = output_variables,
+        parameter_path = parameter_path,
+        shared_variables = survey_scenario.shared_variables,
+        simulation = simulation,
+        )
+    try:
+        if processes == 1:
+            for value in values:
+                yield compute_sweep_value(value)
+        else:
+            pool = multiprocessing.Pool(processes = processes)
+            try:
+                for data_frame in pool.imap(compute_sweep_value, values):
+                    yield data_frame
+                pool.close()
+            except:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+    finally:
+        sweep = None
+
+
+def run_sweep(parameter_path, values, output_variables, **kwargs):
+    """Renvoie les agrégats par décile des variables de sortie pour chaque valeur du paramètre, cf. iter_sweep"""
+    return pandas.concat(list(iter_sweep(parameter_path, values, output_variables, **kwargs)), ignore_index = True)
+
+
+def run_vectorized_sweep(parameter_path, values, output_variables, year = None,
+        decile_variable = 'niveau_vie_decile', **create_kwargs):
+    """Renvoie la même table que run_sweep, calculée en un seul passage sur l'axe des valeurs du paramètre"""
+    survey_scenario = SurveyScenario.create(
+        output_variables = output_variables + [decile_variable],
+        year = year,
+        **create_kwargs
+        )
+    simulation = survey_scenario.simulation
+    deciles = simulation.calculate(decile_variable).astype(int)
+    weights = simulation.calculate('pondmen').astype(float)
+    present_deciles = numpy.unique(deciles)
+    # Matrice d'appartenance pondérée décile x ménage
+    weights_by_decile = (deciles == present_deciles[:, numpy.newaxis]) * weights
+    axes_simulation = new_parameter_axes_simulation(simulation, {parameter_path: values}, output_variables)
+    data_frames = list()
+    for variable in output_variables:
+        # Les variables qui ne dépendent pas du paramètre sont des colonnes (ménages, 1)
+        total = weights_by_decile.dot(axes_simulation.calculate(variable) + numpy.zeros((1, len(values))))
+        mean = total / weights_by_decile.sum(axis = 1)[:, numpy.newaxis]
+        data_frames.append(pandas.DataFrame(dict(
+            decile = numpy.repeat(present_deciles, len(values)),
+            mean = mean.ravel(),
+            total = total.ravel(),
+            value = numpy.tile(values, len(present_deciles)),
+            value_index = numpy.tile(numpy.arange(len(values)), len(present_deciles)),
+            variable = variable,
+            )))
+    # Même ordre que run_sweep : par valeur, puis par variable et par décile
+    data_frame = pandas.concat(data_frames, ignore_index = True).sort_values(by = ['value_index'], kind = 'mergesort')
+    return data_frame[['value', 'variable', 'decile', 'total', 'mean']].reset_index(drop = True)
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(level = logging.INFO, stream = sys.stdout)
+    print run_sweep(
+        'imposition_indirecte.tva.taux_plein',
+        list(numpy.linspace(0.15, 0.25, 11)),
+        ['tva_total', 'taxes_indirectes_total'],
+        year = 2011,
+        )
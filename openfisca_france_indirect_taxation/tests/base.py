@@ -25,16 +25,17 @@
 
 from openfisca_core.tools import assert_near
 
-from .. import init_country
+from .. import get_cached_composed_reform, get_cached_reform, get_tax_benefit_system
 
 
 __all__ = [
     'assert_near',
+    'get_cached_composed_reform',
+    'get_cached_reform',
     'tax_benefit_system',
     'TaxBenefitSystem',
     ]
 
 
-TaxBenefitSystem = init_country()
-tax_benefit_system = TaxBenefitSystem()
-tax_benefit_system.prefill_cache()
+tax_benefit_system = get_tax_benefit_system()
+TaxBenefitSystem = tax_benefit_system.__class__
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import division
+
+from collections import OrderedDict
+
+import numpy
+import pandas
+
+from openfisca_france_indirect_taxation.almost_ideal_demand_system import aids_dataframe_builder
+
+
+def test_postes_by_categorie():
+    postes = ['poste_coicop_111', 'poste_coicop_1151', 'poste_coicop_451', 'poste_coicop_611', 'poste_coicop_722',
+        'poste_coicop_1111']
+    postes_by_categorie = aids_dataframe_builder.get_postes_by_categorie(
+        aids_dataframe_builder.variantes['energy'], postes)
+    assert postes_by_categorie == OrderedDict([
+        ('carbu', ['poste_coicop_722']),
+        ('logem', ['poste_coicop_451']),
+        ('alime', ['poste_coicop_111', 'poste_coicop_1151']),
+        ('autre', ['poste_coicop_611', 'poste_coicop_1111']),
+        ])
+    postes_by_categorie = aids_dataframe_builder.get_postes_by_categorie(
+        aids_dataframe_builder.variantes['coicop'], postes)
+    assert list(postes_by_categorie) == [str(grosposte) for grosposte in range(1, 13)]
+    assert postes_by_categorie['1'] == ['poste_coicop_111', 'poste_coicop_1151']
+    assert postes_by_categorie['11'] == ['poste_coicop_1111']
+    assert postes_by_categorie['2'] == []
+
+
+def test_build_data_frame_for_reg():
+    menages = pandas.DataFrame(OrderedDict([
+        ('ident_men', ['1', '2', '3']),
+        ('vag', [23, 24, 24]),
+        ('ocde10', [1., 1.5, 2.]),
+        ('strate', [0, 1, 4]),
+        ]))
+    for column in ['typmen', 'dip14pr', 'agepr', 'situapr', 'situacj', 'stalog', 'nenfants', 'nactifs',
+            'veh_diesel', 'veh_essence']:
+        menages[column] = 1
+    postes = ['poste_coicop_111', 'poste_coicop_112', 'poste_coicop_611']
+    depenses = numpy.array([[10., 30., 5.], [0., 0., 2.], [1., 1., 0.]])
+    prix = numpy.array([[100., 110., 90.], [101., 111., 91.], [101., 111., 91.]])
+    df_indice_prix_produit = pandas.DataFrame({
+        'bien': ['poste_coicop_100', 'poste_coicop_600'] * 2,
+        'vag': ['23', '23', '24', '24'],
+        'prix': ['105', '95', '106', '96'],
+        })
+    variante = dict(
+        categories = OrderedDict([('alime', ['poste_coicop_111', 'poste_coicop_112']), ('sante', None)]),
+        prix_par_defaut = dict(alime = 'poste_coicop_100', sante = 'poste_coicop_600'),
+        years = [2011],
+        )
+    data_frame = aids_dataframe_builder.build_data_frame_for_reg(
+        variante, 2011, menages, postes, depenses, prix, df_indice_prix_produit)
+    assert numpy.allclose(data_frame['w1'], [40 / 45, 0, 1])
+    assert numpy.allclose(data_frame['w1'] + data_frame['w2'], 1)
+    # Les ménages qui ne dépensent rien dans une catégorie reçoivent son prix par défaut
+    assert numpy.allclose(data_frame['p1'], [.25 * 100 + .75 * 110, 106, 106])
+    assert numpy.allclose(data_frame['p2'], [90, 91, 96])
+    assert numpy.allclose(data_frame['depenses_par_uc'], [45, 2 / 1.5, 1])
+    assert (data_frame['year'] == 2011).all()
+    assert list(data_frame['vag_24']) == [0, 1, 1]
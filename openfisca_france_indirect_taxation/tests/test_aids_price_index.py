@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import division
+
+from collections import OrderedDict
+import os
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from openfisca_france_indirect_taxation.almost_ideal_demand_system import aids_price_index_builder
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.utils import (
+    compute_indices_prix,
+    get_indicatrices_categories,
+    get_matrice_prix,
+    )
+
+
+def test_compute_indices_prix():
+    df_indice_prix_produit = pandas.DataFrame({
+        'bien': ['poste_coicop_111', 'poste_coicop_112', 'poste_coicop_722'] * 2,
+        'vag': ['1'] * 3 + ['2'] * 3,
+        'prix': ['100', '110', '120', '101', '111', '130'],
+        })
+    postes_by_categorie = OrderedDict([
+        ('carbu', ['poste_coicop_722']),
+        ('alime', ['poste_coicop_111', 'poste_coicop_112']),
+        ('autre', ['poste_coicop_9901']),
+        ])
+    postes = [poste for postes_categorie in postes_by_categorie.values() for poste in postes_categorie]
+    # Ménages x postes, dans l'ordre de postes
+    depenses = numpy.array([
+        [20., 10., 30., 7.],
+        [0., 0., 5., 1.],
+        [4., 0., 0., 0.],
+        ])
+    vagues, index_vagues = numpy.unique([1, 2, 2], return_inverse = True)
+    depenses_categories, indices_prix = compute_indices_prix(
+        depenses,
+        get_matrice_prix(df_indice_prix_produit, postes, vagues)[index_vagues],
+        get_indicatrices_categories(postes, postes_by_categorie),
+        )
+    assert numpy.allclose(depenses_categories, [[20, 40, 7], [0, 5, 1], [4, 0, 0]])
+    # Le poste 9901 n'a pas de prix et les ménages sans dépense dans une catégorie ont un indice nul
+    assert numpy.allclose(indices_prix[:, 0], [120, 0, 130])
+    assert numpy.allclose(indices_prix[:, 1], [.25 * 100 + .75 * 110, 111, 0])
+    assert numpy.allclose(indices_prix[:, 2], 0)
+
+
+def test_price_index_tables():
+    cache_directory = tempfile.mkdtemp()
+    os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR'] = cache_directory
+    try:
+        aids_price_index_builder.tables_by_file_path.clear()
+        df_indice_prix_produit = aids_price_index_builder.get_df_indice_prix_produit()
+        assert len(os.listdir(os.path.join(cache_directory, 'prix'))) == 1
+        # Une ligne par poste et par vague, au prix du premier mois de la vague
+        assert not df_indice_prix_produit['indice_prix_produit'].duplicated().any()
+        prix = df_indice_prix_produit.set_index('indice_prix_produit')['prix']
+        assert prix['poste_coicop_722_28'] == aids_price_index_builder.get_prix_par_mois(
+            ['poste_coicop_722'], ['2011_8']).iloc[0, 0]
+        # Postes dont l'indice reprend celui d'un autre poste
+        assert prix['poste_coicop_2201_23'] == prix['poste_coicop_220_23']
+
+        # Relecture depuis le cache disque, comme le ferait un nouveau processus
+        aids_price_index_builder.tables_by_file_path.clear()
+        prix_par_vague = aids_price_index_builder.get_prix_par_vague(['poste_coicop_722', 'poste_coicop_0'], [9, 28])
+        assert prix_par_vague.loc[28, 'poste_coicop_722'] == prix['poste_coicop_722_28']
+        assert prix_par_vague['poste_coicop_0'].isnull().all()
+        assert aids_price_index_builder.get_df_indice_prix_produit().equals(df_indice_prix_produit)
+    finally:
+        del os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR']
+        aids_price_index_builder.tables_by_file_path.clear()
+        shutil.rmtree(cache_directory)
+
+
+def test_vagues():
+    vagues = aids_price_index_builder.get_vagues(pandas.Series(['2000_5', '2000_6', '2005_3', '2011_10', '2011_11']))
+    vague_inconnue = aids_price_index_builder.vague_inconnue
+    assert list(vagues) == [vague_inconnue, 9, 17, 28, vague_inconnue]
+    assert aids_price_index_builder.date_to_vag('2000_6') == 9
+    assert aids_price_index_builder.date_to_vag('2000_5') is None
+
+    mois_vagues = aids_price_index_builder.get_mois_vagues()
+    assert list(mois_vagues.index) == range(9, 29)
+    assert list(mois_vagues.loc[28]) == ['2011_8', '2011_10']
+    # Chaque vague contient le premier et le dernier mois qui lui sont attribués
+    assert (aids_price_index_builder.get_vagues(mois_vagues['premier_mois']) == mois_vagues.index).all()
+    assert (aids_price_index_builder.get_vagues(mois_vagues['dernier_mois']) == mois_vagues.index).all()
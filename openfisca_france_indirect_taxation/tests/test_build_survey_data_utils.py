@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+
+import collections
+import logging
+
+import numpy
+import pandas
+
+from openfisca_france_indirect_taxation.build_survey_data import utils
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self, level = logging.WARNING)
+        self.messages = list()
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_reconcile_columns():
+    index = pandas.Index(['1', '2', '3'], name = 'ident_men')
+    data_frame_by_name = collections.OrderedDict([
+        ('revenus', pandas.DataFrame(
+            dict(
+                agepr = numpy.array([40, 50, 60], dtype = numpy.int64),
+                revtot = [1000., numpy.nan, 3000.],
+                typmen = ['a', None, 'c'],
+                ),
+            index = index,
+            )),
+        ('absente', None),
+        ('menages', pandas.DataFrame(
+            dict(
+                agepr = numpy.array([41, 50, 60], dtype = numpy.int64),
+                revtot = [1000., 2000., numpy.nan],
+                typmen = ['a', 'b', 'c'],
+                zeat = numpy.array([1, 2, 3], dtype = numpy.int64),
+                ),
+            index = index,
+            )),
+        ])
+    handler = RecordingHandler()
+    utils.log.addHandler(handler)
+    try:
+        data_frame = utils.reconcile_columns(data_frame_by_name)
+    finally:
+        utils.log.removeHandler(handler)
+
+    assert list(data_frame.index) == ['1', '2', '3']
+    assert list(data_frame.columns) == ['agepr', 'revtot', 'typmen', 'zeat']
+    # La première valeur non nulle l'emporte, dans l'ordre des tables
+    assert list(data_frame.agepr) == [40, 50, 60]
+    assert list(data_frame.revtot) == [1000, 2000, 3000]
+    assert list(data_frame.typmen) == ['a', 'b', 'c']
+    assert data_frame.agepr.dtype == numpy.int64
+    assert data_frame.revtot.dtype == numpy.float64
+    assert data_frame.typmen.dtype == object
+    assert data_frame.zeat.dtype == numpy.int64
+    # Seul l'âge du ménage 1 diffère d'une table à l'autre
+    assert len(handler.messages) == 1
+    assert 'agepr' in handler.messages[0] and 'menages' in handler.messages[0]
+
+
+def test_downcast_floats():
+    data_frame = utils.downcast_floats(pandas.DataFrame(dict(
+        agepr = numpy.array([40, 50], dtype = numpy.int64),
+        ident_men = ['1', '2'],
+        pondmen = numpy.array([1.5, 2.5], dtype = numpy.float32),
+        revtot = [1000.5, 2000.],
+        )))
+    assert data_frame.agepr.dtype == numpy.int64
+    assert data_frame.ident_men.dtype == object
+    assert data_frame.pondmen.dtype == numpy.float32
+    assert data_frame.revtot.dtype == numpy.float32
+    assert list(data_frame.revtot) == [1000.5, 2000.]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.consommation.categories_fiscales import get_poste_categorie_matrix
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_categories_fiscales_matrix():
+    for year in [1995, 2005, 2011, 2014]:
+        yield check_categories_fiscales_matrix, year
+
+
+def check_categories_fiscales_matrix(year):
+    categories_fiscales, postes_coicop, matrix = get_poste_categorie_matrix(year)
+    menage = dict(
+        ('poste_coicop_' + poste, index + 1)
+        for index, poste in enumerate(postes_coicop)
+        )
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        personne_de_reference = dict(
+            birth = datetime.date(year - 40, 1, 1),
+            ),
+        menage = menage,
+        ).new_simulation(debug = True)
+
+    for row, categorie_fiscale in enumerate(categories_fiscales):
+        expected = sum(
+            menage['poste_coicop_' + postes_coicop[column]]
+            for column in matrix[row].indices
+            )
+        assert_near(simulation.calculate('categorie_fiscale_{}'.format(categorie_fiscale)), expected, .01)
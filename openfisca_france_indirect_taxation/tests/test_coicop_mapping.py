@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+
+from openfisca_france_indirect_taxation.build_survey_data.coicop_mapping import (
+    get_grosposte,
+    get_grosposte_of_poste_coicop,
+    get_poste_coicop_column_name,
+    normalize_code_coicop,
+    )
+
+
+def test_coicop_mapping():
+    assert normalize_code_coicop(111) == u'01110'
+    assert normalize_code_coicop(2201) == u'02201'
+    assert normalize_code_coicop(1151) == u'01151'
+    assert normalize_code_coicop(9900) == u'99000'
+    assert normalize_code_coicop(13111) == u'99000'
+    assert get_grosposte(u'01110') == 1
+    assert get_grosposte(u'10100') == 10
+    assert get_poste_coicop_column_name(u'01110') == u'poste_coicop_111'
+    assert get_poste_coicop_column_name(u'01151') == u'poste_coicop_1151'
+    assert get_poste_coicop_column_name(u'pondmen') == u'pondmen'
+    for code in [111, 2201, 1151, 1010, 9900]:
+        code_coicop = normalize_code_coicop(code)
+        assert get_grosposte_of_poste_coicop(get_poste_coicop_column_name(code_coicop)) == get_grosposte(code_coicop)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from openfisca_france_indirect_taxation.columnar_storage import (
+    dump_columnar_input_data_frame,
+    load_columnar_input_data_frame,
+    )
+
+
+def test_columnar_storage():
+    output_directory = tempfile.mkdtemp()
+    try:
+        input_data_frame = pandas.DataFrame(dict(
+            ident_men = ['1', '2', '3'],
+            pondmen = [1.5, 2., 3.],
+            poste_coicop_111 = [10., 0., 5.],
+            poste_coicop_112 = [1., 2., 3.],
+            ))
+        assert load_columnar_input_data_frame(2011, output_directory = output_directory) is None
+        dump_columnar_input_data_frame(input_data_frame, 2011, output_directory = output_directory)
+
+        data_frame = load_columnar_input_data_frame(2011, output_directory = output_directory)
+        assert list(data_frame.columns) == list(input_data_frame.columns)
+        assert (data_frame.ident_men == input_data_frame.ident_men).all()
+        assert numpy.allclose(data_frame.poste_coicop_112, input_data_frame.poste_coicop_112)
+
+        data_frame = load_columnar_input_data_frame(
+            2011, columns = ['pondmen', 'poste_coicop_111', 'inexistant'], output_directory = output_directory)
+        assert list(data_frame.columns) == ['pondmen', 'poste_coicop_111']
+        assert numpy.allclose(data_frame.poste_coicop_111, input_data_frame.poste_coicop_111)
+
+        # Le stockage n'est utilisé que s'il a été écrit à partir de la version courante du fichier HDF5
+        source_fingerprint = ['openfisca_indirect_taxation_data_2011.h5', 1024, 1400000000.5]
+        assert load_columnar_input_data_frame(
+            2011, output_directory = output_directory, source_fingerprint = source_fingerprint) is None
+        dump_columnar_input_data_frame(
+            input_data_frame, 2011, output_directory = output_directory, source_fingerprint = source_fingerprint)
+        data_frame = load_columnar_input_data_frame(
+            2011, output_directory = output_directory, source_fingerprint = source_fingerprint)
+        assert list(data_frame.columns) == list(input_data_frame.columns)
+        assert load_columnar_input_data_frame(
+            2011,
+            output_directory = output_directory,
+            source_fingerprint = ['openfisca_indirect_taxation_data_2011.h5', 2048, 1400000100.5],
+            ) is None
+    finally:
+        shutil.rmtree(output_directory)
+
+
+if __name__ == '__main__':
+    test_columnar_storage()
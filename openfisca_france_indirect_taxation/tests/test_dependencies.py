@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+
+import ast
+import textwrap
+
+from openfisca_core import reforms
+
+from openfisca_france_indirect_taxation.dependencies import (
+    get_dependencies,
+    get_downstream_variables,
+    get_function_dependencies,
+    get_input_variables,
+    get_variables_to_load,
+    )
+from openfisca_france_indirect_taxation.model.consommation import categories_fiscales
+from openfisca_france_indirect_taxation.model.taxes_indirectes import tva
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_dated_dependencies():
+    dependencies_2005 = get_dependencies(['essence_ticpe'], 2005, base.tax_benefit_system)
+    dependencies_2011 = get_dependencies(['essence_ticpe'], 2011, base.tax_benefit_system)
+    assert 'super_plombe_ticpe' in dependencies_2005
+    assert 'sp_e10_ticpe' not in dependencies_2005
+    assert 'sp_e10_ticpe' in dependencies_2011
+    assert 'super_plombe_ticpe' not in dependencies_2011
+    assert 'depenses_essence' in dependencies_2011
+
+
+def test_input_variables():
+    year = 2011
+    input_variables = get_input_variables(['taxes_indirectes_total'], year, base.tax_benefit_system)
+    assert 'taxes_indirectes_total' not in input_variables
+    assert 'tva_total' not in input_variables
+    _, postes_coicop, _ = categories_fiscales.get_poste_categorie_matrix(year)
+    assert set('poste_coicop_{}'.format(poste) for poste in postes_coicop).issubset(input_variables)
+    assert all(
+        variable not in input_variables
+        for variable in get_input_variables(['somme_coicop12'], year, base.tax_benefit_system)
+        if variable.startswith('poste_coicop_')
+        )
+
+
+def test_downstream_variables():
+    downstream_variables = get_downstream_variables(
+        ['imposition_indirecte.ticpe.ticpe_gazole'], ['taxes_indirectes_total'], 2011, base.tax_benefit_system)
+    assert set(['diesel_ticpe', 'ticpe_totale', 'taxes_indirectes_total']).issubset(downstream_variables)
+    assert 'tva_total' not in downstream_variables
+    assert 'depenses_diesel' not in downstream_variables
+    downstream_variables = get_downstream_variables(
+        ['imposition_indirecte.tva.taux_plein'], ['taxes_indirectes_total'], 2011, base.tax_benefit_system)
+    assert set(['tva_taux_plein', 'tva_total', 'diesel_ticpe']).issubset(downstream_variables)
+    assert 'tva_taux_reduit' not in downstream_variables
+
+
+def test_dynamic_dependencies():
+    function_node = ast.parse(textwrap.dedent("""
+        def function(self, simulation, period):
+            return period, simulation.calculate(name, period) * parameters[path]
+        """)).body[0]
+    dependencies = get_function_dependencies(function_node)
+    assert dependencies.dynamic_names and dependencies.dynamic_paths
+    assert not dependencies.names and not dependencies.paths
+
+
+def test_dynamic_legislation_dependencies():
+    function_node = ast.parse(textwrap.dedent("""
+        def function(self, simulation, period):
+            parameters = parameters_at(simulation, period.start)
+            return period, parameters['imposition_indirecte.tva.taux_plein']
+        """)).body[0]
+    dependencies = get_function_dependencies(function_node)
+    assert not dependencies.dynamic_paths
+    assert dependencies.paths == set(['imposition_indirecte.tva.taux_plein'])
+
+    # La législation lue autrement que par parameters = parameters_at(...) n'est pas analysée
+    for source in [
+            """
+            def function(self, simulation, period):
+                return period, simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+            """,
+            """
+            def function(self, simulation, period):
+                legislation = parameters_at(simulation, period.start)
+                return period, legislation['imposition_indirecte.tva.taux_plein']
+            """,
+            """
+            def function(self, simulation, period):
+                return period, parameters_at(simulation, period.start)['imposition_indirecte.tva.taux_plein']
+            """,
+            ]:
+        dependencies = get_function_dependencies(ast.parse(textwrap.dedent(source)).body[0])
+        assert dependencies.dynamic_paths, source
+        assert not dependencies.paths
+
+
+def test_reform_dependencies():
+    Reform = reforms.make_reform(
+        key = 'tva_total_agepr',
+        name = u"TVA dépendant de l'âge de la personne de référence",
+        reference = base.tax_benefit_system,
+        )
+
+    class tva_total(Reform.Variable):
+        reference = tva.tva_total
+
+        def function(self, simulation, period):
+            return period, simulation.calculate('agepr', period) * 0
+
+    reform = Reform()
+    year = 2011
+    variables_to_load = get_variables_to_load(['tva_total'], year, base.tax_benefit_system)
+    assert 'tva_taux_plein' in variables_to_load
+    assert 'agepr' not in variables_to_load
+    # La formule de la réforme n'est pas analysée : toutes les colonnes de l'enquête sont chargées
+    assert get_variables_to_load(['tva_total'], year, reform) is None
+    downstream_variables = get_downstream_variables(
+        ['imposition_indirecte.ticpe.ticpe_gazole'], ['tva_total'], year, reform)
+    assert 'tva_total' in downstream_variables
+    assert 'tva_total' not in get_downstream_variables(
+        ['imposition_indirecte.ticpe.ticpe_gazole'], ['tva_total'], year, base.tax_benefit_system)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import shutil
+import tempfile
+
+from openfisca_france_indirect_taxation import utils
+
+
+def test_get_excel_sheet():
+    cache_directory = tempfile.mkdtemp()
+    os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR'] = cache_directory
+    try:
+        utils.excel_sheet_by_key.clear()
+        data_frame = utils.get_excel_sheet(utils.parametres_fiscalite_xls_file_path, sheetname = 'categoriefiscale')
+        assert len(os.listdir(os.path.join(cache_directory, 'assets'))) == 1
+
+        # Read back from the binary cache, as a new process would
+        utils.excel_sheet_by_key.clear()
+        cached_data_frame = utils.get_excel_sheet(
+            utils.parametres_fiscalite_xls_file_path, sheetname = 'categoriefiscale')
+        assert (cached_data_frame.dtypes == data_frame.dtypes).all()
+        assert cached_data_frame.equals(data_frame)
+
+        # Callers get copies of the memoized data frame
+        cached_data_frame['annee'] = 0
+        assert utils.get_excel_sheet(utils.parametres_fiscalite_xls_file_path, sheetname = 'categoriefiscale').equals(
+            data_frame)
+    finally:
+        del os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR']
+        utils.excel_sheet_by_key.clear()
+        shutil.rmtree(cache_directory)
+
+
+def test_get_cached_json():
+    cache_directory = tempfile.mkdtemp()
+    os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR'] = cache_directory
+    source_file_path = os.path.join(cache_directory, 'source.py')
+    build_count = [0]
+
+    def build():
+        build_count[0] += 1
+        return [[u'tva_taux_plein', build_count[0]]]
+
+    def write_source(content):
+        with open(source_file_path, 'w') as source_file:
+            source_file.write(content)
+
+    try:
+        write_source('def build_definitions():\n    pass\n')
+        assert utils.get_cached_json('definitions', [source_file_path], build) == [[u'tva_taux_plein', 1]]
+        assert build_count[0] == 1
+
+        # Read back from the cache, without building
+        assert utils.get_cached_json('definitions', [source_file_path], build) == [[u'tva_taux_plein', 1]]
+        assert build_count[0] == 1
+
+        # Rebuilt once the source changes
+        write_source('def build_definitions():\n    return None\n')
+        assert utils.get_cached_json('definitions', [source_file_path], build) == [[u'tva_taux_plein', 2]]
+        assert build_count[0] == 2
+    finally:
+        del os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR']
+        shutil.rmtree(cache_directory)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+
+import numpy
+import pandas
+
+from openfisca_france_indirect_taxation.build_survey_data.step_1_1_homogeneisation_donnees_depenses import (
+    aggregate_depenses_by_coicop,
+    )
+
+
+def test_aggregate_depenses_by_coicop():
+    depnom = pandas.DataFrame(dict(
+        # Le ménage 2 a deux lignes pour le poste 1110 ; le ménage 4 n'a que des lignes sans poste
+        mena = [1, 1, 2, 2, 2, 3, numpy.nan, 4, 3],
+        nomen5 = [1110, 1120, 1110, 1110, 2110, 9999, 1110, numpy.nan, 1120],
+        valeur = [10., 5., 1., 2., numpy.nan, 7., 100., 3., 4.],
+        ))
+    # Deux postes BdF tombent dans le même poste COICOP
+    coicop_by_poste = {1110: u'01110', 1120: u'01110', 2110: u'02110', 9999: u'99000'}
+    coicop_data_frame = aggregate_depenses_by_coicop(
+        depnom.mena.values, depnom.nomen5.values, depnom.valeur.values, coicop_by_poste)
+
+    expected = depnom.groupby(['mena', 'nomen5']).valeur.sum().unstack().fillna(0)
+    expected.columns = [coicop_by_poste[poste] for poste in expected.columns]
+    expected = expected.groupby(level = 0, axis = 1).sum()
+    assert list(coicop_data_frame.index) == [1, 2, 3]
+    assert list(coicop_data_frame.columns) == list(expected.columns)
+    assert numpy.allclose(coicop_data_frame.values, expected.values)
+    assert numpy.allclose(coicop_data_frame.loc[2].values, [3, 0, 0])
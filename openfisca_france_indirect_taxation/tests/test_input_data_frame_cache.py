@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+
+import logging
+
+import numpy
+import pandas
+
+from openfisca_france_indirect_taxation import surveys
+
+
+# Empreinte du fichier HDF5 de chaque année, changée par le test pour simuler une réécriture de l'enquête
+fingerprint_by_year = dict()
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self, level = logging.INFO)
+        self.messages = list()
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def get_input_data_fingerprint(year):
+    return fingerprint_by_year.setdefault(year, ('openfisca_indirect_taxation_data_{}.h5'.format(year), 1, 1.))
+
+
+def load_input_data_frame(year, columns = None, source_fingerprint = None):
+    input_data_frame = pandas.DataFrame(dict(
+        ident_men = numpy.arange(1000),
+        pondmen = numpy.ones(1000),
+        poste_coicop_111 = numpy.arange(1000) * float(year) * source_fingerprint[2],
+        ))
+    return input_data_frame if columns is None else surveys.select_input_columns(input_data_frame, columns, year)
+
+
+def test_input_data_frame_cache():
+    original_get_input_data_fingerprint = surveys.get_input_data_fingerprint
+    original_load_input_data_frame = surveys.load_input_data_frame
+    original_max_bytes = surveys.input_data_frame_cache_max_bytes
+    surveys.get_input_data_fingerprint = get_input_data_fingerprint
+    surveys.load_input_data_frame = load_input_data_frame
+    surveys.clear_input_data_frame_cache()
+    fingerprint_by_year.clear()
+    try:
+        input_data_frame = surveys.get_input_data_frame(2011)
+        input_data_frame['pondmen'] = 0
+        assert (surveys.get_input_data_frame(2011).pondmen == 1).all()
+        assert list(surveys.get_input_data_frame(2011, columns = ['pondmen']).columns) == ['pondmen']
+        statistics = surveys.get_input_data_frame_cache_statistics()
+        assert statistics['hits'] == 2
+        assert statistics['misses'] == 1
+        assert statistics['entries'] == 1
+
+        # Les colonnes absentes sont écartées et signalées, que la table complète soit en cache ou non
+        handler = RecordingHandler()
+        surveys.log.addHandler(handler)
+        surveys.log.setLevel(logging.INFO)
+        try:
+            columns = ['pondmen', 'absente']
+            assert list(surveys.get_input_data_frame(2011, columns = columns).columns) == ['pondmen']
+            assert surveys.get_input_data_frame_cache_statistics()['hits'] == 3
+            surveys.input_data_frame_by_key.clear()
+            assert list(surveys.get_input_data_frame(2011, columns = columns).columns) == ['pondmen']
+            assert surveys.get_input_data_frame_cache_statistics()['misses'] == 2
+        finally:
+            surveys.log.removeHandler(handler)
+            surveys.log.setLevel(logging.NOTSET)
+        assert len([message for message in handler.messages if 'absente' in message]) == 2
+
+        # Une enquête réécrite (nouvelle empreinte du fichier HDF5) est relue et remplace l'ancienne version
+        surveys.input_data_frame_by_key.clear()
+        assert surveys.get_input_data_frame(2011).poste_coicop_111[1] == 2011
+        fingerprint_by_year[2011] = ('openfisca_indirect_taxation_data_2011.h5', 1, 2.)
+        assert surveys.get_input_data_frame(2011).poste_coicop_111[1] == 2 * 2011
+        statistics = surveys.get_input_data_frame_cache_statistics()
+        assert statistics['misses'] == 4
+        assert statistics['entries'] == 1
+
+        surveys.input_data_frame_cache_max_bytes = statistics['bytes']
+        surveys.get_input_data_frame(2005)
+        statistics = surveys.get_input_data_frame_cache_statistics()
+        assert statistics['evictions'] == 1
+        assert statistics['entries'] == 1
+        assert statistics['bytes'] <= surveys.input_data_frame_cache_max_bytes
+    finally:
+        surveys.get_input_data_fingerprint = original_get_input_data_fingerprint
+        surveys.load_input_data_frame = original_load_input_data_frame
+        surveys.input_data_frame_cache_max_bytes = original_max_bytes
+        surveys.clear_input_data_frame_cache()
@@ -25,11 +25,15 @@
 
 import datetime
 import json
+import os
+import shutil
+import tempfile
 import xml.etree.ElementTree
 
 from openfisca_core import conv, legislations, legislationsxml
 
 from openfisca_france_indirect_taxation import init_country
+from openfisca_france_indirect_taxation.param import legislation_snapshot
 
 
 TaxBenefitSystem = init_country()
@@ -91,6 +95,20 @@ def test_legislation_xml_file():
         yield check_legislation_xml_file, year
 
 
+def test_legislation_snapshot():
+    cache_directory = tempfile.mkdtemp()
+    os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR'] = cache_directory
+    try:
+        legislation_json = TaxBenefitSystem(use_legislation_snapshot = False).legislation_json
+        assert legislation_snapshot.load_legislation_snapshot() is None
+        legislation_snapshot.dump_legislation_snapshot(legislation_json)
+        assert legislation_snapshot.load_legislation_snapshot() == legislation_json
+        assert TaxBenefitSystem().legislation_json == legislation_json
+    finally:
+        del os.environ['OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR']
+        shutil.rmtree(cache_directory)
+
+
 if __name__ == '__main__':
     test_legislation_xml_file()
     import nose
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+
+import numpy
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model import parameters
+from openfisca_france_indirect_taxation.model.parameter_axes import calculate_on_parameter_axes
+from openfisca_france_indirect_taxation.tests import base
+
+
+def new_simulation(year = 2010):
+    return base.tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        personne_de_reference = dict(
+            birth = datetime.date(year - 40, 1, 1),
+            ),
+        menage = dict(
+            depenses_carburants = 100,
+            depenses_tva_taux_plein = 120,
+            ),
+        ).new_simulation()
+
+
+def test_tva_taux_plein_axis():
+    taux = numpy.array([.1, .2, .25])
+    tva_taux_plein = calculate_on_parameter_axes(
+        new_simulation(), 'tva_taux_plein', {'imposition_indirecte.tva.taux_plein': taux})
+    assert tva_taux_plein.shape == (1, 3)
+    assert_near(tva_taux_plein[0], 120 * taux / (1 + taux), absolute_error_margin = 1e-6)
+
+
+def test_ticpe_gazole_axis():
+    path = 'imposition_indirecte.ticpe.ticpe_gazole'
+    accises = [.3, .4, .5, .6]
+    diesel_ticpe = calculate_on_parameter_axes(new_simulation(), 'diesel_ticpe', {path: accises})
+    for index, accise in enumerate(accises):
+        simulation = new_simulation()
+        parameters.set_parameter_values(
+            simulation, parameters.parameters_at(simulation, simulation.period.start), {path: accise})
+        assert_near(diesel_ticpe[:, index], simulation.calculate('diesel_ticpe'), absolute_error_margin = 1e-6)
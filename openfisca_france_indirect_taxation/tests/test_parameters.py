@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model import parameters
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_parameters_at():
+    year = 2010
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        personne_de_reference = dict(
+            birth = datetime.date(year - 40, 1, 1),
+            ),
+        menage = dict(
+            depenses_carburants = 100,
+            ),
+        ).new_simulation()
+    instant = simulation.period.start
+    legislation = simulation.legislation_at(instant)
+
+    parameters.reset_statistics()
+    flat_legislation = parameters.parameters_at(simulation, instant)
+    assert flat_legislation['imposition_indirecte.tva.taux_plein'] == legislation.imposition_indirecte.tva.taux_plein
+    assert flat_legislation['imposition_indirecte.ticpe.ticpe_gazole'] == \
+        legislation.imposition_indirecte.ticpe.ticpe_gazole
+    assert flat_legislation.get('imposition_indirecte.inexistant', 0) == 0
+
+    assert parameters.parameters_at(simulation, instant) is flat_legislation
+    assert parameters.get_statistics() == dict(hits = 1, misses = 1)
+
+
+def test_taux_implicite_ticpe():
+    year = 2010
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        personne_de_reference = dict(
+            birth = datetime.date(year - 40, 1, 1),
+            ),
+        ).new_simulation()
+    flat_legislation = parameters.parameters_at(simulation, simulation.period.start)
+    taux_implicite_diesel = ((42.84 + 1.15) * 1.196) / (114.675 - ((42.84 + 1.15) * 1.196))
+    assert_near(flat_legislation['imposition_indirecte.taux_implicite_ticpe.diesel'], taux_implicite_diesel, .001)
+
+    data_frame = parameters.get_taux_implicite_ticpe_data_frame(base.tax_benefit_system, years = [year])
+    assert_near(data_frame.loc[(year, 'diesel'), 'taux_implicite'], taux_implicite_diesel, .001)
+    assert_near(data_frame.loc[(year, 'diesel'), 'accise_majoree'], 42.84 + 1.15, .001)
+
+
+def test_changed_parameter_paths():
+    year = 2010
+    instant = periods.instant(year)
+    flat_legislation = parameters.build_flat_legislation(
+        base.tax_benefit_system.get_compact_legislation(instant),
+        instant,
+        )
+    value_by_path = flat_legislation.value_by_path.copy()
+    value_by_path['imposition_indirecte.ticpe.ticpe_gazole'] += 1
+    changed_paths = parameters.get_changed_parameter_paths(
+        flat_legislation,
+        parameters.FlatLegislation(instant, parameters.add_taux_implicite_ticpe(value_by_path)),
+        )
+    assert changed_paths == set([
+        'imposition_indirecte.ticpe.ticpe_gazole',
+        'imposition_indirecte.accise_ticpe_majoree.diesel',
+        'imposition_indirecte.taux_implicite_ticpe.diesel',
+        ])
+    assert changed_paths == set(['imposition_indirecte.ticpe.ticpe_gazole']).union(
+        parameters.get_derived_parameter_paths('imposition_indirecte.ticpe.ticpe_gazole'))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import division
+
+import numpy
+
+from openfisca_france_indirect_taxation.almost_ideal_demand_system import quaids
+
+
+def simulate(household_count = 2000, good_count = 4, demographic_count = 2):
+    random_state = numpy.random.RandomState(1)
+    slices, parameter_count = quaids.get_parameter_slices(good_count, demographic_count)
+    theta = numpy.zeros(parameter_count)
+    theta[slices['alpha']] = [.1, .2, .3]
+    theta[slices['gamma']] = [.05, -.01, -.02, .04, -.01, .06]
+    theta[slices['beta']] = [-.05, .02, .03]
+    theta[slices['eta']] = random_state.normal(0, .01, (good_count - 1) * demographic_count)
+    theta[slices['lambda']] = [.01, -.005, .002]
+    theta[slices['rho']] = [.1, .2]
+    parameters = quaids.unpack_parameters(theta, good_count, demographic_count)
+    log_prices = random_state.normal(0, .2, (household_count, good_count))
+    log_expenditure = random_state.normal(6, .5, household_count)
+    demographics = random_state.uniform(0, 1, (household_count, demographic_count))
+    return theta, parameters, log_prices, log_expenditure, demographics
+
+
+def test_jacobian():
+    theta, parameters, log_prices, log_expenditure, demographics = simulate(household_count = 100)
+    shares, jacobian = quaids.compute_jacobian(parameters, log_prices, log_expenditure, demographics)
+    for index in range(len(theta)):
+        shifted_theta = theta.copy()
+        shifted_theta[index] += 1e-6
+        shifted_shares = quaids.compute_shares(
+            quaids.unpack_parameters(shifted_theta, 4, 2), log_prices, log_expenditure, demographics)[0][:, :3]
+        assert numpy.abs((shifted_shares - shares) / 1e-6 - jacobian[:, :, index]).max() < 1e-6
+
+
+def test_estimation():
+    theta, parameters, log_prices, log_expenditure, demographics = simulate()
+    shares = quaids.compute_shares(parameters, log_prices, log_expenditure, demographics)[0]
+    shares[:, :3] += numpy.random.RandomState(2).normal(0, .01, (len(shares), 3))
+    shares[:, 3] = 1 - shares[:, :3].sum(axis = 1)
+    estimated_parameters, _ = quaids.estimate_quaids(shares, log_prices, log_expenditure, demographics)
+    for name in ['alpha', 'beta', 'gamma', 'lambda']:
+        assert numpy.abs(estimated_parameters[name] - parameters[name]).max() < .01, name
+
+
+def test_elasticities():
+    _, parameters, log_prices, log_expenditure, demographics = simulate(household_count = 100)
+    shares = quaids.compute_shares(parameters, log_prices, log_expenditure, demographics)[0]
+    expenditure_elasticities, price_elasticities = quaids.compute_elasticities(
+        parameters, log_prices, log_expenditure, demographics)
+    shifted_shares = quaids.compute_shares(parameters, log_prices, log_expenditure + 1e-6, demographics)[0]
+    assert numpy.abs(1 + (shifted_shares - shares) / 1e-6 / shares - expenditure_elasticities).max() < 1e-4
+    for good in range(4):
+        shifted_log_prices = log_prices.copy()
+        shifted_log_prices[:, good] += 1e-6
+        shifted_shares = quaids.compute_shares(parameters, shifted_log_prices, log_expenditure, demographics)[0]
+        expected = (shifted_shares - shares) / 1e-6 / shares - numpy.eye(4)[:, good]
+        assert numpy.abs(expected - price_elasticities[:, :, good]).max() < 1e-4
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import division
+
+import numpy
+
+from openfisca_core.tools import assert_near
+from openfisca_survey_manager.statshelpers import weighted_quantiles
+
+from openfisca_france_indirect_taxation.model import quantiles
+
+
+def test_weighted_quantiles():
+    values = numpy.arange(100, 0, -1)
+    deciles, thresholds = quantiles.compute_weighted_quantiles(values, numpy.ones(100))
+    assert (thresholds == numpy.arange(10, 100, 10) + .5).all()
+    assert (deciles == (values - 1) // 10 + 1).all()
+    assert (numpy.bincount(deciles)[1:] == 10).all()
+
+    # Le premier seuil est la valeur du ménage qui pèse la moitié de la population : il est dans le second quartile
+    deciles, thresholds = quantiles.compute_weighted_quantiles([1, 2, 3, 4], [4, 1, 1, 2], quantile_count = 4)
+    assert numpy.allclose(thresholds, [1, 1.8, 10 / 3])
+    assert list(deciles) == [2, 3, 3, 4]
+
+
+def test_weighted_quantiles_as_survey_manager():
+    random_state = numpy.random.RandomState(0)
+    values = random_state.lognormal(size = 1000)
+    weights = random_state.uniform(0, 10, 1000)
+    deciles, thresholds = quantiles.compute_weighted_quantiles(values, weights)
+    expected_deciles, expected_thresholds = weighted_quantiles(
+        values, numpy.arange(1, 11), weights, return_quantiles = True)
+    assert numpy.allclose(thresholds, expected_thresholds[:-1])
+    # weighted_quantiles met le ménage de plus haut niveau de vie dans le premier décile
+    largest = values == values.max()
+    assert (deciles[~largest] == expected_deciles[~largest]).all()
+    assert (deciles[largest] == 10).all()
+
+
+def test_weighted_sums_by_group():
+    random_state = numpy.random.RandomState(0)
+    groups = random_state.randint(0, 5, 1000)
+    weights = random_state.uniform(0, 10, 1000)
+    values = random_state.normal(size = (1000, 3))
+    sums, total_weights = quantiles.compute_weighted_sums_by_group(groups, weights, values)
+    means = quantiles.compute_weighted_means_by_group(groups, weights, values)
+    for group in range(5):
+        selection = groups == group
+        assert_near(total_weights[group], weights[selection].sum(), absolute_error_margin = 1e-9)
+        for column in range(3):
+            assert_near(
+                sums[group, column],
+                (weights[selection] * values[selection, column]).sum(),
+                absolute_error_margin = 1e-9,
+                )
+            assert_near(
+                means[group, column],
+                numpy.average(values[selection, column], weights = weights[selection]),
+                absolute_error_margin = 1e-9,
+                )
+
+
+def test_weighted_means_by_group_skip_missing_values():
+    # Comme (d * w).sum() / w.sum() avec pandas : une part budgétaire 0 / 0 ne rend pas manquante la moyenne du décile
+    groups = numpy.array([0, 0, 0, 1, 1])
+    weights = numpy.array([1., 2., 3., 1., 1.])
+    values = numpy.array([
+        [1., numpy.nan],
+        [numpy.nan, numpy.nan],
+        [3., 2.],
+        [4., 5.],
+        [6., 7.],
+        ])
+    means = quantiles.compute_weighted_means_by_group(groups, weights, values)
+    assert numpy.allclose(means, [[10 / 6, 6 / 6], [5, 6]])
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import shutil
+import tempfile
+import time
+
+from openfisca_france_indirect_taxation.build_survey_data import run_all
+
+
+marker_directory = None
+
+
+def get_marker_file_path(step, year):
+    return os.path.join(marker_directory, '{}_{}'.format(step, year))
+
+
+def create_stub_step_function(step, upstream_steps = (), duration = 0, fail = False):
+    # Les processus du pool sont créés par fork : ils voient les étapes de substitution
+    def step_function(year = None, force = False):
+        for upstream_step in upstream_steps:
+            assert os.path.exists(get_marker_file_path(upstream_step, year)), \
+                'Step {} started before {}'.format(step, upstream_step)
+        time.sleep(duration)
+        if fail:
+            raise ValueError('Step {} failed'.format(step))
+        open(get_marker_file_path(step, year), 'w').close()
+
+    step_function.step = step
+    step_function.upstream_steps = list(upstream_steps)
+    return step_function
+
+
+def run_stub_steps(step_functions, years_data):
+    global marker_directory
+    step_function_by_step = run_all.step_function_by_step.copy()
+    marker_directory = tempfile.mkdtemp()
+    run_all.step_function_by_step.clear()
+    run_all.step_function_by_step.update(
+        (step_function.step, step_function) for step_function in step_functions)
+    try:
+        return run_all.run_steps(years_data, processes = 2)
+    finally:
+        run_all.step_function_by_step.clear()
+        run_all.step_function_by_step.update(step_function_by_step)
+
+
+def test_run_steps():
+    try:
+        duration_by_node = run_stub_steps(
+            [
+                create_stub_step_function('1_1', duration = .2),
+                create_stub_step_function('1_2', upstream_steps = ['1_1']),
+                create_stub_step_function('2'),
+                create_stub_step_function('3', upstream_steps = ['1_2', '2']),
+                ],
+            [2011, 2005, 2011],
+            )
+        assert sorted(duration_by_node.keys()) == sorted(
+            (year, step) for year in [2005, 2011] for step in ['1_1', '1_2', '2', '3'])
+        # Les étapes sont rendues dans l'ordre où elles se terminent, après leurs étapes amont
+        finished_nodes = list(duration_by_node.keys())
+        for year in [2005, 2011]:
+            assert finished_nodes.index((year, '1_1')) < finished_nodes.index((year, '1_2'))
+            for upstream_step in ['1_2', '2']:
+                assert finished_nodes.index((year, upstream_step)) < finished_nodes.index((year, '3'))
+        assert duration_by_node[(2005, '1_1')] >= .2
+    finally:
+        shutil.rmtree(marker_directory)
+
+
+def test_run_steps_failure():
+    start = time.time()
+    try:
+        try:
+            run_stub_steps(
+                [
+                    create_stub_step_function('1_1', fail = True),
+                    create_stub_step_function('1_2', upstream_steps = ['1_1']),
+                    create_stub_step_function('2', duration = 30),
+                    ],
+                [2011],
+                )
+        except RuntimeError as error:
+            assert 'Step 1_1 failed' in unicode(error)
+        else:
+            assert False, 'run_steps did not raise'
+        # Le pool est arrêté sans attendre l'étape 2 ni lancer l'étape 1_2
+        assert time.time() - start < 20
+        assert not os.path.exists(get_marker_file_path('1_2', 2011))
+        assert not os.path.exists(get_marker_file_path('2', 2011))
+    finally:
+        shutil.rmtree(marker_directory)
+
+
+def test_run_steps_missing_upstream_step():
+    try:
+        try:
+            run_stub_steps([create_stub_step_function('1_2', upstream_steps = ['1_1'])], [2011])
+        except ValueError:
+            pass
+        else:
+            assert False, 'run_steps did not raise'
+    finally:
+        shutil.rmtree(marker_directory)
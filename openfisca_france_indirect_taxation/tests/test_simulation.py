@@ -34,8 +34,7 @@ from openfisca_france_indirect_taxation.surveys import SurveyScenario, get_input
 def run_survey_simulation(year = None):
     assert year is not None
     input_data_frame = get_input_data_frame(year)
-    TaxBenefitSystem = openfisca_france_indirect_taxation.init_country()
-    tax_benefit_system = TaxBenefitSystem()
+    tax_benefit_system = openfisca_france_indirect_taxation.get_tax_benefit_system()
     survey_scenario = SurveyScenario().init_from_data_frame(
         input_data_frame = input_data_frame,
         tax_benefit_system = tax_benefit_system,
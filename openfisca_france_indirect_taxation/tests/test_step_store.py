@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+
+import collections
+import os
+import shutil
+import tempfile
+
+from openfisca_france_indirect_taxation.build_survey_data import step_store
+
+
+def write_file(file_path, content):
+    with open(file_path, 'w') as output_file:
+        output_file.write(content)
+
+
+def test_step_key():
+    directory = tempfile.mkdtemp()
+    get_raw_survey_fingerprint = step_store.get_raw_survey_fingerprint
+    raw_survey_fingerprint_by_year = {2011: ['budget_des_familles_2011.h5', 100, 1.]}
+    step_store.get_raw_survey_fingerprint = lambda year: raw_survey_fingerprint_by_year[year]
+    source_file_path = os.path.join(directory, 'step_test_a.py')
+    asset_file_path = os.path.join(directory, 'asset_2011.csv')
+    write_file(source_file_path, 'a = 1\n')
+    write_file(asset_file_path, 'poste,coicop\n')
+    step_store.upstream_steps_by_step.update(test_a = [], test_b = ['test_a'])
+    step_store.source_file_paths_by_step.update(test_a = [source_file_path], test_b = [source_file_path])
+    step_store.get_asset_file_paths_by_step['test_a'] = lambda year: [asset_file_path]
+
+    def get_step_keys():
+        # Les clés sont mémorisées pour la durée du processus
+        for node in [('test_a', 2011), ('test_b', 2011)]:
+            step_store.step_key_by_node.pop(node, None)
+        return step_store.get_step_key('test_a', 2011), step_store.get_step_key('test_b', 2011)
+
+    try:
+        key_a, key_b = get_step_keys()
+        assert get_step_keys() == (key_a, key_b)
+        assert key_a != key_b
+
+        # Changer le code source de l'étape change sa clé et celles des étapes aval
+        write_file(source_file_path, 'a = 2\n')
+        new_key_a, new_key_b = get_step_keys()
+        assert new_key_a != key_a and new_key_b != key_b
+        key_a, key_b = new_key_a, new_key_b
+
+        # Comme changer un fichier d'assets
+        write_file(asset_file_path, 'poste,coicop\n1111,01111\n')
+        new_key_a, new_key_b = get_step_keys()
+        assert new_key_a != key_a and new_key_b != key_b
+        key_a, key_b = new_key_a, new_key_b
+
+        # Ou l'enquête brute
+        raw_survey_fingerprint_by_year[2011] = ['budget_des_familles_2011.h5', 100, 2.]
+        new_key_a, new_key_b = get_step_keys()
+        assert new_key_a != key_a and new_key_b != key_b
+        key_a, key_b = new_key_a, new_key_b
+
+        # Une étape aval change de clé avec celle de ses étapes amont, même si son code ne change pas
+        step_store.source_file_paths_by_step['test_a'] = [asset_file_path]
+        new_key_a, new_key_b = get_step_keys()
+        assert new_key_a != key_a and new_key_b != key_b
+        assert step_store.get_step_store_file_name('test_b', 2011).endswith(new_key_b[:16])
+    finally:
+        step_store.get_raw_survey_fingerprint = get_raw_survey_fingerprint
+        for dictionary in [
+                step_store.get_asset_file_paths_by_step,
+                step_store.source_file_paths_by_step,
+                step_store.upstream_steps_by_step,
+                ]:
+            dictionary.pop('test_a', None)
+            dictionary.pop('test_b', None)
+        for node in [('test_a', 2011), ('test_b', 2011)]:
+            step_store.step_key_by_node.pop(node, None)
+        shutil.rmtree(directory)
+
+
+def test_prune_superseded_stores():
+    directory = tempfile.mkdtemp()
+    try:
+        file_name = 'indirect_taxation_tmp_step_1_1_2011_0123456789abcdef.h5'
+        other_file_names = dict(
+            kept = [
+                'indirect_taxation_tmp_step_1_1_2005_fedcba9876543210.h5',
+                'indirect_taxation_tmp_step_1_2_2011_fedcba9876543210.h5',
+                'indirect_taxation_tmp_step_1_1_2011_backup.h5',
+                'indirect_taxation_tmp_step_1_1_2011_fedcba9876543210.csv',
+                'indirect_taxation_tmp_step_1_10_2011_fedcba9876543210.h5',
+                ],
+            removed = [
+                'indirect_taxation_tmp_step_1_1_2011_fedcba9876543210.h5',
+                'indirect_taxation_tmp_step_1_1_2011_00000000ffffffff.h5',
+                ],
+            )
+        for other_file_name in [file_name] + other_file_names['kept'] + other_file_names['removed']:
+            write_file(os.path.join(directory, other_file_name), '')
+        # Seul le nom du fichier HDF5 du store sert à l'élagage
+        store = step_store.StepStore.__new__(step_store.StepStore)
+        store.step = '1_1'
+        store.year = 2011
+        store.store = collections.namedtuple('Store', ['filename'])(os.path.join(directory, file_name))
+        store.prune_superseded_stores()
+        assert sorted(os.listdir(directory)) == sorted([file_name] + other_file_names['kept'])
+    finally:
+        shutil.rmtree(directory)
@@ -11,7 +11,7 @@ import seaborn
 from openfisca_france_indirect_taxation.examples.utils_example import graph_builder_bar
 from openfisca_france_indirect_taxation.surveys import SurveyScenario
 from openfisca_france_indirect_taxation.examples.calage_bdf_cn_bis import get_inflators_by_year
-from openfisca_france_indirect_taxation.almost_ideal_demand_system.aids_estimation_from_stata import get_elasticities
+from openfisca_france_indirect_taxation.almost_ideal_demand_system.quaids import get_elasticities
 
 
 # Import d'une nouvelle palette de couleurs
@@ -53,5 +53,17 @@ def test():
     return toto
 
 
+def test_run_batch():
+    runs = [(2011, 2011, None), (2011, 2012, None)]
+    data_frame = SurveyScenario.run_batch(runs, ['depenses_totales'], processes = 1)
+    for data_year, year, reform_key in runs:
+        survey_scenario = SurveyScenario.create(data_year = data_year, year = year)
+        values = data_frame.loc[data_frame.year == year, 'value'].values
+        assert (values == survey_scenario.simulation.calculate('depenses_totales')).all()
+
+    # Les simulations d'une même année de données sont réparties entre les processus du pool
+    assert SurveyScenario.run_batch(runs, ['depenses_totales'], processes = 2).equals(data_frame)
+
+
 if __name__ == '__main__':
     toto = test()
\ No newline at end of file
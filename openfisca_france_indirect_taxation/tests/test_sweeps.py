@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import division
+
+import datetime
+
+import numpy
+
+from openfisca_core import reforms
+
+import openfisca_france_indirect_taxation
+from openfisca_france_indirect_taxation.model.parameters import parameters_at, set_parameter_values
+from openfisca_france_indirect_taxation.model.taxes_indirectes import tva
+from openfisca_france_indirect_taxation.surveys import SurveyScenario
+from openfisca_france_indirect_taxation.sweeps import (
+    clear_holders,
+    get_aggregates_by_decile,
+    iter_sweep,
+    run_sweep,
+    run_vectorized_sweep,
+    )
+from openfisca_france_indirect_taxation.tests import base
+
+
+year = 2011
+parameter_path = 'imposition_indirecte.ticpe.ticpe_gazole'
+values = [.4, .6]
+output_variables = ['ticpe_totale', 'tva_total']
+
+
+def build_tva_taux_plein_reform(tax_benefit_system):
+    Reform = reforms.make_reform(
+        key = 'tva_taux_plein',
+        name = u"TVA au seul taux plein",
+        reference = tax_benefit_system,
+        )
+
+    class tva_total(Reform.Variable):
+        reference = tva.tva_total
+
+        def function(self, simulation, period):
+            return period, simulation.calculate('tva_taux_plein', period)
+
+    return Reform()
+
+
+def get_expected_data_frame(value, tax_benefit_system = None):
+    """Agrégats par décile d'une simulation créée pour la valeur du paramètre, sans partage de holders"""
+    simulation = SurveyScenario.create(tax_benefit_system = tax_benefit_system, year = year).simulation
+    set_parameter_values(simulation, parameters_at(simulation, simulation.period.start), {parameter_path: value})
+    return get_aggregates_by_decile(simulation, output_variables)
+
+
+def assert_sweep_data_frame(data_frame, tax_benefit_system = None):
+    assert list(data_frame.columns) == ['value', 'variable', 'decile', 'total', 'mean']
+    for value in values:
+        value_data_frame = data_frame[data_frame.value == value]
+        expected_data_frame = get_expected_data_frame(value, tax_benefit_system)
+        assert list(value_data_frame.variable) == list(expected_data_frame.variable)
+        assert list(value_data_frame.decile) == list(expected_data_frame.decile)
+        for column in ['total', 'mean']:
+            assert numpy.allclose(value_data_frame[column].values, expected_data_frame[column].values, rtol = 1e-9)
+
+
+class ArraySimulation(object):
+    def __init__(self, array_by_variable):
+        self.array_by_variable = array_by_variable
+
+    def calculate(self, variable):
+        return self.array_by_variable[variable]
+
+
+def test_aggregates_by_decile():
+    simulation = ArraySimulation(dict(
+        niveau_vie_decile = numpy.array([1, 2, 1, 4]),
+        pondmen = numpy.array([1., 2., 3., 4.]),
+        ticpe_totale = numpy.array([10., 20., 30., 40.]),
+        tva_total = numpy.array([1., 2., 3., 4.]),
+        ))
+    data_frame = get_aggregates_by_decile(simulation, output_variables)
+    assert list(data_frame.variable) == ['ticpe_totale'] * 3 + ['tva_total'] * 3
+    # Seuls les déciles présents figurent dans la table
+    assert list(data_frame.decile) == [1, 2, 4] * 2
+    assert numpy.allclose(data_frame.total, [100, 40, 160, 10, 4, 16])
+    assert numpy.allclose(data_frame['mean'], [25, 20, 40, 2.5, 2, 4])
+
+
+def test_clear_holders():
+    def new_simulation():
+        return base.tax_benefit_system.new_scenario().init_single_entity(
+            period = year,
+            personne_de_reference = dict(
+                birth = datetime.date(year - 40, 1, 1),
+                ),
+            menage = dict(
+                depenses_tva_taux_plein = 120,
+                ),
+            ).new_simulation()
+
+    simulation = new_simulation()
+    reference_simulation = new_simulation()
+    tva_taux_plein = simulation.calculate('tva_taux_plein')
+    simulation.holder_by_name['tva_total'] = reference_holder = reference_simulation.get_or_new_holder('tva_total')
+    clear_holders(simulation, ['tva_taux_plein', 'tva_total', 'ticpe_totale'], shared_variables = set(['tva_total']))
+    holder = simulation.holder_by_name['tva_taux_plein']
+    assert holder._array is None and holder._array_by_period is None
+    assert (simulation.calculate('tva_taux_plein') == tva_taux_plein).all()
+    # Le holder partagé est retiré de la simulation, sans toucher à celui de la simulation de référence
+    assert simulation.get_or_new_holder('tva_total') is not reference_holder
+    assert reference_simulation.holder_by_name['tva_total'] is reference_holder
+
+
+def test_run_sweep():
+    data_frames = list(iter_sweep(parameter_path, values, output_variables, year = year, processes = 1))
+    assert [list(data_frame.value.unique()) for data_frame in data_frames] == [[value] for value in values]
+
+    data_frame = run_sweep(parameter_path, values, output_variables, year = year, processes = 1)
+    assert_sweep_data_frame(data_frame)
+    # Les processus du pool partagent la simulation créée avant le fork
+    assert numpy.allclose(
+        run_sweep(parameter_path, values, output_variables, year = year, processes = 2)['total'].values,
+        data_frame['total'].values,
+        rtol = 1e-9,
+        )
+
+
+def test_run_vectorized_sweep():
+    data_frame = run_sweep(parameter_path, values, output_variables, year = year, processes = 1)
+    vectorized_data_frame = run_vectorized_sweep(parameter_path, values, output_variables, year = year)
+    assert list(vectorized_data_frame.columns) == list(data_frame.columns)
+    for column in ['value', 'variable', 'decile']:
+        assert list(vectorized_data_frame[column]) == list(data_frame[column])
+    for column in ['total', 'mean']:
+        assert numpy.allclose(vectorized_data_frame[column].values, data_frame[column].values, rtol = 1e-9)
+
+
+def test_reform_sweep():
+    openfisca_france_indirect_taxation.register_reform('tva_taux_plein', build_tva_taux_plein_reform)
+    try:
+        data_frame = run_sweep(parameter_path, values, output_variables, year = year, reform_key = 'tva_taux_plein',
+            processes = 1)
+        assert_sweep_data_frame(data_frame, base.get_cached_reform(reform_key = 'tva_taux_plein'))
+    finally:
+        openfisca_france_indirect_taxation.build_reform_function_by_key.pop('tva_taux_plein', None)
+        openfisca_france_indirect_taxation.clear_reform_cache(reform_key = 'tva_taux_plein')
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+
+import openfisca_france_indirect_taxation
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_get_tax_benefit_system():
+    assert openfisca_france_indirect_taxation.get_tax_benefit_system() is base.tax_benefit_system
+    assert 'categorie_fiscale_1' in base.tax_benefit_system.column_by_name
+
+
+def test_get_cached_reform():
+    built_reforms = list()
+
+    def build_reform(tax_benefit_system):
+        built_reforms.append(tax_benefit_system)
+        return object()
+
+    openfisca_france_indirect_taxation.register_reform('test_reform', build_reform)
+    try:
+        reform = base.get_cached_reform(reform_key = 'test_reform')
+        assert base.get_cached_reform(reform_key = 'test_reform', tax_benefit_system = base.tax_benefit_system) \
+            is reform
+        assert built_reforms == [base.tax_benefit_system]
+
+        openfisca_france_indirect_taxation.clear_reform_cache(reform_key = 'test_reform')
+        assert base.get_cached_reform(reform_key = 'test_reform') is not reform
+        assert len(built_reforms) == 2
+    finally:
+        openfisca_france_indirect_taxation.build_reform_function_by_key.pop('test_reform', None)
+        openfisca_france_indirect_taxation.clear_reform_cache(reform_key = 'test_reform')
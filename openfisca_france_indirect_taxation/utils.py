@@ -29,9 +29,13 @@ from __future__ import division
 import os
 
 
+import cPickle
+import hashlib
+import json
 import logging
 import pandas
 import pkg_resources
+import tempfile
 
 
 log = logging.getLogger(__name__)
@@ -42,6 +46,137 @@ assets_directory = os.path.join(
     'openfisca_france_indirect_taxation',
     'assets',
     )
+parametres_fiscalite_csv_file_path = os.path.join(
+    assets_directory,
+    'legislation',
+    'Parametres fiscalite indirecte.csv',
+    )
+parametres_fiscalite_xls_file_path = os.path.join(
+    assets_directory,
+    'legislation',
+    'Parametres fiscalite indirecte.xls',
+    )
+# Version du format des feuilles Excel mises en cache
+excel_cache_version = 1
+# (date de modification, taille, empreinte) par chemin de fichier Excel
+file_hash_by_file_path = dict()
+# ((date de modification, taille), data frame) par (chemin, feuille, options de lecture)
+excel_sheet_by_key = dict()
+
+
+def get_cache_directory(*path):
+    """Renvoie (en le créant si besoin) un répertoire du cache utilisateur
+
+    Le cache est situé dans $OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR s'il est défini, sinon dans
+    $XDG_CACHE_HOME/openfisca_france_indirect_taxation (~/.cache par défaut).
+    """
+    cache_directory = os.environ.get('OPENFISCA_FRANCE_INDIRECT_TAXATION_CACHE_DIR')
+    if cache_directory is None:
+        cache_directory = os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+            'openfisca_france_indirect_taxation',
+            )
+    cache_directory = os.path.join(cache_directory, *path)
+    if not os.path.isdir(cache_directory):
+        try:
+            os.makedirs(cache_directory)
+        except OSError:
+            # Another process may have created it in the meantime.
+            if not os.path.isdir(cache_directory):
+                raise
+    return cache_directory
+
+
+def get_files_hash(file_paths):
+    """Renvoie l'empreinte SHA-1 du contenu des fichiers"""
+    sha1 = hashlib.sha1()
+    for file_path in file_paths:
+        with open(file_path, 'rb') as source_file:
+            for chunk in iter(lambda: source_file.read(1 << 20), b''):
+                sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def write_atomically(file_path, write):
+    """Écrit un fichier via un fichier temporaire renommé, pour ne jamais exposer de fichier partiel"""
+    file_descriptor, temporary_file_path = tempfile.mkstemp(dir = os.path.dirname(file_path))
+    try:
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            write(temporary_file)
+        os.rename(temporary_file_path, file_path)
+    except:
+        if os.path.exists(temporary_file_path):
+            os.remove(temporary_file_path)
+        raise
+
+
+def get_file_hash(file_path):
+    """Renvoie l'empreinte d'un fichier, recalculée uniquement quand sa date de modification ou sa taille change"""
+    stat = os.stat(file_path)
+    cached = file_hash_by_file_path.get(file_path)
+    if cached is None or cached[:2] != (stat.st_mtime, stat.st_size):
+        cached = file_hash_by_file_path[file_path] = (stat.st_mtime, stat.st_size, get_files_hash([file_path]))
+    return cached[2]
+
+
+def get_excel_sheet(file_path, sheetname = 0, copy = True, **kwargs):
+    """Lit une feuille d'un fichier Excel des assets en passant par un cache binaire
+
+    La feuille lue par pandas.read_excel est conservée (avec ses types) dans un pickle du répertoire de cache
+    utilisateur, nommé d'après l'empreinte du fichier et les options de lecture, et mémorisée dans le processus tant
+    que la date de modification et la taille du fichier ne changent pas. Rien n'est écrit dans le répertoire des
+    assets. Le data frame renvoyé est une copie, sauf si copy est faux.
+    """
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    key = (file_path, sheetname, tuple(sorted(kwargs.iteritems())))
+    cached = excel_sheet_by_key.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime, stat.st_size):
+        data_frame = cached[1]
+    else:
+        options_hash = hashlib.sha1(repr(key[1:])).hexdigest()
+        cache_file_path = os.path.join(
+            get_cache_directory('assets'),
+            '{}_{}_v{}.pickle'.format(get_file_hash(file_path), options_hash, excel_cache_version),
+            )
+        data_frame = None
+        if os.path.exists(cache_file_path):
+            try:
+                with open(cache_file_path, 'rb') as cache_file:
+                    data_frame = cPickle.load(cache_file)
+            except Exception:
+                log.warning(u'Ignoring corrupted cache file {}'.format(cache_file_path))
+        if data_frame is None:
+            data_frame = pandas.read_excel(file_path, sheetname = sheetname, **kwargs)
+            write_atomically(
+                cache_file_path,
+                lambda cache_file: cPickle.dump(data_frame, cache_file, cPickle.HIGHEST_PROTOCOL),
+                )
+        excel_sheet_by_key[key] = ((stat.st_mtime, stat.st_size), data_frame)
+    return data_frame.copy() if copy else data_frame
+
+
+def get_cached_json(name, source_file_paths, build, schema_version = 1):
+    """Renvoie le résultat (sérialisable en JSON) de build(), mis en cache dans le répertoire de cache utilisateur
+
+    Le cache est reconstruit dès que le contenu d'un des fichiers source ou la version du schéma change.
+    """
+    if not all(os.path.exists(file_path) for file_path in source_file_paths):
+        return build()
+    cache_file_path = os.path.join(
+        get_cache_directory(),
+        '{}_{}_v{}.json'.format(name, get_files_hash(source_file_paths), schema_version),
+        )
+    if os.path.exists(cache_file_path):
+        try:
+            with open(cache_file_path) as cache_file:
+                return json.load(cache_file)
+        except ValueError:
+            log.warning(u'Ignoring corrupted cache file {}'.format(cache_file_path))
+
+    value = build()
+    write_atomically(cache_file_path, lambda cache_file: json.dump(value, cache_file))
+    return value
 
 
 def get_transfert_data_frames(year = None):
@@ -59,8 +194,7 @@ def get_transfert_data_frames(year = None):
             'legislation',
             'Matrice passage {}-COICOP.xls'.format(year),
             )
-        matrice_passage_data_frame = pandas.read_excel(matrice_passage_xls_file_path)
-        matrice_passage_data_frame.to_csv(matrice_passage_csv_file_path, encoding = 'utf-8')
+        matrice_passage_data_frame = get_excel_sheet(matrice_passage_xls_file_path)
 
     if year == 2011:
         matrice_passage_data_frame['poste2011'] = \
@@ -99,22 +233,11 @@ def get_transfert_data_frames(year = None):
 
 
 def get_parametres_fiscalite_data_frame(year = None):
-    parametres_fiscalite_csv_file_path = os.path.join(
-        assets_directory,
-        'legislation',
-        'Parametres fiscalite indirecte.csv',
-        )
     if os.path.exists(parametres_fiscalite_csv_file_path):
         parametres_fiscalite_data_frame = pandas.read_csv(parametres_fiscalite_csv_file_path)
     else:
-        parametres_fiscalite_xls_file_path = os.path.join(
-            assets_directory,
-            'legislation',
-            'Parametres fiscalite indirecte.xls',
-            )
-        parametres_fiscalite_data_frame = pandas.read_excel(parametres_fiscalite_xls_file_path,
+        parametres_fiscalite_data_frame = get_excel_sheet(parametres_fiscalite_xls_file_path,
             sheetname = "categoriefiscale")
-        parametres_fiscalite_data_frame.to_csv(parametres_fiscalite_csv_file_path, encoding = 'utf-8')
 
     if year:
         selected_parametres_fiscalite_data_frame = \